@@ -85,7 +85,10 @@ fun SolarSystemScene(viewModel: SolarSystemViewModel) {
     var models by remember { mutableStateOf<Map<Planet, GltfModel>>(emptyMap()) }
     var entities by remember { mutableStateOf<Map<Planet, GltfModelEntity>>(emptyMap()) }
     var ringModel by remember { mutableStateOf<GltfModel?>(null) }
+    // All orbits baked into one mesh (generate_ring.py --merged): one entity, one draw
+    var orbitRingsModel by remember { mutableStateOf<GltfModel?>(null) }
     var orbitRings by remember { mutableStateOf<List<GltfModelEntity>>(emptyList()) }
+    var mergedOrbitRings by remember { mutableStateOf(false) }
     
     // Skybox State (used for SpatialEnvironmentPreference, not as an entity)
     var skyboxModel by remember { mutableStateOf<GltfModel?>(null) }
@@ -120,12 +123,18 @@ fun SolarSystemScene(viewModel: SolarSystemViewModel) {
             }
         }
         
-        // Load Ring Model
+        // Load Ring Model (merged orbits first, single ring per planet as fallback)
         try {
-            ringModel = GltfModel.create(session, Path("models/ring.gltf"))
-            android.util.Log.d("SolarSystemScene", "Loaded ring.gltf")
+            orbitRingsModel = GltfModel.create(session, Path("models/orbit_rings.gltf"))
+            android.util.Log.d("SolarSystemScene", "Loaded orbit_rings.gltf")
         } catch (e: Exception) {
-            android.util.Log.e("SolarSystemScene", "Failed to load ring model", e)
+            android.util.Log.w("SolarSystemScene", "No merged orbit rings, using ring.gltf per planet", e)
+            try {
+                ringModel = GltfModel.create(session, Path("models/ring.gltf"))
+                android.util.Log.d("SolarSystemScene", "Loaded ring.gltf")
+            } catch (ringError: Exception) {
+                android.util.Log.e("SolarSystemScene", "Failed to load ring model", ringError)
+            }
         }
         
         models = loadedModels
@@ -217,9 +226,23 @@ fun SolarSystemScene(viewModel: SolarSystemViewModel) {
             }
             entities = newEntities
             
-            // 3. Create Orbit Rings (one per planet)
+            // 3. Create Orbit Rings (one entity for the merged mesh, otherwise one per planet)
             val rings = mutableListOf<GltfModelEntity>()
-            if (ringModel != null && rootEntity != null) {
+            if (orbitRingsModel != null && rootEntity != null) {
+                try {
+                    // Radii are baked in, so the entity keeps unit scale
+                    val ring = GltfModelEntity.create(
+                        session,
+                        orbitRingsModel!!,
+                        Pose(translation = Vector3(0f, 0f, 0f))
+                    ).apply {
+                        rootEntity.addChild(this)
+                    }
+                    rings.add(ring)
+                } catch (e: Exception) {
+                    android.util.Log.e("SolarSystemScene", "Failed to create merged orbit rings", e)
+                }
+            } else if (ringModel != null && rootEntity != null) {
                 SolarSystemRepository.planets.forEach { planet ->
                     try {
                         val orbitRadius = (planet.orbitDistance * 0.1f) / 0.2f
@@ -239,6 +262,7 @@ fun SolarSystemScene(viewModel: SolarSystemViewModel) {
                 }
             }
             orbitRings = rings
+            mergedOrbitRings = orbitRingsModel != null && rings.isNotEmpty()
         }
         
         onDispose {
@@ -303,13 +327,20 @@ fun SolarSystemScene(viewModel: SolarSystemViewModel) {
                 val sunSpinAngle = (spinTime * SolarSystemRepository.sol.rotationSpeed) % 360f
                 val counterRotation = Quaternion.fromAxisAngle(Vector3(0f, 1f, 0f), -sunSpinAngle)
                 
-                orbitRings.forEachIndexed { index, ring ->
-                    if (index < SolarSystemRepository.planets.size) {
-                        val planet = SolarSystemRepository.planets[index]
-                        val orbitRadius = ((planet.orbitDistance * 0.1f) / 0.2f) / sunSwellFactor
-                        // Set both scale AND rotation to counter Sun's spin
-                        ring.setPose(Pose(translation = Vector3(0f, 0f, 0f), rotation = counterRotation))
-                        ring.setScale(Vector3(orbitRadius, 1f, orbitRadius))
+                if (mergedOrbitRings) {
+                    // Every radius shrinks by the same factor, so one transform covers all orbits
+                    val ring = orbitRings[0]
+                    ring.setPose(Pose(translation = Vector3(0f, 0f, 0f), rotation = counterRotation))
+                    ring.setScale(Vector3(1f / sunSwellFactor, 1f, 1f / sunSwellFactor))
+                } else {
+                    orbitRings.forEachIndexed { index, ring ->
+                        if (index < SolarSystemRepository.planets.size) {
+                            val planet = SolarSystemRepository.planets[index]
+                            val orbitRadius = ((planet.orbitDistance * 0.1f) / 0.2f) / sunSwellFactor
+                            // Set both scale AND rotation to counter Sun's spin
+                            ring.setPose(Pose(translation = Vector3(0f, 0f, 0f), rotation = counterRotation))
+                            ring.setScale(Vector3(orbitRadius, 1f, orbitRadius))
+                        }
                     }
                 }
             }
@@ -3,65 +3,101 @@
 Generate a UV-mapped sphere glTF model for planets.
 """
 
-import struct
-import base64
-import json
-import math
+import argparse
 import os
+import sys
 
-def generate_sphere_data(radius=0.5, width_segments=64, height_segments=32):
-    """Generate vertices, normals, uvs, and indices for a sphere."""
-    vertices = []
-    normals = []
-    uvs = []
-    indices = []
-
-    for y in range(height_segments + 1):
-        v = y / height_segments
-        angle_v = v * math.pi
-
-        for x in range(width_segments + 1):
-            u = x / width_segments
-            angle_u = u * 2 * math.pi
-
-            # Position
-            # We want the poles on Y axis to match orbit rotation
-            # -x to x for UV wrapping?
-            px = -radius * math.cos(angle_u) * math.sin(angle_v)
-            py = radius * math.cos(angle_v)
-            pz = radius * math.sin(angle_u) * math.sin(angle_v)
-            
-            vertices.extend([px, py, pz])
-
-            # Normal (normalized position)
-            nx = px / radius
-            ny = py / radius
-            nz = pz / radius
-            normals.extend([nx, ny, nz])
-
-            # UVs
-            # Reverting: 1.0 - u caused horizontal flip. Using u for standard mapping.
-            uvs.extend([u, v])
-
-    # Indices
-    for y in range(height_segments):
-        for x in range(width_segments):
-            first = (y * (width_segments + 1)) + x
-            second = first + width_segments + 1
-            
-            indices.extend([first, second, first + 1])
-            indices.extend([second, second + 1, first + 1])
-
-    return vertices, normals, uvs, indices
-
-def create_gltf(output_file, texture_name):
-    vertices, normals, uvs, indices = generate_sphere_data()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"))
+import dedup_buffers
+import geometry
+import gltf_io
+import lod
+import mesh_cleanup
+import mesh_optimize
+import mesh_quantize
+import mesh_tangents
+import meshopt_codec
+import profiling
+
+GENERATOR = "PocketOrrery Sphere Fix"
+
+PLANET_MATERIAL = {
+    "name": "Default",
+    "pbrMetallicRoughness": {
+        "baseColorFactor": [1.0, 1.0, 1.0, 1.0],
+        "metallicFactor": 0.0,
+        "roughnessFactor": 0.9,
+        "baseColorTexture": {"index": 0}
+    },
+    "emissiveFactor": [0.3, 0.3, 0.3], # Reduced from 0.8
+    "emissiveTexture": {"index": 0}
+}
+
+@profiling.profiled("geometry")
+def generate_sphere_data(radius=0.5, width_segments=64, height_segments=32, topology="uv", level=None):
+    """Generate vertices, normals, uvs, and indices for a sphere.
+
+    Returns (N, 3) / (N, 2) float32 arrays and a uint32 index array; see tools/geometry.py.
+    ``topology`` "ico", "cube" or "spherified" swaps the UV sphere for
+    geometry.sphere(topology, radius, level) with the same UV mapping.
+    """
+    if topology != "uv":
+        return geometry.sphere(topology, radius, level)
+    # Poles on Y to match orbit rotation; u (not 1.0 - u) to avoid a horizontal flip.
+    return geometry.uv_sphere(radius, width_segments, height_segments)
+
+def process_mesh(mesh, name, optimize=False, cleanup=False):
+    """Apply the optional cleanup and optimization stages, printing their reports."""
+    if cleanup:
+        mesh, stats = mesh_cleanup.cleanup(mesh)
+        print(mesh_cleanup.report(name, stats))
+    if optimize:
+        mesh, stats = mesh_optimize.optimize(mesh)
+        print(mesh_optimize.report(name, stats))
+    return mesh
+
+def build_lod_assets(name, texture_name, levels, packaging="msft", optimize=False, cleanup=False,
+                     tolerance_px=lod.DEFAULT_TOLERANCE_PX, meshopt=False, tangents=False):
+    """Build an LOD chain (one sphere per entry in ``levels``); returns lod.build_assets() output."""
+    chain = lod.build_chain(levels, process=lambda mesh, label: process_mesh(
+        mesh, f"{name} {label}", optimize, cleanup))
+    print(lod.report(name, chain, lod.screen_coverages(chain, tolerance_px=tolerance_px)))
+    return lod.build_assets(chain, PLANET_MATERIAL, texture_name, GENERATOR, packaging, tolerance_px=tolerance_px,
+                            meshopt=meshopt, tangents=tangents)
+
+def write_lod_gltf(output_file, assets, manifest, fmt="gltf", texture_name=None):
+    """Write built LOD assets for a body, retargeted to ``texture_name`` when given."""
+    written = lod.write_assets(output_file, assets, manifest, fmt, texture_name)
+    for path in written:
+        print(f"Generated {path}")
+    return written
+
+def create_lod_gltf(output_file, texture_name, levels, fmt="gltf", packaging="msft",
+                    optimize=False, cleanup=False, tolerance_px=lod.DEFAULT_TOLERANCE_PX, meshopt=False,
+                    tangents=False):
+    """Write an LOD chain (one sphere per entry in ``levels``) for a body; see tools/lod.py."""
+    name = os.path.splitext(os.path.basename(output_file))[0]
+    assets, manifest = build_lod_assets(name, texture_name, levels, packaging, optimize, cleanup, tolerance_px,
+                                        meshopt, tangents)
+    return write_lod_gltf(output_file, assets, manifest, fmt)
+
+def build_gltf(name, texture_name, optimize=False, cleanup=False, width_segments=64, height_segments=32,
+               quantize=False, meshopt=False, tangents=False, topology="uv", level=None):
+    """Build the sphere asset; returns (gltf, buffer_data). ``name`` labels the stage reports.
+
+    ``tangents`` adds a precomputed TANGENT attribute (see tools/mesh_tangents.py).
+    ``topology`` / ``level`` select another sphere tessellation (see generate_sphere_data).
+    """
+    mesh = process_mesh(generate_sphere_data(0.5, width_segments, height_segments, topology, level), name,
+                        optimize, cleanup)
+    vertices, normals, uvs, indices = mesh
 
     # Pack data
-    vertex_bytes = struct.pack(f'{len(vertices)}f', *vertices)
-    normal_bytes = struct.pack(f'{len(normals)}f', *normals)
-    uv_bytes = struct.pack(f'{len(uvs)}f', *uvs)
-    index_bytes = struct.pack(f'{len(indices)}H', *indices)
+    vertex_bytes = vertices.tobytes()
+    normal_bytes = normals.tobytes()
+    uv_bytes = uvs.tobytes()
+    index_component, index_data = gltf_io.pack_indices(indices, len(vertices))
+    index_bytes = index_data.tobytes()
 
     # Calculate offsets
     vertex_offset = 0
@@ -77,13 +113,12 @@ def create_gltf(output_file, texture_name):
     
     # Combine buffer
     buffer_data = vertex_bytes + normal_bytes + uv_bytes + index_bytes
-    buffer_b64 = base64.b64encode(buffer_data).decode('utf-8')
     
-    vertex_count = len(vertices) // 3
+    vertex_count = len(vertices)
     index_count = len(indices)
 
     gltf = {
-        "asset": {"version": "2.0", "generator": "PocketOrrery Sphere Fix"},
+        "asset": {"version": "2.0", "generator": GENERATOR},
         "scene": 0,
         "scenes": [{"nodes": [0]}],
         "nodes": [{"mesh": 0, "name": "Sphere"}],
@@ -99,17 +134,7 @@ def create_gltf(output_file, texture_name):
                 "material": 0
             }]
         }],
-        "materials": [{
-            "name": "Default",
-            "pbrMetallicRoughness": {
-                "baseColorFactor": [1.0, 1.0, 1.0, 1.0],
-                "metallicFactor": 0.0,
-                "roughnessFactor": 0.9,
-                "baseColorTexture": {"index": 0}
-            },
-            "emissiveFactor": [0.3, 0.3, 0.3], # Reduced from 0.8
-            "emissiveTexture": {"index": 0}
-        }],
+        "materials": [PLANET_MATERIAL],
         "textures": [{"source": 0}],
         "images": [{"uri": texture_name}], 
         "accessors": [
@@ -119,8 +144,8 @@ def create_gltf(output_file, texture_name):
                 "componentType": 5126, # FLOAT
                 "count": vertex_count,
                 "type": "VEC3",
-                "max": [0.5, 0.5, 0.5],
-                "min": [-0.5, -0.5, -0.5]
+                "max": [0.5, 0.5, 0.5] if topology == "uv" else vertices.max(axis=0).tolist(),
+                "min": [-0.5, -0.5, -0.5] if topology == "uv" else vertices.min(axis=0).tolist()
             },
             { # NORMAL
                 "bufferView": 1,
@@ -139,7 +164,7 @@ def create_gltf(output_file, texture_name):
             { # INDICES
                 "bufferView": 3,
                 "byteOffset": 0,
-                "componentType": 5123, # UNSIGNED_SHORT
+                "componentType": index_component, # UNSIGNED_SHORT up to 65,535 vertices, else UNSIGNED_INT
                 "count": index_count,
                 "type": "SCALAR"
             }
@@ -150,17 +175,74 @@ def create_gltf(output_file, texture_name):
             {"buffer": 0, "byteOffset": uv_offset, "byteLength": uv_len, "target": 34962},
             {"buffer": 0, "byteOffset": index_offset, "byteLength": index_len, "target": 34963}
         ],
-        "buffers": [{
-            "byteLength": total_len,
-            "uri": f"data:application/octet-stream;base64,{buffer_b64}"
-        }]
+        "buffers": [{"byteLength": total_len}]
     }
-    
-    with open(output_file, 'w') as f:
-        json.dump(gltf, f, indent=2)
+
+    tangent_data = None
+    if tangents:
+        tangent_data, stats = mesh_tangents.generate(mesh)
+        print(mesh_tangents.report(name, stats))
+        blob = bytearray(buffer_data)
+        gltf["meshes"][0]["primitives"][0]["attributes"]["TANGENT"] = gltf_io.append_accessor(
+            gltf, gltf_io.append_view(gltf, blob, tangent_data, 34962), 5126, vertex_count, "VEC4")
+        buffer_data = bytes(blob)
+        gltf["buffers"][0]["byteLength"] = len(buffer_data)
+    if quantize:
+        gltf, buffer_data, errors = mesh_quantize.apply(gltf, mesh, tangent_data)
+        print(mesh_quantize.report(name, errors))
+    if meshopt:
+        gltf, buffer_data, stats = meshopt_codec.compress_gltf(gltf, buffer_data)
+        print(meshopt_codec.report(name, stats))
+    return gltf, buffer_data
+
+def write_gltf(output_file, gltf, buffer_data, fmt="gltf"):
+    """Write a built sphere as embedded-base64 .gltf (fmt="gltf") or binary .glb (fmt="glb")."""
+    output_file = gltf_io.write(output_file, gltf, buffer_data, fmt, indent=2)
     print(f"Generated {output_file}")
+    return output_file
+
+def create_gltf(output_file, texture_name, fmt="gltf", optimize=False, cleanup=False,
+                width_segments=64, height_segments=32, quantize=False, meshopt=False, tangents=False,
+                topology="uv", level=None):
+    """Write the sphere for one body; see build_gltf for the options."""
+    name = os.path.splitext(os.path.basename(output_file))[0]
+    gltf, buffer_data = build_gltf(name, texture_name, optimize, cleanup, width_segments, height_segments,
+                                   quantize, meshopt, tangents, topology, level)
+    return write_gltf(output_file, gltf, buffer_data, fmt)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate planet sphere models.")
+    parser.add_argument("--format", choices=gltf_io.FORMATS, default="gltf",
+                        help="gltf: JSON with embedded base64 buffer, glb: binary glTF")
+    parser.add_argument("--cleanup", action="store_true",
+                        help="weld duplicate vertices and drop degenerate pole triangles (see tools/mesh_cleanup.py)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="reorder for vertex cache / overdraw / fetch locality (see tools/mesh_optimize.py)")
+    parser.add_argument("--quantize", action="store_true",
+                        help="write KHR_mesh_quantization attributes (see tools/mesh_quantize.py)")
+    parser.add_argument("--meshopt", action="store_true",
+                        help="write EXT_meshopt_compression buffer views (see tools/meshopt_codec.py)")
+    parser.add_argument("--tangents", action="store_true",
+                        help="precompute a TANGENT attribute instead of leaving it to the runtime (see tools/mesh_tangents.py)")
+    parser.add_argument("--topology", choices=geometry.TOPOLOGIES, default="uv",
+                        help="uv sphere, icosphere, normalized cube or spherified cube (see tools/compare_topologies.py)")
+    parser.add_argument("--level", type=int, default=None,
+                        help="detail of --topology: ico subdivisions (default 4), cube segments per face edge (default 16)")
+    parser.add_argument("--lod", type=int, nargs="*", metavar="SEGMENTS",
+                        help=f"write an LOD chain instead of one mesh (default levels: {' '.join(map(str, lod.DEFAULT_LEVELS))})")
+    parser.add_argument("--lod-packaging", choices=lod.PACKAGING, default="msft",
+                        help="msft: one asset with MSFT_lod, files: <body>_lod<N> siblings + <body>_lod.json")
+    parser.add_argument("--lod-tolerance", type=float, default=lod.DEFAULT_TOLERANCE_PX,
+                        help="screen-space error in pixels allowed before switching to a finer level")
+    parser.add_argument("--dedup", action="store_true",
+                        help="write the shared sphere buffer once as geometry_<hash>.bin (see tools/dedup_buffers.py)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if args.quantize and args.lod is not None:
+        parser.error("--quantize writes single-mesh assets and cannot be combined with --lod")
+    if args.topology != "uv" and args.lod is not None:
+        parser.error("--lod chains are UV spheres and cannot be combined with --topology")
+
     planets = [
         ("earth", "earth_texture.jpg"),
         ("mars", "mars_texture.jpg"),
@@ -175,7 +257,33 @@ if __name__ == "__main__":
     
     base_dir = "app/src/main/assets/models/"
     
-    # Run for all bodies
-    for name, texture in planets:
-        print(f"Processing {name}...")
-        create_gltf(os.path.join(base_dir, f"{name}.gltf"), texture)
+    # Every body shares the same geometry: process it once, then only the texture differs
+    with profiling.session(args, "create_sphere_fixed"):
+        with profiling.asset("sphere"):
+            if args.lod is not None:
+                assets, manifest = build_lod_assets("sphere", planets[0][1], args.lod or lod.DEFAULT_LEVELS,
+                                                    args.lod_packaging, args.optimize, args.cleanup,
+                                                    args.lod_tolerance, args.meshopt, args.tangents)
+            else:
+                gltf, buffer_data = build_gltf("sphere", planets[0][1], args.optimize, args.cleanup,
+                                               quantize=args.quantize, meshopt=args.meshopt, tangents=args.tangents,
+                                               topology=args.topology, level=args.level)
+
+        outputs = []
+        for name, texture in planets:
+            print(f"Processing {name}...")
+            output_file = os.path.join(base_dir, f"{name}.gltf")
+            with profiling.asset(name):
+                if args.lod is not None:
+                    outputs += [p for p in write_lod_gltf(output_file, assets, manifest, args.format, texture)
+                                if not p.endswith(".json")]
+                else:
+                    outputs.append(write_gltf(output_file, gltf_io.with_image(gltf, texture), buffer_data,
+                                              args.format))
+
+        if args.dedup:
+            with profiling.stage("dedup"):
+                before, after, problems = dedup_buffers.dedup(outputs)
+            print(f"Deduplicated buffers: {before} B -> {after} B (saved {before - after} B)")
+            if problems:
+                raise SystemExit("\n".join(problems))
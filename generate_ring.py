@@ -1,78 +1,94 @@
 #!/usr/bin/env python3
-"""Generate a simple ring/torus glTF model for orbit visualization."""
+"""Generate a simple ring/torus glTF model for orbit visualization.
 
-import struct
-import base64
-import json
-import math
+By default this writes ring.gltf, one unit ring that the app scales per
+planet (eight entities, eight draws). --merged bakes every orbit radius
+from SolarSystemRepository.kt into orbit_rings.gltf: one mesh, each ring the
+unit ring scaled by (r, 1, r) exactly as the per-planet entities were, with
+a per-vertex _RING_ID (planet index, repository order) so a shader can
+highlight one orbit. --instanced writes orbit_rings_instanced.gltf, the
+unit ring plus EXT_mesh_gpu_instancing scales, with the extension required:
+loaders without it must reject the asset rather than draw one unit ring.
+The app loads the merged orbit_rings.gltf.
+"""
 
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"))
+import bodies
+import geometry
+import gltf_io
+import mesh_cleanup
+import mesh_optimize
+import mesh_quantize
+import meshopt_codec
+import profiling
+
+# SolarSystemScene: orbitRadius = (planet.orbitDistance * 0.1f) / 0.2f
+ORBIT_SCALE = 0.1 / 0.2
+RING_ID = "_RING_ID"
+INSTANCING = "EXT_mesh_gpu_instancing"
+GENERATOR = "PocketOrrery Ring Generator"
+
+RING_MATERIAL = {
+    "name": "OrbitRingMaterial",
+    "pbrMetallicRoughness": {
+        "baseColorFactor": [0.7, 0.7, 0.8, 0.02],
+        "metallicFactor": 0.0,
+        "roughnessFactor": 0.9
+    },
+    "emissiveFactor": [0.2, 0.2, 0.25],
+    "alphaMode": "BLEND"
+}
+
+def orbit_radii():
+    """Orbit ring radii in the Sun entity's units, one per planet in repository order."""
+    return [planet["orbitDistance"] * ORBIT_SCALE for planet in bodies.planets()]
+
+@profiling.profiled("geometry")
 def generate_torus_vertices(major_radius=1.0, minor_radius=0.002, major_segments=64, minor_segments=6):
-    """Generate vertices and indices for a torus."""
-    vertices = []
-    normals = []
-    indices = []
-    
-    for i in range(major_segments):
-        theta = 2.0 * math.pi * i / major_segments
-        cos_theta = math.cos(theta)
-        sin_theta = math.sin(theta)
-        
-        for j in range(minor_segments):
-            phi = 2.0 * math.pi * j / minor_segments
-            cos_phi = math.cos(phi)
-            sin_phi = math.sin(phi)
-            
-            # Position
-            x = (major_radius + minor_radius * cos_phi) * cos_theta
-            y = minor_radius * sin_phi
-            z = (major_radius + minor_radius * cos_phi) * sin_theta
-            vertices.extend([x, y, z])
-            
-            # Normal
-            nx = cos_phi * cos_theta
-            ny = sin_phi
-            nz = cos_phi * sin_theta
-            normals.extend([nx, ny, nz])
-    
-    # Generate indices
-    for i in range(major_segments):
-        for j in range(minor_segments):
-            i_next = (i + 1) % major_segments
-            j_next = (j + 1) % minor_segments
-            
-            v0 = i * minor_segments + j
-            v1 = i_next * minor_segments + j
-            v2 = i_next * minor_segments + j_next
-            v3 = i * minor_segments + j_next
-            
-            # Two triangles per quad
-            indices.extend([v0, v1, v2])
-            indices.extend([v0, v2, v3])
-    
-    return vertices, normals, indices
+    """Generate vertices and indices for a torus.
+
+    Returns (N, 3) float32 position/normal arrays and a uint32 index array; see tools/geometry.py.
+    """
+    positions, normals, _, indices = geometry.torus(major_radius, minor_radius, major_segments, minor_segments)
+    return positions, normals, indices
 
-def create_gltf():
-    vertices, normals, indices = generate_torus_vertices()
+def create_gltf(optimize=False, cleanup=False, major_segments=64, quantize=False, meshopt=False):
+    """Return (gltf, buffer_data); the writer decides how the buffer is stored."""
+    vertices, normals, indices = generate_torus_vertices(major_segments=major_segments)
+    if cleanup:
+        mesh, stats = mesh_cleanup.cleanup(geometry.Mesh(vertices, normals, None, indices))
+        print(mesh_cleanup.report("ring", stats))
+        vertices, normals, _, indices = mesh
+    if optimize:
+        mesh, stats = mesh_optimize.optimize(geometry.Mesh(vertices, normals, None, indices))
+        print(mesh_optimize.report("ring", stats))
+        vertices, normals, _, indices = mesh
     
     # Pack data into binary
-    vertex_data = struct.pack(f'{len(vertices)}f', *vertices)
-    normal_data = struct.pack(f'{len(normals)}f', *normals)
-    index_data = struct.pack(f'{len(indices)}H', *indices)
-    
-    # Combine all buffers
-    buffer_data = vertex_data + normal_data + index_data
-    buffer_base64 = base64.b64encode(buffer_data).decode('utf-8')
+    with profiling.stage("pack"):
+        vertex_data = vertices.tobytes()
+        normal_data = normals.tobytes()
+        index_component, index_data = gltf_io.pack_indices(indices, len(vertices))
+        index_data = index_data.tobytes()
+
+        # Combine all buffers
+        buffer_data = vertex_data + normal_data + index_data
     
-    vertex_count = len(vertices) // 3
+    vertex_count = len(vertices)
     index_count = len(indices)
     
     # Calculate bounds
-    xs = vertices[0::3]
-    ys = vertices[1::3]
-    zs = vertices[2::3]
+    min_pos = vertices.min(axis=0).tolist()
+    max_pos = vertices.max(axis=0).tolist()
     
     gltf = {
-        "asset": {"version": "2.0", "generator": "PocketOrrery Ring Generator"},
+        "asset": {"version": "2.0", "generator": GENERATOR},
         "scene": 0,
         "scenes": [{"nodes": [0]}],
         "nodes": [{"mesh": 0}],
@@ -83,24 +99,15 @@ def create_gltf():
                 "material": 0
             }]
         }],
-        "materials": [{
-            "name": "OrbitRingMaterial",
-            "pbrMetallicRoughness": {
-                "baseColorFactor": [0.7, 0.7, 0.8, 0.02],
-                "metallicFactor": 0.0,
-                "roughnessFactor": 0.9
-            },
-            "emissiveFactor": [0.2, 0.2, 0.25],
-            "alphaMode": "BLEND"
-        }],
+        "materials": [RING_MATERIAL],
         "accessors": [
             {
                 "bufferView": 0,
                 "componentType": 5126,  # FLOAT
                 "count": vertex_count,
                 "type": "VEC3",
-                "min": [min(xs), min(ys), min(zs)],
-                "max": [max(xs), max(ys), max(zs)]
+                "min": min_pos,
+                "max": max_pos
             },
             {
                 "bufferView": 1,
@@ -110,7 +117,7 @@ def create_gltf():
             },
             {
                 "bufferView": 2,
-                "componentType": 5123,  # UNSIGNED_SHORT
+                "componentType": index_component,  # UNSIGNED_SHORT up to 65,535 vertices
                 "count": index_count,
                 "type": "SCALAR"
             }
@@ -120,17 +127,136 @@ def create_gltf():
             {"buffer": 0, "byteOffset": len(vertex_data), "byteLength": len(normal_data)},
             {"buffer": 0, "byteOffset": len(vertex_data) + len(normal_data), "byteLength": len(index_data)}
         ],
-        "buffers": [{
-            "byteLength": len(buffer_data),
-            "uri": f"data:application/octet-stream;base64,{buffer_base64}"
-        }]
+        "buffers": [{"byteLength": len(buffer_data)}]
     }
     
-    return gltf
+    if quantize:
+        gltf, buffer_data, errors = mesh_quantize.apply(gltf, geometry.Mesh(vertices, normals, None, indices))
+        print(mesh_quantize.report("ring", errors))
+    if meshopt:
+        gltf, buffer_data, stats = meshopt_codec.compress_gltf(gltf, buffer_data)
+        print(meshopt_codec.report("ring", stats))
+
+    return gltf, buffer_data
+
+@profiling.profiled("geometry")
+def generate_merged_rings(radii, major_segments=64, minor_segments=6):
+    """All orbit rings as one Mesh; ``uvs`` carries (ring id, 0) per vertex.
+
+    Ring i is the unit ring scaled by (radii[i], 1, radii[i]); normals get the
+    inverse-transpose scale. The ids ride in the uvs slot so the cleanup and
+    optimize stages keep them attached to their vertices.
+    """
+    unit = geometry.torus(1.0, 0.002, major_segments, minor_segments)
+    positions, normals, ids, indices = [], [], [], []
+    for i, radius in enumerate(radii):
+        scale = np.array([radius, 1.0, radius], dtype=np.float64)
+        n = unit.normals / scale
+        positions.append(unit.positions * scale)
+        normals.append(n / np.linalg.norm(n, axis=1, keepdims=True))
+        ids.append(np.full(len(unit.positions), i))
+        indices.append(unit.indices + i * len(unit.positions))
+    ids = np.concatenate(ids)
+    return geometry.Mesh(geometry._f32(np.concatenate(positions)), geometry._f32(np.concatenate(normals)),
+                         geometry._f32(np.stack([ids, np.zeros_like(ids)], axis=-1)),
+                         np.concatenate(indices).astype(np.uint32))
+
+def _append_ring_ids(gltf, buffer_data, ring_ids):
+    """Add the float _RING_ID vertex attribute to the (single) primitive."""
+    blob = bytearray(buffer_data)
+    view = gltf_io.append_view(gltf, blob, geometry._f32(ring_ids), 34962)
+    gltf["meshes"][0]["primitives"][0]["attributes"][RING_ID] = gltf_io.append_accessor(
+        gltf, view, 5126, len(ring_ids), "SCALAR", min=[float(ring_ids.min())], max=[float(ring_ids.max())])
+    gltf["buffers"][0]["byteLength"] = len(blob)
+    return bytes(blob)
+
+def create_merged_gltf(radii=None, optimize=False, cleanup=False, major_segments=64, quantize=False, meshopt=False):
+    """Return (gltf, buffer_data) with every orbit ring in one mesh (one draw call)."""
+    radii = orbit_radii() if radii is None else radii
+    mesh = generate_merged_rings(radii, major_segments)
+    if cleanup:
+        mesh, stats = mesh_cleanup.cleanup(mesh)
+        print(mesh_cleanup.report("orbit_rings", stats))
+    if optimize:
+        mesh, stats = mesh_optimize.optimize(mesh)
+        print(mesh_optimize.report("orbit_rings", stats))
+    ring_ids = mesh.uvs[:, 0]
+    mesh = mesh._replace(uvs=None)
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": GENERATOR},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "name": "OrbitRings"}],
+        "materials": [RING_MATERIAL],
+    }
+    blob = bytearray()
+    gltf_io.add_mesh(gltf, blob, mesh, material=0, name="OrbitRings")
+    gltf["buffers"] = [{"byteLength": len(blob)}]
+    buffer_data = bytes(blob)
+    if quantize:
+        gltf, buffer_data, errors = mesh_quantize.apply(gltf, mesh)
+        print(mesh_quantize.report("orbit_rings", errors))
+    buffer_data = _append_ring_ids(gltf, buffer_data, ring_ids)
+    if meshopt:
+        gltf, buffer_data, stats = meshopt_codec.compress_gltf(gltf, buffer_data)
+        print(meshopt_codec.report("orbit_rings", stats))
+    print(f"orbit_rings: {len(radii)} rings, {mesh.vertex_count} vertices, {mesh.triangle_count} triangles, 1 draw")
+    return gltf, buffer_data
+
+def create_instanced_gltf(radii=None, optimize=False, cleanup=False, major_segments=64, quantize=False,
+                          meshopt=False):
+    """Return (gltf, buffer_data): the unit ring drawn once per orbit via EXT_mesh_gpu_instancing."""
+    radii = orbit_radii() if radii is None else radii
+    gltf, buffer_data = create_gltf(optimize, cleanup, major_segments, quantize)
+    blob = bytearray(buffer_data)
+    scales = np.array([[radius, 1.0, radius] for radius in radii], dtype=np.float32)
+    node = next(node for node in gltf["nodes"] if node.get("mesh") == 0)
+    node.setdefault("extensions", {})[INSTANCING] = {"attributes": {
+        "SCALE": gltf_io.append_accessor(gltf, gltf_io.append_view(gltf, blob, scales), 5126, len(radii), "VEC3")}}
+    node["name"] = "OrbitRings"
+    for key in ("extensionsUsed", "extensionsRequired"):
+        gltf.setdefault(key, []).append(INSTANCING)
+    gltf["buffers"][0]["byteLength"] = len(blob)
+    buffer_data = bytes(blob)
+    if meshopt:
+        gltf, buffer_data, stats = meshopt_codec.compress_gltf(gltf, buffer_data)
+        print(meshopt_codec.report("orbit_rings", stats))
+    return gltf, buffer_data
 
 if __name__ == "__main__":
-    gltf = create_gltf()
-    output_path = "app/src/main/assets/models/ring.gltf"
-    with open(output_path, 'w') as f:
-        json.dump(gltf, f, indent=2)
+    parser = argparse.ArgumentParser(description="Generate the orbit ring model.")
+    parser.add_argument("--format", choices=gltf_io.FORMATS, default="gltf",
+                        help="gltf: JSON with embedded base64 buffer, glb: binary glTF")
+    parser.add_argument("--cleanup", action="store_true",
+                        help="weld duplicate vertices and drop degenerate triangles (see tools/mesh_cleanup.py)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="reorder for vertex cache / overdraw / fetch locality (see tools/mesh_optimize.py)")
+    parser.add_argument("--quantize", action="store_true",
+                        help="write KHR_mesh_quantization attributes (see tools/mesh_quantize.py)")
+    parser.add_argument("--meshopt", action="store_true",
+                        help="write EXT_meshopt_compression buffer views (see tools/meshopt_codec.py)")
+    layout = parser.add_mutually_exclusive_group()
+    layout.add_argument("--merged", action="store_true",
+                        help="bake every orbit into orbit_rings.gltf (one mesh, per-vertex _RING_ID)")
+    layout.add_argument("--instanced", action="store_true",
+                        help="write orbit_rings_instanced.gltf: one ring with (required) EXT_mesh_gpu_instancing scales")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    with profiling.session(args, "generate_ring"):
+        if args.merged or args.instanced:
+            create = create_merged_gltf if args.merged else create_instanced_gltf
+            stem = "orbit_rings" if args.merged else "orbit_rings_instanced"
+            with profiling.asset(stem):
+                gltf, buffer_data = create(None, args.optimize, args.cleanup, quantize=args.quantize,
+                                           meshopt=args.meshopt)
+                output_path = gltf_io.write(f"app/src/main/assets/models/{stem}.gltf", gltf, buffer_data,
+                                            args.format, indent=2)
+        else:
+            with profiling.asset("ring"):
+                gltf, buffer_data = create_gltf(args.optimize, args.cleanup, quantize=args.quantize,
+                                                meshopt=args.meshopt)
+                output_path = gltf_io.write("app/src/main/assets/models/ring.gltf", gltf, buffer_data, args.format,
+                                            indent=2)
     print(f"Created {output_path}")
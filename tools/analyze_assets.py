@@ -0,0 +1,465 @@
+"""
+Static analyzer and performance budget gate for the generated assets.
+
+Usage: python tools/analyze_assets.py [files...] [--budgets budgets.json] [--budget triangles=20000]
+                                      [--scene-budget texture_bytes=64000000] [--repeat 3]
+       python tools/analyze_assets.py --self-check
+
+Parses every .gltf / .glb under app/src/main/assets/models (and the .bin
+files they reference) and reports per asset:
+
+  verts / tris   drawn by the default scene (MSFT_lod alternatives are not
+                 counted, EXT_mesh_gpu_instancing multiplies by instances)
+  B/vert         bytes of vertex attributes per vertex
+  ACMR           FIFO post-transform cache misses per triangle (mesh_optimize)
+  texture        GPU memory of the referenced images (KHR_texture_basisu
+                 source when present) as RGBA8 including the mip chain;
+                 KTX2 files count the levels they store
+  b64            share of the file that is embedded base64, and share of
+                 the parse + decode time spent on it (best of ``--repeat``)
+
+It validates what the generators and manage_assets.py write:
+
+  - buffer byteLength, bufferView ranges and image paths (dedup_buffers.validate)
+  - accessors fit inside their bufferView; offsets aligned to the component
+    size, vertex attribute offsets and strides to 4 bytes; GLB chunks padded
+  - POSITION has min/max, and every declared min/max contains the data;
+    declared bounds looser than the data are a warning
+  - index values below the vertex count; .bin files nobody references (warning)
+
+Budgets are limits on the per-asset metrics (triangles, vertices,
+file_bytes, texture_bytes, acmr) and scene-wide totals (triangles,
+vertices, file_bytes, texture_bytes; shared textures count once).
+DEFAULT_BUDGETS can be overridden with a JSON file of the same shape
+(``{"asset": {...}, "scene": {...}, "assets": {"milky_way": {...}}}``, keyed
+by file stem so .gltf and .glb share limits)
+and with ``--budget`` / ``--scene-budget NAME=VALUE``. The exit status is
+1 when any budget is exceeded or an asset is invalid, so it can gate CI.
+``--self-check`` instead runs the validator on small generated assets with
+known verdicts (regression cases for the checks themselves).
+"""
+
+import argparse
+import glob
+import json
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+import dedup_buffers
+import geometry
+import gltf_io
+import ktx2
+import mesh_optimize
+import meshopt_codec
+
+MODELS_DIR = "app/src/main/assets/models"
+
+# The shipped assets plus headroom, so the defaults gate regressions; the 8K
+# skybox panorama is the one known outlier.
+DEFAULT_BUDGETS = {
+    "asset": {"triangles": 16384, "vertices": 16384, "file_bytes": 1000000, "texture_bytes": 16000000,
+              "acmr": 1.5},
+    "scene": {"triangles": 100000, "vertices": 60000, "file_bytes": 4000000, "texture_bytes": 300000000},
+    "assets": {"milky_way": {"texture_bytes": 180000000}},
+}
+ASSET_METRICS = ("triangles", "vertices", "file_bytes", "texture_bytes", "acmr")
+SCENE_METRICS = ("triangles", "vertices", "file_bytes", "texture_bytes")
+
+NUMPY_TYPES = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16, 5125: np.uint32, 5126: np.float32}
+NORMALIZE = {5120: 127.0, 5121: 255.0, 5122: 32767.0, 5123: 65535.0}
+BOUNDS_SLACK = 1e-3  # relative to the accessor's extent before loose bounds are reported
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+# --- Images ---
+
+def image_info(path):
+    """(width, height, stored mip levels or None) from the header of a PNG, JPEG or KTX2 file."""
+    with open(path, 'rb') as f:
+        data = f.read(64 * 1024)
+    if data[:12] == ktx2.IDENTIFIER:
+        info = ktx2.header(data)
+        return info["width"], info["height"], info["levels"]
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        width, height = struct.unpack_from('>II', data, 16)
+        return width, height, None
+    if data[:2] == b'\xff\xd8':
+        with open(path, 'rb') as f:
+            data = f.read()
+        pos = 2
+        while pos + 4 <= len(data):
+            marker, length = data[pos + 1], struct.unpack_from('>H', data, pos + 2)[0]
+            if marker in _SOF_MARKERS:
+                height, width = struct.unpack_from('>HH', data, pos + 5)
+                return width, height, None
+            pos += 2 + length
+    raise ValueError(f"{path}: unrecognized image format")
+
+
+def texture_bytes(width, height, levels=None):
+    """RGBA8 bytes of ``levels`` mips (the full chain when None, as the runtime generates it)."""
+    total, level = 0, 0
+    while True:
+        total += max(width >> level, 1) * max(height >> level, 1) * 4
+        level += 1
+        if level == levels or (levels is None and (width >> level) == 0 and (height >> level) == 0):
+            return total
+
+
+def _image_paths(path, gltf):
+    """Paths of the images the textures actually sample (KHR_texture_basisu source first)."""
+    images = gltf.get("images", [])
+    used = []
+    for texture in gltf.get("textures", []):
+        source = texture.get("extensions", {}).get("KHR_texture_basisu", {}).get("source", texture.get("source"))
+        uri = images[source].get("uri", "") if source is not None and source < len(images) else ""
+        if uri and not uri.startswith("data:"):
+            used.append(os.path.normpath(os.path.join(os.path.dirname(path), uri)))
+    return sorted(set(used))
+
+
+# --- Accessors ---
+
+def read_accessor(gltf, buffers, index):
+    """(count, components) array of accessor ``index`` in its stored component type."""
+    acc = gltf["accessors"][index]
+    components = meshopt_codec.TYPE_COUNT[acc["type"]]
+    dtype = np.dtype(NUMPY_TYPES[acc["componentType"]]).newbyteorder('<')
+    view = gltf["bufferViews"][acc["bufferView"]]
+    stride = view.get("byteStride", dtype.itemsize * components)
+    offset = view.get("byteOffset", 0) + acc.get("byteOffset", 0)
+    data = np.frombuffer(buffers[view.get("buffer", 0)], np.uint8)
+    rows = np.lib.stride_tricks.as_strided(data[offset:], (acc["count"], dtype.itemsize * components), (stride, 1))
+    return np.ascontiguousarray(rows).view(dtype).reshape(acc["count"], components)
+
+
+def _check_layout(gltf, buffers, vertex_views):
+    problems = []
+    for i, acc in enumerate(gltf.get("accessors", [])):
+        if "bufferView" not in acc:
+            continue
+        view = gltf["bufferViews"][acc["bufferView"]]
+        component = meshopt_codec.COMPONENT_SIZE[acc["componentType"]]
+        element = meshopt_codec._element_size(acc)
+        stride = view.get("byteStride", element)
+        start = view.get("byteOffset", 0) + acc.get("byteOffset", 0)
+        end = acc.get("byteOffset", 0) + stride * (acc["count"] - 1) + element
+        if end > view["byteLength"]:
+            problems.append(f"accessor {i} ends at {end}, past bufferView {acc['bufferView']} "
+                            f"({view['byteLength']} B)")
+        if start % component:
+            problems.append(f"accessor {i} starts at buffer offset {start}, not a multiple of {component}")
+        if acc["bufferView"] in vertex_views and (start % 4 or stride % 4):
+            problems.append(f"vertex accessor {i} offset {start} / stride {stride} not 4-byte aligned")
+    return problems
+
+
+def _check_bounds(gltf, buffers):
+    problems, warnings = [], []
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh["primitives"]:
+            acc = gltf["accessors"][prim["attributes"]["POSITION"]]
+            if "min" not in acc or "max" not in acc:
+                problems.append(f"POSITION accessor {prim['attributes']['POSITION']} has no min/max")
+    for i, acc in enumerate(gltf.get("accessors", [])):
+        if "min" not in acc or "max" not in acc or "bufferView" not in acc or not acc["count"]:
+            continue
+        values = read_accessor(gltf, buffers, i).astype(np.float64)
+        lo, hi = values.min(axis=0), values.max(axis=0)
+        if acc.get("normalized") and acc["componentType"] in NORMALIZE:
+            declared = np.array([acc["min"], acc["max"]], dtype=np.float64)
+            if np.all(np.abs(declared) <= 1.0):  # written as normalized values
+                lo, hi = lo / NORMALIZE[acc["componentType"]], hi / NORMALIZE[acc["componentType"]]
+        declared_lo, declared_hi = np.array(acc["min"], dtype=np.float64), np.array(acc["max"], dtype=np.float64)
+        eps = np.maximum(np.abs(hi - lo), 1.0) * 1e-6
+        if np.any(declared_lo > lo + eps) or np.any(declared_hi < hi - eps):
+            problems.append(f"accessor {i} min/max {acc['min']} .. {acc['max']} does not contain the data "
+                            f"{lo.tolist()} .. {hi.tolist()}")
+        elif np.any(np.maximum(lo - declared_lo, declared_hi - hi) > np.maximum(hi - lo, 1e-9) * BOUNDS_SLACK):
+            warnings.append(f"accessor {i} min/max {acc['min']} .. {acc['max']} is looser than the data "
+                            f"{lo.tolist()} .. {hi.tolist()}")
+    return problems, warnings
+
+
+def _check_glb(data):
+    problems = []
+    if len(data) % 4:
+        problems.append(f"GLB length {len(data)} is not a multiple of 4")
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_len = struct.unpack_from('<I', data, offset)[0]
+        if chunk_len % 4:
+            problems.append(f"GLB chunk at {offset} has length {chunk_len}, not padded to 4 bytes")
+        offset += 8 + chunk_len
+    return problems
+
+
+# --- Analysis ---
+
+def _drawn_meshes(gltf):
+    """[(mesh index, instances)] for every mesh the default scene draws."""
+    nodes = gltf.get("nodes", [])
+    if not gltf.get("scenes"):
+        return [(i, 1) for i in range(len(gltf.get("meshes", [])))]
+    drawn = []
+    stack = list(gltf["scenes"][gltf.get("scene", 0)].get("nodes", []))
+    while stack:
+        node = nodes[stack.pop()]
+        if "mesh" in node:
+            instancing = node.get("extensions", {}).get("EXT_mesh_gpu_instancing")
+            count = gltf["accessors"][next(iter(instancing["attributes"].values()))]["count"] if instancing else 1
+            drawn.append((node["mesh"], count))
+        stack.extend(node.get("children", []))
+    return drawn
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _base64_cost(data, repeat):
+    """(base64 share of the bytes, share of parse + decode time) of a .gltf blob."""
+    gltf = json.loads(data.decode('utf-8'))
+    uris = [b.get("uri", "") for b in gltf.get("buffers", []) + gltf.get("images", [])]
+    embedded = sum(len(uri) for uri in uris if uri.startswith("data:"))
+    if not embedded:
+        return 0.0, 0.0
+    for item in gltf.get("buffers", []) + gltf.get("images", []):
+        if item.get("uri", "").startswith("data:"):
+            item["uri"] = ""
+    stripped = json.dumps(gltf).encode('utf-8')
+
+    def decode():
+        parsed = json.loads(data.decode('utf-8'))
+        return [gltf_io.decode_data_uri(item["uri"]) for item in parsed.get("buffers", []) + parsed.get("images", [])
+                if item.get("uri", "").startswith("data:")]
+
+    full = _best_of(decode, repeat)
+    bare = _best_of(lambda: json.loads(stripped.decode('utf-8')), repeat)
+    return embedded / len(data), max(full - bare, 0.0) / full
+
+
+def analyze(path, repeat=3):
+    """Metrics, problems and warnings of one asset."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    row = {"name": os.path.basename(path), "path": path, "problems": [], "warnings": [], "bins": []}
+    problems = row["problems"]
+    problems += [p.split(": ", 1)[1] for p in dedup_buffers.validate(path)]
+    try:
+        gltf, buffers = gltf_io.load(path)
+    except (OSError, ValueError) as e:
+        problems.append(str(e))
+        return row
+
+    is_glb = data[:4] == b'glTF'
+    if is_glb:
+        problems += _check_glb(data)
+    row["file_bytes"] = len(data)
+    for buf in gltf.get("buffers", []):
+        uri = buf.get("uri", "")
+        if uri and not uri.startswith("data:"):
+            row["bins"].append(os.path.normpath(os.path.join(os.path.dirname(path), uri)))
+            if os.path.exists(row["bins"][-1]):
+                row["file_bytes"] += os.path.getsize(row["bins"][-1])
+    if problems:
+        return row
+
+    vertex_views = {gltf["accessors"][a]["bufferView"] for mesh in gltf.get("meshes", []) for prim in mesh["primitives"]
+                    for a in prim["attributes"].values() if "bufferView" in gltf["accessors"][a]}
+    problems += _check_layout(gltf, buffers, vertex_views)
+    if meshopt_codec.EXTENSION in gltf.get("extensionsUsed", []):
+        gltf, bin_data = meshopt_codec.decompress_gltf(gltf, buffers)
+        buffers = [bin_data]
+    if problems:
+        return row
+    bound_problems, row["warnings"] = _check_bounds(gltf, buffers)
+    problems += bound_problems
+
+    vertices = triangles = attribute_bytes = misses = 0
+    acmr_cache = {}
+    for mesh_index, instances in _drawn_meshes(gltf):
+        for prim in gltf["meshes"][mesh_index]["primitives"]:
+            count = gltf["accessors"][prim["attributes"]["POSITION"]]["count"]
+            if "indices" in prim:
+                key = prim["indices"]
+                if key not in acmr_cache:
+                    indices = read_accessor(gltf, buffers, key).reshape(-1)
+                    if len(indices) and int(indices.max()) >= count:
+                        problems.append(f"accessor {key} has index {int(indices.max())} >= vertex count {count}")
+                        acmr_cache[key] = (len(indices) // 3, 0.0)
+                    else:
+                        acmr_cache[key] = (len(indices) // 3, mesh_optimize.cache_stats(indices, count)[0])
+                tris, acmr = acmr_cache[key]
+            else:
+                tris, acmr = count // 3, 3.0
+            if prim.get("mode", 4) != 4:
+                tris = 0
+            vertices += count * instances
+            triangles += tris * instances
+            misses += acmr * tris * instances
+            attribute_bytes += count * instances * sum(meshopt_codec._element_size(gltf["accessors"][a])
+                                                      for a in prim["attributes"].values())
+    row.update(vertices=vertices, triangles=triangles, bytes_per_vertex=attribute_bytes / max(vertices, 1),
+               acmr=misses / max(triangles, 1))
+
+    row["images"] = {}
+    for image_path in _image_paths(path, gltf):
+        if os.path.exists(image_path):
+            row["images"][image_path] = texture_bytes(*image_info(image_path))
+    row["texture_bytes"] = sum(row["images"].values())
+    row["b64_bytes"], row["b64_time"] = (0.0, 0.0) if is_glb else _base64_cost(data, repeat)
+    return row
+
+
+def scene_totals(rows):
+    images = {}
+    for row in rows:
+        images.update(row.get("images", {}))
+    totals = {name: sum(row.get(name, 0) for row in rows) for name in ("triangles", "vertices", "file_bytes")}
+    totals["texture_bytes"] = sum(images.values())
+    return totals
+
+
+def load_budgets(path=None, asset_overrides=(), scene_overrides=()):
+    budgets = json.loads(json.dumps(DEFAULT_BUDGETS))
+    if path:
+        with open(path) as f:
+            custom = json.load(f)
+        for key in ("asset", "scene", "assets"):
+            budgets[key].update(custom.get(key, {}))
+    for overrides, key, allowed in ((asset_overrides, "asset", ASSET_METRICS),
+                                    (scene_overrides, "scene", SCENE_METRICS)):
+        for item in overrides:
+            name, _, value = item.partition("=")
+            if name not in allowed:
+                raise ValueError(f"unknown {key} budget {name!r}, expected one of {allowed}")
+            budgets[key][name] = float(value)
+    return budgets
+
+
+def check_budgets(rows, totals, budgets):
+    """List of budget violations."""
+    over = []
+    for row in rows:
+        limits = dict(budgets["asset"], **budgets["assets"].get(os.path.splitext(row["name"])[0], {}))
+        for name in ASSET_METRICS:
+            if name in limits and name in row and row[name] > limits[name]:
+                over.append(f"{row['name']}: {name} {row[name]:g} > {limits[name]:g}")
+    for name in SCENE_METRICS:
+        if name in budgets["scene"] and totals[name] > budgets["scene"][name]:
+            over.append(f"scene: {name} {totals[name]:g} > {budgets['scene'][name]:g}")
+    return over
+
+
+def find_assets(models_dir=MODELS_DIR):
+    return sorted(glob.glob(os.path.join(models_dir, "*.gltf")) + glob.glob(os.path.join(models_dir, "*.glb")))
+
+
+def orphan_bins(models_dir, rows):
+    referenced = {b for row in rows for b in row["bins"]}
+    return [p for p in sorted(glob.glob(os.path.join(models_dir, "*.bin"))) if os.path.normpath(p) not in referenced]
+
+
+# --- Self-check ---
+
+def _triangle_glb(path, pad):
+    """A one-triangle GLB whose buffer is 42 bytes; ``pad`` extra zero bytes in the BIN chunk."""
+    mesh = geometry.Mesh(geometry._f32([[0, 0, 0], [1, 0, 0], [0, 1, 0]]), None, None, np.arange(3, dtype=np.uint32))
+    gltf = {"asset": {"version": "2.0"}, "scene": 0, "scenes": [{"nodes": [0]}], "nodes": [{"mesh": 0}]}
+    blob = bytearray()
+    gltf_io.add_mesh(gltf, blob, mesh)
+    gltf["buffers"] = [{"byteLength": len(blob)}]
+    json_data = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_data += b' ' * (-len(json_data) % 4)
+    bin_data = bytes(blob) + b'\x00' * pad
+    chunks = (struct.pack('<II', len(json_data), gltf_io.CHUNK_JSON) + json_data
+              + struct.pack('<II', len(bin_data), gltf_io.CHUNK_BIN) + bin_data)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<III', gltf_io.GLB_MAGIC, gltf_io.GLB_VERSION, 12 + len(chunks)) + chunks)
+    return path
+
+
+def self_check():
+    """Run ``analyze`` on assets with known verdicts; returns a list of failures (empty when all pass)."""
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # The BIN chunk may be up to 3 bytes longer than byteLength (its 4-byte padding) ...
+        padded = _triangle_glb(os.path.join(tmp, "padded.glb"), 2)
+        row = analyze(padded, repeat=1)
+        if row["problems"] or row.get("triangles") != 1:
+            failures.append(f"padded GLB: {row['problems'] or 'not analyzed'}")
+        # ... but not longer, nor left unpadded
+        for pad, reason in ((6, "over-long BIN chunk"), (0, "BIN chunk not padded to 4 bytes")):
+            if not analyze(_triangle_glb(os.path.join(tmp, f"bad{pad}.glb"), pad), repeat=1)["problems"]:
+                failures.append(f"{reason} not reported")
+        gltf, _ = gltf_io.load(padded)
+        gltf, bin_data = gltf_io.parse_glb(gltf_io.glb_bytes(gltf, b'\x01' * 42))
+        if len(bin_data) != 42 or gltf["buffers"][0]["byteLength"] != 42:
+            failures.append(f"glb_bytes / parse_glb round trip: {len(bin_data)} B, "
+                            f"byteLength {gltf['buffers'][0]['byteLength']}")
+    return failures
+
+
+def report(rows, totals):
+    lines = [f"{'asset':<22} {'verts':>7} {'tris':>7} {'B/vert':>6} {'ACMR':>5} {'file':>10} {'texture':>11} "
+             f"{'b64 B':>6} {'b64 t':>6}"]
+    for row in rows:
+        if "triangles" not in row:
+            lines.append(f"{row['name']:<22} (not analyzed)")
+            continue
+        lines.append(f"{row['name']:<22} {row['vertices']:>7} {row['triangles']:>7} {row['bytes_per_vertex']:>6.1f} "
+                     f"{row['acmr']:>5.2f} {row['file_bytes']:>10} {row['texture_bytes']:>11} "
+                     f"{100 * row['b64_bytes']:>5.1f}% {100 * row['b64_time']:>5.1f}%")
+    lines.append(f"{'scene':<22} {totals['vertices']:>7} {totals['triangles']:>7} {'':>6} {'':>5} "
+                 f"{totals['file_bytes']:>10} {totals['texture_bytes']:>11}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze the glTF assets and enforce performance budgets.")
+    parser.add_argument("files", nargs="*", help="defaults to every .gltf / .glb in " + MODELS_DIR)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--budgets", help="JSON file overriding DEFAULT_BUDGETS")
+    parser.add_argument("--budget", action="append", default=[], metavar="NAME=VALUE",
+                        help=f"per-asset limit ({', '.join(ASSET_METRICS)})")
+    parser.add_argument("--scene-budget", action="append", default=[], metavar="NAME=VALUE",
+                        help=f"scene-wide limit ({', '.join(SCENE_METRICS)})")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs for the base64 decode share")
+    parser.add_argument("--self-check", action="store_true", help="run the validator's regression cases and exit")
+    args = parser.parse_args()
+    if args.self_check:
+        failures = self_check()
+        for failure in failures:
+            print("ERROR:", failure)
+        print("self-check " + ("failed" if failures else "passed"))
+        raise SystemExit(1 if failures else 0)
+    try:
+        budgets = load_budgets(args.budgets, args.budget, args.scene_budget)
+    except ValueError as e:
+        parser.error(str(e))
+
+    rows = [analyze(path, args.repeat) for path in (args.files or find_assets(args.models_dir))]
+    totals = scene_totals(rows)
+    print(report(rows, totals))
+    errors = [f"{row['name']}: {p}" for row in rows for p in row["problems"]]
+    warnings = [f"{row['name']}: {w}" for row in rows for w in row["warnings"]]
+    if not args.files:
+        warnings += [f"{os.path.basename(p)}: not referenced by any asset" for p in orphan_bins(args.models_dir, rows)]
+    over = check_budgets(rows, totals, budgets)
+    for w in warnings:
+        print("WARNING:", w)
+    for p in errors:
+        print("ERROR:", p)
+    for o in over:
+        print("OVER BUDGET:", o)
+    raise SystemExit(1 if errors or over else 0)
@@ -0,0 +1,376 @@
+"""
+Planet texture atlas: one or two images instead of one texture per body.
+
+Usage: python tools/atlas.py [--mode uv|transform] [--gutter 16] [--max-size 4096] [--ktx2 [--zstd]] [--dry-run]
+
+Each body gets a power-of-two slot of its textures.py target size (same
+on-screen sizing) and the slots are guillotine-packed, largest first, into
+the smallest power-of-two atlas that holds them all; what does not fit in a
+``--max-size`` square spills into a second atlas. Power-of-two 2:1 slots
+tile almost perfectly.
+
+Gutters are mip-safe: the texture is resampled (in linear light) to its
+slot minus ``gutter`` texels on each side, and slots sit on a grid aligned
+to their own size, so down to mip level log2(gutter) no 2x2 box footprint
+straddles two tiles and bilinear filtering still finds at least one gutter
+texel. Gutters repeat the tile's own edge: columns wrap
+around (the longitude seam is continuous), rows clamp (poles). The
+optional KTX2 atlas (a side output in build/textures, like the textures.py
+KTX2s: the glTFs sample the JPEG atlas) stops its mip chain at that level; runtime-generated
+mips for the JPEG atlas go further and blend tiles at the smallest sizes.
+
+Bodies then sample their own region, either by rewriting TEXCOORD_0
+(``--mode uv``, works everywhere; the transform applied is recorded in the
+primitive's extras so reruns start from the original UVs) or through a
+required KHR_texture_transform on each texture reference (``--mode
+transform``, leaves shared geometry buffers untouched).
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+import bodies
+import gltf_io
+import ktx2
+import meshopt_codec
+import textures
+
+MODELS_DIR = os.path.join(bodies.ROOT, "app/src/main/assets/models")
+MODES = ("uv", "transform")
+TRANSFORM = "KHR_texture_transform"
+DEFAULT_GUTTER = 16
+DEFAULT_MAX_SIZE = 4096
+ATLAS_STEM = "planets_atlas"
+
+_COMPONENT_DTYPE = {5121: np.uint8, 5123: np.dtype('<u2'), 5126: np.dtype('<f4')}
+
+
+# --- Packing ---
+
+def _guillotine_pack(slots, width, height):
+    """Place (w, h) slots, largest first, into free rectangles; returns {name: (x, y)} for the ones that fit."""
+    free = [(0, 0, width, height)]
+    placed = {}
+    for name, (w, h) in slots:
+        fits = [r for r in free if r[2] >= w and r[3] >= h]
+        if not fits:
+            continue
+        rect = min(fits, key=lambda r: (r[2] * r[3], r[1], r[0]))
+        free.remove(rect)
+        x, y, fw, fh = rect
+        placed[name] = (x, y)
+        # Split along the shorter leftover so the larger free rectangle stays whole.
+        if fw - w < fh - h:
+            free += [(x + w, y, fw - w, h), (x, y + h, fw, fh - h)]
+        else:
+            free += [(x + w, y, fw - w, fh), (x, y + h, w, fh - h)]
+        free = [r for r in free if r[2] > 0 and r[3] > 0]
+    return placed
+
+
+def _candidate_sizes(max_size):
+    sizes = [(1 << a, 1 << b) for a in range(6, max_size.bit_length()) for b in range(6, max_size.bit_length())]
+    # Smallest area first; among equals prefer wide (equirect tiles are 2:1) and then square-ish.
+    return sorted(sizes, key=lambda s: (s[0] * s[1], s[0] < s[1], abs(s[0] - s[1])))
+
+
+def pack(slots, max_size=DEFAULT_MAX_SIZE):
+    """Pack power-of-two slots {name: (w, h)}; returns a list of atlases {size, slots: {name: (x, y, w, h)}}.
+
+    Everything goes into the smallest power-of-two atlas that holds it all;
+    failing that, a ``max_size`` square is filled and the rest spills over.
+    """
+    too_big = [name for name, (w, h) in slots.items() if w > max_size or h > max_size]
+    if too_big:
+        raise ValueError(f"{', '.join(too_big)} larger than a {max_size} atlas")
+    remaining = dict(slots)
+    atlases = []
+    while remaining:
+        ordered = sorted(remaining.items(), key=lambda item: (-item[1][0] * item[1][1], -item[1][1], item[0]))
+        for width, height in _candidate_sizes(max_size):
+            placed = _guillotine_pack(ordered, width, height)
+            if len(placed) == len(ordered):
+                break
+        else:
+            width = height = max_size
+            placed = _guillotine_pack(ordered, width, height)
+        atlases.append({"size": (width, height),
+                        "slots": {name: (x, y) + remaining[name] for name, (x, y) in placed.items()}})
+        for name in placed:
+            del remaining[name]
+    return atlases
+
+
+def tiles(atlas, gutter):
+    """{name: (x, y, w, h)} of each tile's content: its slot inset by ``gutter`` on every side."""
+    return {name: (x + gutter, y + gutter, w - 2 * gutter, h - 2 * gutter)
+            for name, (x, y, w, h) in atlas["slots"].items()}
+
+
+# --- Image ---
+
+def _fill_gutters(image, x, y, w, h, gutter):
+    """Extend the tile at (x, y) into its gutter: wrap horizontally, clamp vertically."""
+    rows = np.clip(np.arange(y - gutter, y + h + gutter), y, y + h - 1)
+    cols = x + (np.arange(x - gutter, x + w + gutter) - x) % w
+    image[y - gutter:y + h + gutter, x - gutter:x + w + gutter] = image[rows][:, cols]
+
+
+def render(atlas, linear_tiles, gutter):
+    """Linear float32 atlas image with every tile (already at its content size) and gutter filled."""
+    width, height = atlas["size"]
+    image = np.zeros((height, width, 3), dtype=np.float32)
+    for name, (x, y, w, h) in tiles(atlas, gutter).items():
+        image[y:y + h, x:x + w] = linear_tiles[name]
+        _fill_gutters(image, x, y, w, h, gutter)
+    return image
+
+
+def mip_safe_levels(atlas, gutter):
+    """Number of levels (0..log2(gutter)) before tiles start to blend, capped by the smallest tile."""
+    smallest = min(min(w, h) for _, _, w, h in tiles(atlas, gutter).values())
+    return min(int(gutter).bit_length(), int(smallest).bit_length())
+
+
+def region(atlas, name, gutter):
+    """(offset, scale) in atlas UV space of a tile, for uv' = offset + scale * uv."""
+    width, height = atlas["size"]
+    x, y, w, h = tiles(atlas, gutter)[name]
+    return [x / width, y / height], [w / width, h / height]
+
+
+# --- glTF ---
+
+def _accessor_view(gltf, blob, index):
+    """Writable (count, n) NumPy view of an accessor inside ``blob`` (a bytearray)."""
+    accessor = gltf["accessors"][index]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    dtype = np.dtype(_COMPONENT_DTYPE[accessor["componentType"]])
+    n = meshopt_codec.TYPE_COUNT[accessor["type"]]
+    stride = view.get("byteStride", dtype.itemsize * n)
+    offset = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    return np.ndarray((accessor["count"], n), dtype, buffer=blob, offset=offset, strides=(stride, dtype.itemsize))
+
+
+def _transform_uvs(gltf, blob, index, offset, scale, inverse=False):
+    accessor = gltf["accessors"][index]
+    data = _accessor_view(gltf, blob, index)
+    uv = data.astype(np.float64)
+    normalized = accessor.get("normalized", False)
+    limit = float(np.iinfo(data.dtype).max) if normalized else 1.0
+    uv /= limit
+    uv = (uv - offset) / scale if inverse else uv * scale + offset
+    data[:] = np.round(uv * limit) if normalized else uv
+    if "min" in accessor:
+        # Bounds are in stored units; the normalized flag does not apply to them.
+        accessor["min"] = data.min(axis=0).tolist()
+        accessor["max"] = data.max(axis=0).tolist()
+
+
+def _texture_infos(gltf):
+    for material in gltf.get("materials", []):
+        for key, value in material.items():
+            if key.endswith("Texture") and isinstance(value, dict):
+                yield value
+        for key, value in material.get("pbrMetallicRoughness", {}).items():
+            if key.endswith("Texture") and isinstance(value, dict):
+                yield value
+
+
+def _remapped(gltf):
+    return any("atlasTransform" in p.get("extras", {}) for m in gltf.get("meshes", []) for p in m["primitives"])
+
+
+def apply(gltf, blob, image_uri, offset, scale, mode="uv"):
+    """Point every texture at the atlas and remap UVs into the body's region; modifies ``gltf`` and ``blob``.
+
+    ``blob`` (a bytearray holding buffer 0) may be None in transform mode when no earlier uv remap is recorded.
+    """
+    # Undo a previous uv-mode remap first, so reruns and mode switches start from the original UVs.
+    # An identical remap is kept as is (undo + redo would not round-trip exactly in float32).
+    undone, kept = set(), set()
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh["primitives"]:
+            previous = primitive.get("extras", {}).pop("atlasTransform", None)
+            uv = primitive["attributes"].get("TEXCOORD_0")
+            if mode == "uv" and previous == {"offset": offset, "scale": scale}:
+                kept.add(uv)
+            elif previous is not None and uv is not None and uv not in undone:
+                _transform_uvs(gltf, blob, uv, np.array(previous["offset"]), np.array(previous["scale"]),
+                               inverse=True)
+                undone.add(uv)
+            if "extras" in primitive and not primitive["extras"]:
+                del primitive["extras"]
+
+    gltf["images"] = [{"uri": image_uri}]
+    for texture in gltf.get("textures", []):
+        texture["source"] = 0
+    for key in ("extensionsUsed", "extensionsRequired"):
+        if key in gltf:
+            gltf[key] = [e for e in gltf[key] if e != TRANSFORM]
+            if not gltf[key]:
+                del gltf[key]
+
+    for info in _texture_infos(gltf):
+        info.get("extensions", {}).pop(TRANSFORM, None)
+        if "extensions" in info and not info["extensions"]:
+            del info["extensions"]
+        if mode == "transform":
+            info.setdefault("extensions", {})[TRANSFORM] = {"offset": offset, "scale": scale}
+
+    if mode == "transform":
+        for key in ("extensionsUsed", "extensionsRequired"):
+            gltf.setdefault(key, []).append(TRANSFORM)
+        return gltf
+
+    done = set()
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh["primitives"]:
+            uv = primitive["attributes"].get("TEXCOORD_0")
+            if uv is None:
+                continue
+            if uv not in done and uv not in kept:
+                _transform_uvs(gltf, blob, uv, np.array(offset), np.array(scale))
+                done.add(uv)
+            primitive.setdefault("extras", {})["atlasTransform"] = {"offset": offset, "scale": scale}
+    return gltf
+
+
+def rewrite_gltf(path, image_uri, offset, scale, mode="uv"):
+    """Apply the atlas to a .gltf/.glb in place; returns True if the file changed."""
+    with open(path, 'rb') as f:
+        original = f.read()
+    fmt = "glb" if original[:4] == b'glTF' else "gltf"
+    if fmt == "glb":
+        gltf, bin_data = gltf_io.parse_glb(original)
+    else:
+        gltf = json.loads(original.decode('utf-8'))
+    if mode == "transform" and not _remapped(gltf):
+        # Only the JSON changes; geometry (possibly shared or meshopt-compressed) stays byte-identical.
+        gltf = apply(gltf, None, image_uri, offset, scale, mode)
+        if fmt == "glb":
+            return gltf_io.write_if_changed(path, gltf_io.glb_bytes(gltf, bin_data))
+        return gltf_io.write_if_changed(
+            path, json.dumps(gltf, indent=gltf_io.json_indent(original.decode('utf-8'))).encode('utf-8'))
+
+    gltf, buffers = gltf_io.load(path)
+    compressed = meshopt_codec.EXTENSION in gltf.get("extensionsUsed", [])
+    if fmt == "gltf" and any(
+            not b.get("uri", "data:").startswith("data:") for b in gltf.get("buffers", []) if "uri" in b):
+        raise ValueError(f"{path}: remapping UVs would rewrite an external (possibly shared) buffer; "
+                         "use --mode transform on the original asset")
+    if compressed:
+        gltf, merged = meshopt_codec.decompress_gltf(gltf, buffers)
+    else:
+        gltf, merged = gltf_io.merge_buffers(gltf, buffers)
+    blob = bytearray(merged)
+    gltf = apply(gltf, blob, image_uri, offset, scale, mode)
+    if compressed:
+        gltf, blob, _ = meshopt_codec.compress_gltf(gltf, bytes(blob))
+    if fmt == "glb":
+        data = gltf_io.glb_bytes(gltf, bytes(blob))
+    else:
+        gltf = dict(gltf)
+        gltf["buffers"] = [{"byteLength": len(blob), "uri": gltf_io.data_uri(bytes(blob))}] + gltf["buffers"][1:]
+        data = json.dumps(gltf, indent=gltf_io.json_indent(original.decode('utf-8'))).encode('utf-8')
+    return gltf_io.write_if_changed(path, data)
+
+
+# --- Driver ---
+
+def build(models_dir=MODELS_DIR, mode="uv", gutter=DEFAULT_GUTTER, max_size=DEFAULT_MAX_SIZE,
+          scale=None, quality=92, write_ktx2=False, zstd_level=None, dry_run=False, ktx2_dir=None):
+    """Pack every body texture, write the atlas image(s) and rewrite the body glTFs; returns a stats dict.
+
+    ``scale`` defaults to textures.DEFAULT_SCALE, ``ktx2_dir`` to textures.KTX2_DIR.
+    """
+    if gutter < 1 or gutter & (gutter - 1):
+        raise ValueError("gutter must be a power of two")
+    widths = textures.target_widths(textures.DEFAULT_SCALE if scale is None else scale)
+    sources, slots, source_bytes = {}, {}, 0
+    for body in bodies.load():
+        path = os.path.join(models_dir, f"{body['key']}_texture.jpg")
+        if not os.path.exists(path):
+            continue
+        pixels = textures.load_image(path)
+        source_bytes += os.path.getsize(path)
+        height, width = pixels.shape[:2]
+        slot_w = min(widths[f"{body['key']}_texture"][0], textures._pow2_floor(width))
+        slot = (slot_w, max(slot_w * textures._pow2_floor(height) // textures._pow2_floor(width), 1))
+        if min(slot) <= 2 * gutter:
+            raise ValueError(f"{body['key']}: a {slot[0]}x{slot[1]} tile has no room for {gutter} texel gutters")
+        sources[body["key"]] = pixels
+        slots[body["key"]] = slot
+    atlases = pack(slots, max_size)
+
+    stats = {"bodies": len(slots), "source_bytes": source_bytes, "atlases": []}
+    for i, atlas in enumerate(atlases):
+        stem = ATLAS_STEM if len(atlases) == 1 else f"{ATLAS_STEM}_{i}"
+        width, height = atlas["size"]
+        content = tiles(atlas, gutter)
+        entry = {"file": f"{stem}.jpg", "size": atlas["size"], "bodies": sorted(content),
+                 "utilization": sum(w * h for _, _, w, h in content.values()) / (width * height),
+                 "slot_utilization": sum(w * h for _, _, w, h in atlas["slots"].values()) / (width * height),
+                 "mip_levels": mip_safe_levels(atlas, gutter)}
+        stats["atlases"].append(entry)
+        if dry_run:
+            continue
+        # Each tile: on-screen size (box halving in linear light), then inset by the gutter.
+        linear = {key: textures.resize_linear(textures.resample(sources[key], atlas["slots"][key][2]), w, h)
+                  for key, (_, _, w, h) in content.items()}
+        image = render(atlas, linear, gutter)
+        data = textures.encode_jpeg(textures.to_srgb(image), quality)
+        gltf_io.write_if_changed(os.path.join(models_dir, entry["file"]), data)
+        entry["bytes"] = len(data)
+        if write_ktx2:
+            levels = textures.mip_chain(image, "box")[:entry["mip_levels"]]
+            data = ktx2.encode([textures.to_srgb(level) for level in levels], zstd_level=zstd_level)
+            textures.write_ktx2(stem, data, ktx2_dir or textures.KTX2_DIR)
+            entry["ktx2_bytes"] = len(data)
+        for key in content:
+            offset, scale_uv = region(atlas, key, gutter)
+            for ext in (".gltf", ".glb"):
+                path = os.path.join(models_dir, key + ext)
+                if os.path.exists(path):
+                    rewrite_gltf(path, entry["file"], offset, scale_uv, mode)
+    return stats
+
+
+def report(stats):
+    lines = []
+    for entry in stats["atlases"]:
+        width, height = entry["size"]
+        line = (f"{entry['file']:<22} {width}x{height}, {len(entry['bodies'])} bodies, "
+                f"{100 * entry['utilization']:.1f}% texels used ({100 * entry['slot_utilization']:.1f}% incl. gutters), "
+                f"mip-safe to level {entry['mip_levels'] - 1}")
+        if "bytes" in entry:
+            line += f", {entry['bytes']} B"
+        if "ktx2_bytes" in entry:
+            line += f" (+{entry['ktx2_bytes']} B ktx2)"
+        lines.append(line)
+    total = sum(e.get("bytes", 0) for e in stats["atlases"])
+    lines.append(f"{stats['bodies']} textures ({stats['source_bytes']} B) -> {len(stats['atlases'])} atlas image(s)"
+                 + (f" ({total} B)" if total else ""))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack the body textures into an atlas and remap their UVs.")
+    parser.add_argument("--mode", choices=MODES, default="uv",
+                        help="uv: rewrite TEXCOORD_0, transform: KHR_texture_transform per texture reference")
+    parser.add_argument("--gutter", type=int, default=DEFAULT_GUTTER, help="texels around each tile (power of two)")
+    parser.add_argument("--max-size", type=int, default=DEFAULT_MAX_SIZE)
+    parser.add_argument("--scale", type=float, default=textures.DEFAULT_SCALE,
+                        help="scene scale used to size each tile (see textures.py)")
+    parser.add_argument("--quality", type=int, default=92, help="JPEG quality of the atlas")
+    parser.add_argument("--ktx2", action="store_true",
+                        help="also write a mip-safe KTX2 atlas to build/textures (side output)")
+    parser.add_argument("--zstd", type=int, nargs="?", const=10, metavar="LEVEL")
+    parser.add_argument("--dry-run", action="store_true", help="only report the packing")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    args = parser.parse_args()
+    print(report(build(args.models_dir, args.mode, args.gutter, args.max_size, args.scale, args.quality,
+                       args.ktx2, args.zstd, args.dry_run)))
@@ -0,0 +1,314 @@
+"""
+Bake the orrery's motion into a looping, keyframed solar-system glTF.
+
+Usage: python tools/bake_orbits.py [--duration 360] [--tolerance 0.05] [--sample-rate 30] [--pivots]
+                                   [--format glb]
+
+SolarSystemScene.calculatePlanetPose recomputes every planet's orbit
+position and tilt * spin quaternion on each frame. This tool evaluates the
+same formulas (speeds, radii and tilts parsed from SolarSystemRepository.kt
+via bodies.py) and writes solar_system.gltf, one asset whose ``animations``
+drive the motion so the runtime's animator can play it instead:
+
+  SolarSystem (scale 0.2, the Sun entity's scale)
+    Sun         rotation channel (spin), sun mesh
+      <planet>  translation (orbit) + rotation (tilt * spin) channels
+    OrbitRings  static merged rings (generate_ring.py --merged)
+
+As in the app, the planets are children of the spinning Sun; the rings sit
+beside it because the app counter-rotates them to stay still. All bodies
+share one sphere mesh (same accessors, one material per texture).
+
+A glTF animation loops as a whole, so every channel has to complete a whole
+number of cycles in ``--duration`` seconds: each orbit and spin speed is
+rounded to the nearest such rate and the deviation is reported (360 s fits
+every integer deg/s spin exactly).
+
+Keyframes come from a ``--sample-rate`` Hz evaluation, greedily reduced:
+each key reaches as far ahead as the glTF LINEAR interpolation (lerp for
+translation, shortest-path slerp for rotation) stays within ``--tolerance``
+degrees of every sample in between. Rotation error is the angle between
+the quaternions; translation error is the distance divided by the orbit
+radius, i.e. the arc it spans on the orbit. A constant spin about a fixed
+axis is exact under slerp, but keys half a turn apart have a zero dot
+product and no shortest path, so rotation keys are at most
+``MAX_KEY_TURN_DEG`` apart (every third of a turn for a steady spin), with
+neighbouring quaternions in the same hemisphere.
+
+A circular orbit is not exact under lerp, and the chords cost thousands of
+translation keys over a loop. ``--pivots`` instead hangs each planet from
+an ``<planet>_orbit`` node turning about Y and an ``<planet>_arm`` node at
+the orbit radius turning back, which gives the same poses with rotation keys
+only, at a fraction of the size.
+"""
+
+import argparse
+import copy
+import math
+import os
+import sys
+
+import numpy as np
+
+import bodies
+import gltf_io
+
+sys.path.insert(0, bodies.ROOT)
+import create_sphere_fixed
+import generate_ring
+
+MODELS_DIR = os.path.join(bodies.ROOT, "app/src/main/assets/models")
+OUTPUT_NAME = "solar_system.gltf"
+GENERATOR = "PocketOrrery Orbit Baker"
+
+# SolarSystemScene constants
+ORBIT_RATE = 0.3  # orbitAngle = orbitTime * planet.orbitSpeed * 0.3f (radians)
+SUN_SCALE = 0.2  # 0.2f * globalScale * sunSwellFactor at rest
+
+# Largest rotation between neighbouring rotation keys; keeps their dot >= cos(60) = 0.5
+MAX_KEY_TURN_DEG = 120.0
+
+
+def planet_scale(radius):
+    """baseSize in SolarSystemScene: the planet's scale inside the Sun entity."""
+    return (0.02 + radius * 0.15) / 0.2
+
+
+# --- Motion ---
+
+def looped_rate(rate, duration, period):
+    """``rate`` rounded so that whole cycles of ``period`` fit in ``duration``."""
+    cycles = round(rate * duration / period)
+    return cycles * period / duration, cycles
+
+
+def axis_angle(axis, degrees):
+    """(N, 4) glTF (x, y, z, w) quaternions about a fixed axis, like Quaternion.fromAxisAngle."""
+    half = np.radians(degrees) / 2.0
+    q = np.zeros((len(half), 4))
+    q[:, :3] = np.sin(half)[:, None] * np.asarray(axis, dtype=np.float64)
+    q[:, 3] = np.cos(half)
+    return q
+
+
+def quat_multiply(a, b):
+    """Hamilton product of (..., 4) xyzw quaternions: apply b, then a."""
+    ax, ay, az, aw = np.moveaxis(a, -1, 0)
+    bx, by, bz, bw = np.moveaxis(b, -1, 0)
+    return np.stack([aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw,
+                     aw * bw - ax * bx - ay * by - az * bz], axis=-1)
+
+
+def body_rotation(body, spin_rate, times):
+    """tilt (about Z) * spin (about Y), as calculatePlanetPose builds it."""
+    tilt = axis_angle((0.0, 0.0, 1.0), np.full(len(times), body["axialTilt"]))
+    return quat_multiply(tilt, axis_angle((0.0, 1.0, 0.0), times * spin_rate))
+
+
+def orbit_translation(distance, orbit_rate, times):
+    angle = times * orbit_rate
+    return np.stack([np.cos(angle) * distance, np.zeros_like(angle), np.sin(angle) * distance], axis=-1)
+
+
+# --- Keyframe reduction ---
+
+def lerp(v0, v1, f):
+    return v0 + (v1 - v0) * f[:, None]
+
+
+def slerp(q0, q1, f):
+    """Shortest-path slerp, as the glTF spec defines LINEAR rotation sampling."""
+    dot = float(np.dot(q0, q1))
+    if dot < 0.0:
+        q1, dot = -q1, -dot
+    if dot > 0.9995:
+        q = lerp(q0, q1, f)
+        return q / np.linalg.norm(q, axis=1, keepdims=True)
+    theta = math.acos(dot)
+    return (np.sin((1.0 - f) * theta)[:, None] * q0 + np.sin(f * theta)[:, None] * q1) / math.sin(theta)
+
+
+def rotation_error_deg(a, b):
+    return np.degrees(2.0 * np.arccos(np.clip(np.abs(np.einsum('ij,ij->i', a, b)), 0.0, 1.0)))
+
+
+def reduce_keys(times, values, interpolate, error_deg, tolerance_deg, max_step_deg=None):
+    """Indices of the samples kept as keys (first and last always).
+
+    From each key, the next one is the farthest sample whose interpolated
+    segment stays within ``tolerance_deg`` of all samples in between
+    (found by doubling, then bisection) and, with ``max_step_deg``, whose
+    own error from the key stays within that.
+    """
+    def fits(i, j):
+        if max_step_deg is not None and error_deg(values[i:i + 1], values[j:j + 1])[0] > max_step_deg:
+            return False
+        if j - i < 2:
+            return True
+        f = (times[i + 1:j] - times[i]) / (times[j] - times[i])
+        return error_deg(interpolate(values[i], values[j], f), values[i + 1:j]).max() <= tolerance_deg
+
+    last = len(times) - 1
+    keys = [0]
+    i = 0
+    while i < last:
+        step = 1
+        while i + step * 2 <= last and fits(i, i + step * 2):
+            step *= 2
+        lo, hi = i + step, min(i + step * 2, last + 1)  # lo fits, hi does not (or is past the end)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if fits(i, mid):
+                lo = mid
+            else:
+                hi = mid
+        keys.append(lo)
+        i = lo
+    return np.array(keys)
+
+
+# --- glTF ---
+
+def same_hemisphere(quaternions):
+    """Flip quaternion signs so each one is in the hemisphere of the one before."""
+    q = np.array(quaternions)
+    flips = np.cumsum(np.einsum('ij,ij->i', q[1:], q[:-1]) < 0.0) % 2
+    q[1:][flips == 1] *= -1.0
+    return q
+
+
+def _add_channel(gltf, blob, animation, node, path, times, values):
+    times = np.ascontiguousarray(times, dtype=np.float32)
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    source = gltf_io.append_accessor(gltf, gltf_io.append_view(gltf, blob, times), 5126, len(times), "SCALAR",
+                                     min=[float(times[0])], max=[float(times[-1])])
+    output = gltf_io.append_accessor(gltf, gltf_io.append_view(gltf, blob, values), 5126, len(values),
+                                     "VEC3" if path == "translation" else "VEC4")
+    animation["samplers"].append({"input": source, "output": output, "interpolation": "LINEAR"})
+    animation["channels"].append({"sampler": len(animation["samplers"]) - 1, "target": {"node": node, "path": path}})
+
+
+def bake(duration=360.0, tolerance_deg=0.05, sample_rate=30.0, pivots=False, ring_segments=64):
+    """Return (gltf, bin_data, stats) for the looping solar-system scene."""
+    everything = bodies.load()
+    sun = next(b for b in everything if b["orbitDistance"] == 0)
+    planets = [b for b in everything if b["orbitDistance"] > 0]
+    times = np.linspace(0.0, duration, int(round(duration * sample_rate)) + 1)
+
+    gltf = {"asset": {"version": "2.0", "generator": GENERATOR}, "scene": 0, "scenes": [{"nodes": [0]}],
+            "nodes": [], "materials": [], "textures": [], "images": []}
+    blob = bytearray()
+
+    sphere_mesh = gltf_io.add_mesh(gltf, blob, create_sphere_fixed.generate_sphere_data(0.5, 64, 32), name="Sphere")
+    primitive = gltf["meshes"][sphere_mesh]["primitives"][0]
+
+    def body_mesh(body):
+        index = len(gltf["materials"])
+        material = copy.deepcopy(create_sphere_fixed.PLANET_MATERIAL)
+        material["name"] = body["key"]
+        material["pbrMetallicRoughness"]["baseColorTexture"]["index"] = index
+        material["emissiveTexture"]["index"] = index
+        gltf["materials"].append(material)
+        gltf["textures"].append({"source": index})
+        gltf["images"].append({"uri": f"{body['key']}_texture.jpg"})
+        if index == 0:
+            primitive["material"] = 0
+            gltf["meshes"][sphere_mesh]["name"] = body["key"]
+            return sphere_mesh
+        gltf["meshes"].append({"name": body["key"], "primitives": [dict(primitive, material=index)]})
+        return len(gltf["meshes"]) - 1
+
+    ring_mesh = generate_ring.generate_merged_rings(generate_ring.orbit_radii(), ring_segments)._replace(uvs=None)
+    gltf["materials"].append(generate_ring.RING_MATERIAL)
+    rings = gltf_io.add_mesh(gltf, blob, ring_mesh, material=len(gltf["materials"]) - 1, name="OrbitRings")
+
+    gltf["nodes"] = [
+        {"name": "SolarSystem", "scale": [SUN_SCALE] * 3, "children": [1, 2]},
+        {"name": "Sun", "mesh": body_mesh(sun), "children": []},
+        {"name": "OrbitRings", "mesh": rings},
+    ]
+    animation = {"name": "Orbits", "channels": [], "samplers": []}
+    stats = {"duration": duration, "samples": len(times), "channels": []}
+
+    def channel(node, label, path, values, interpolate, error_deg):
+        rotation = path == "rotation"
+        keys = reduce_keys(times, values, interpolate, error_deg, tolerance_deg,
+                           MAX_KEY_TURN_DEG if rotation else None)
+        values = values[keys]
+        if rotation:
+            values = same_hemisphere(values).astype(np.float32)
+            dots = np.einsum('ij,ij->i', values[1:], values[:-1])
+            assert (dots > 0.0).all(), f"{label}: adjacent rotation keys with dot {dots.min():.3f}"
+        _add_channel(gltf, blob, animation, node, path, times[keys], values)
+        stats["channels"].append({"name": label, "path": path, "keys": len(keys)})
+
+    def spin(body, node):
+        rate, cycles = looped_rate(body["rotationSpeed"], duration, 360.0)
+        if cycles:
+            channel(node, body["key"], "rotation", body_rotation(body, rate, times), slerp, rotation_error_deg)
+        else:
+            gltf["nodes"][node]["rotation"] = body_rotation(body, 0.0, times[:1])[0].tolist()
+        return {"name": body["key"], "kind": "spin", "rate": body["rotationSpeed"], "baked": rate}
+
+    stats["rates"] = [spin(sun, 1)]
+    for planet in planets:
+        distance = planet["orbitDistance"] * generate_ring.ORBIT_SCALE
+        rate, _ = looped_rate(planet["orbitSpeed"] * ORBIT_RATE, duration, 2.0 * math.pi)
+        node = len(gltf["nodes"])
+        gltf["nodes"][1]["children"].append(node)
+        if pivots:
+            # the orbit angle turns -rate about Y; the arm turns it back so tilt * spin stays put
+            gltf["nodes"].append({"name": f"{planet['key']}_orbit", "children": [node + 1]})
+            gltf["nodes"].append({"name": f"{planet['key']}_arm", "translation": [distance, 0.0, 0.0],
+                                  "children": [node + 2]})
+            turn = np.degrees(times * rate)
+            channel(node, f"{planet['key']}_orbit", "rotation", axis_angle((0.0, 1.0, 0.0), -turn), slerp,
+                    rotation_error_deg)
+            channel(node + 1, f"{planet['key']}_arm", "rotation", axis_angle((0.0, 1.0, 0.0), turn), slerp,
+                    rotation_error_deg)
+            node += 2
+        gltf["nodes"].append({"name": planet["key"], "mesh": body_mesh(planet),
+                              "scale": [planet_scale(planet["radius"])] * 3})
+        if not pivots:
+            channel(node, planet["key"], "translation", orbit_translation(distance, rate, times), lerp,
+                    lambda a, b, r=distance: np.degrees(np.linalg.norm(a - b, axis=1) / r))
+        stats["rates"].append({"name": planet["key"], "kind": "orbit", "rate": planet["orbitSpeed"] * ORBIT_RATE,
+                               "baked": rate})
+        stats["rates"].append(spin(planet, node))
+
+    gltf["animations"] = [animation]
+    gltf["buffers"] = [{"byteLength": len(blob)}]
+    stats["keys"] = sum(c["keys"] for c in stats["channels"])
+    return gltf, bytes(blob), stats
+
+
+def report(stats):
+    channels = len(stats["channels"])
+    lines = [f"{channels} channels, {stats['keys']} keys from {stats['samples'] * channels} samples "
+             f"({stats['duration']:g} s loop)"]
+    for c in stats["channels"]:
+        lines.append(f"  {c['name']:<14} {c['path']:<11} {c['keys']:>5} keys")
+    worst = max(stats["rates"], key=lambda r: abs(r["baked"] - r["rate"]) / abs(r["rate"]) if r["rate"] else 0.0)
+    if worst["rate"]:
+        lines.append(f"largest speed change for looping: {worst['name']} {worst['kind']} "
+                     f"{100 * (worst['baked'] / worst['rate'] - 1):+.2f}%")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bake the orbits and spins into a looping solar_system.gltf.")
+    parser.add_argument("--duration", type=float, default=360.0, help="loop length in seconds")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="max interpolation error in degrees (rotation angle / arc on the orbit)")
+    parser.add_argument("--sample-rate", type=float, default=30.0, help="evaluation rate before reduction (Hz)")
+    parser.add_argument("--pivots", action="store_true",
+                        help="orbit with rotating pivot nodes instead of translation keys")
+    parser.add_argument("--format", choices=gltf_io.FORMATS, default="gltf")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    args = parser.parse_args()
+    gltf, bin_data, stats = bake(args.duration, args.tolerance, args.sample_rate, args.pivots)
+    print(report(stats))
+    path = gltf_io.write(os.path.join(args.models_dir, OUTPUT_NAME), gltf, bin_data, args.format, indent=2)
+    print(f"Created {path} ({os.path.getsize(path)} B)")
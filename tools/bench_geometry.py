@@ -0,0 +1,144 @@
+"""
+Benchmark the NumPy geometry kernels against the original per-vertex loops.
+
+Usage: python tools/bench_geometry.py [--segments 64 512 2048] [--repeat 3]
+
+For every segment count it builds the planet UV sphere, the skybox sphere and
+the orbit torus both ways, checks the outputs agree and prints the speedup.
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+import geometry
+
+
+# --- Reference implementations (verbatim loops the kernels replaced) ---
+
+def legacy_uv_sphere(radius=0.5, width_segments=64, height_segments=32):
+    vertices, normals, uvs, indices = [], [], [], []
+    for y in range(height_segments + 1):
+        v = y / height_segments
+        angle_v = v * math.pi
+        for x in range(width_segments + 1):
+            u = x / width_segments
+            angle_u = u * 2 * math.pi
+            px = -radius * math.cos(angle_u) * math.sin(angle_v)
+            py = radius * math.cos(angle_v)
+            pz = radius * math.sin(angle_u) * math.sin(angle_v)
+            vertices.extend([px, py, pz])
+            normals.extend([px / radius, py / radius, pz / radius])
+            uvs.extend([u, v])
+    for y in range(height_segments):
+        for x in range(width_segments):
+            first = (y * (width_segments + 1)) + x
+            second = first + width_segments + 1
+            indices.extend([first, second, first + 1])
+            indices.extend([second, second + 1, first + 1])
+    return vertices, normals, uvs, indices
+
+
+def legacy_skybox_sphere(radius=50.0, rings=64, sectors=64):
+    positions, normals, uvs, indices = [], [], [], []
+    R = 1.0 / (rings - 1)
+    S = 1.0 / (sectors - 1)
+    for r in range(rings):
+        for s in range(sectors):
+            y = math.sin(-math.pi/2 + math.pi * r * R)
+            x = math.cos(2 * math.pi * s * S) * math.sin(math.pi * r * R)
+            z = math.sin(2 * math.pi * s * S) * math.sin(math.pi * r * R)
+            positions.extend([x * radius, y * radius, z * radius])
+            normals.extend([-x, -y, -z])
+            uvs.extend([1.0 - (s * S), 1.0 - (r * R)])
+    for r in range(rings - 1):
+        for s in range(sectors - 1):
+            i0 = r * sectors + s
+            i1 = r * sectors + (s + 1)
+            i2 = (r + 1) * sectors + (s + 1)
+            i3 = (r + 1) * sectors + s
+            indices.extend([i0, i2, i1])
+            indices.extend([i2, i0, i3])
+    return positions, normals, uvs, indices
+
+
+def legacy_torus(major_radius=1.0, minor_radius=0.002, major_segments=64, minor_segments=6):
+    vertices, normals, indices = [], [], []
+    for i in range(major_segments):
+        theta = 2.0 * math.pi * i / major_segments
+        cos_theta, sin_theta = math.cos(theta), math.sin(theta)
+        for j in range(minor_segments):
+            phi = 2.0 * math.pi * j / minor_segments
+            cos_phi, sin_phi = math.cos(phi), math.sin(phi)
+            vertices.extend([(major_radius + minor_radius * cos_phi) * cos_theta,
+                             minor_radius * sin_phi,
+                             (major_radius + minor_radius * cos_phi) * sin_theta])
+            normals.extend([cos_phi * cos_theta, sin_phi, cos_phi * sin_theta])
+    for i in range(major_segments):
+        for j in range(minor_segments):
+            i_next = (i + 1) % major_segments
+            j_next = (j + 1) % minor_segments
+            v0 = i * minor_segments + j
+            v1 = i_next * minor_segments + j
+            v2 = i_next * minor_segments + j_next
+            v3 = i * minor_segments + j_next
+            indices.extend([v0, v1, v2])
+            indices.extend([v0, v2, v3])
+    return vertices, normals, indices
+
+
+# --- Harness ---
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _max_diff(flat_list, array):
+    if array is None:
+        return 0.0
+    ref = np.asarray(flat_list, dtype=np.float32).reshape(array.shape)
+    return float(np.max(np.abs(ref - array))) if array.size else 0.0
+
+
+def _check(legacy, mesh):
+    """Return the largest float32 deviation; raise if topology differs."""
+    if legacy[-1] != mesh.indices.tolist():
+        raise AssertionError("index buffers differ")
+    attrs = [mesh.positions, mesh.normals] + ([mesh.uvs] if mesh.uvs is not None else [])
+    return max(_max_diff(ref, arr) for ref, arr in zip(legacy, attrs))
+
+
+def run(segments, repeat):
+    cases = [
+        ("uv_sphere", lambda n: legacy_uv_sphere(0.5, n, n // 2),
+                      lambda n: geometry.uv_sphere(0.5, n, n // 2)),
+        ("skybox", lambda n: legacy_skybox_sphere(50.0, n, n),
+                   lambda n: geometry.skybox_sphere(50.0, n, n)),
+        ("torus", lambda n: legacy_torus(1.0, 0.002, n, 6),
+                  lambda n: geometry.torus(1.0, 0.002, n, 6)),
+    ]
+
+    print(f"{'mesh':<10} {'segs':>6} {'verts':>10} {'loops (s)':>10} {'numpy (s)':>10} {'speedup':>8} {'max err':>10}")
+    for name, legacy_fn, numpy_fn in cases:
+        for n in segments:
+            t_old, legacy = _best_of(lambda: legacy_fn(n), repeat)
+            t_new, mesh = _best_of(lambda: numpy_fn(n), repeat)
+            err = _check(legacy, mesh)
+            print(f"{name:<10} {n:>6} {mesh.vertex_count:>10} {t_old:>10.4f} {t_new:>10.4f} "
+                  f"{t_old / t_new:>7.1f}x {err:>10.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--segments", type=int, nargs="+", default=[64, 512, 2048])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.segments, args.repeat)
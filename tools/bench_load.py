@@ -0,0 +1,243 @@
+"""
+Cold-start benchmark of the app's model load sequence.
+
+Usage: python tools/bench_load.py [--repeat 3] [--jobs 4] [--no-images] [--output build/load_bench.json]
+
+SolarSystemScene loads milky_way.gltf, then every body in
+SolarSystemRepository order, then orbit_rings.gltf (ring.gltf when there is
+no merged ring asset), one after another in a single LaunchedEffect. This
+harness replays that sequence with a minimal glTF reader and times each
+phase per asset:
+
+  read     file reads: the .gltf / .glb, external .bin buffers and images
+  parse    JSON parse (or GLB chunk split)
+  base64   decoding embedded data: URIs
+  images   JPEG / PNG decode (needs Pillow, skipped otherwise or with --no-images)
+
+Every asset is rewritten into three variants in a scratch directory, the
+embedded base64 .gltf, .gltf + external .bin and .glb, and each one is
+measured with a cold page cache (the files are evicted with
+posix_fadvise(DONTNEED) before every run, where the platform has it) and a
+warm one (best of ``--repeat`` after a priming run). The whole sequence is
+then timed serially, on a ``--jobs`` thread pool and as asyncio tasks
+(asyncio.to_thread), so the gain from loading models concurrently shows.
+
+Results go to a JSON report (sorted keys, milliseconds) meant to be diffed
+between builds, plus a summary on stdout.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import bodies
+import gltf_io
+import textures
+
+MODELS_DIR = os.path.join(bodies.ROOT, "app/src/main/assets/models")
+OUTPUT = os.path.join(bodies.ROOT, "build/load_bench.json")
+VARIANTS = ("embedded", "bin", "glb")
+PHASES = ("read", "parse", "base64", "images")
+MODES = ("serial", "threads", "asyncio")
+
+
+def load_sequence(models_dir=MODELS_DIR):
+    """Asset stems in the order SolarSystemScene loads them."""
+    rings = "orbit_rings" if os.path.exists(os.path.join(models_dir, "orbit_rings.gltf")) else "ring"
+    return ["milky_way"] + [body["key"] for body in bodies.load()] + [rings]
+
+
+def make_variants(models_dir, out_dir, stems):
+    """Write every asset as each of VARIANTS under ``out_dir``; returns {variant: {stem: path}}."""
+    variants = {}
+    for variant in VARIANTS:
+        variant_dir = os.path.join(out_dir, variant)
+        os.makedirs(variant_dir, exist_ok=True)
+        variants[variant] = {}
+        for stem in stems:
+            gltf, buffers = gltf_io.load(os.path.join(models_dir, stem + ".gltf"))
+            gltf, bin_data = gltf_io.merge_buffers(gltf, buffers)
+            for image in gltf.get("images", []):
+                uri = image.get("uri", "")
+                if uri and not uri.startswith("data:"):
+                    shutil.copyfile(os.path.join(models_dir, uri), os.path.join(variant_dir, uri))
+            path = os.path.join(variant_dir, stem + ".gltf")
+            variants[variant][stem] = gltf_io.write(path, gltf, bin_data, "glb" if variant == "glb" else "gltf",
+                                                    bin_uri=stem + ".bin" if variant == "bin" else None)
+    os.sync()  # dirty pages cannot be evicted
+    return variants
+
+
+def evict_files(paths):
+    """Drop ``paths`` from the page cache; False where posix_fadvise is unavailable."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def evict(directory):
+    """Drop ``directory``'s files from the page cache; False where posix_fadvise is unavailable."""
+    return evict_files([os.path.join(directory, name) for name in os.listdir(directory)])
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def load_asset(path, decode_images=True):
+    """Load one asset the way a glTF runtime would; returns ({phase: seconds}, bytes read)."""
+    timings = dict.fromkeys(PHASES, 0.0)
+    base_dir = os.path.dirname(path)
+
+    start = time.perf_counter()
+    data = _read(path)
+    timings["read"] += time.perf_counter() - start
+    size = len(data)
+
+    start = time.perf_counter()
+    if data[:4] == b'glTF':
+        gltf, _ = gltf_io.parse_glb(data)
+    else:
+        gltf = json.loads(data.decode('utf-8'))
+    timings["parse"] += time.perf_counter() - start
+
+    for item in gltf.get("buffers", []) + gltf.get("images", []):
+        uri = item.get("uri")
+        if not uri:
+            continue
+        start = time.perf_counter()
+        if uri.startswith("data:"):
+            raw = gltf_io.decode_data_uri(uri)
+            timings["base64"] += time.perf_counter() - start
+        else:
+            raw = _read(os.path.join(base_dir, uri))
+            size += len(raw)
+            timings["read"] += time.perf_counter() - start
+            if item in gltf.get("images", []) and decode_images:
+                start = time.perf_counter()
+                with textures.Image.open(io.BytesIO(raw)) as image:
+                    image.load()
+                timings["images"] += time.perf_counter() - start
+    return timings, size
+
+
+def load_all(paths, mode, jobs, decode_images=True):
+    """Load every path with ``mode``; returns the wall time in seconds."""
+    start = time.perf_counter()
+    if mode == "serial":
+        for path in paths:
+            load_asset(path, decode_images)
+    elif mode == "threads":
+        with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+            list(pool.map(lambda p: load_asset(p, decode_images), paths))
+    else:
+        async def gather():
+            limit = asyncio.Semaphore(jobs)
+
+            async def one(path):
+                async with limit:
+                    return await asyncio.to_thread(load_asset, path, decode_images)
+            return await asyncio.gather(*(one(path) for path in paths))
+        asyncio.run(gather())
+    return time.perf_counter() - start
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 3)
+
+
+def bench(models_dir=MODELS_DIR, repeat=3, jobs=4, decode_images=True, work_dir=None):
+    """Run every measurement; returns the report dict."""
+    decode_images = decode_images and textures.Image is not None
+    stems = load_sequence(models_dir)
+    scratch = work_dir or tempfile.mkdtemp(prefix="load_bench_")
+    report = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+              "repeat": repeat, "jobs": jobs, "images_decoded": decode_images, "sequence": stems, "variants": {}}
+    try:
+        variants = make_variants(models_dir, scratch, stems)
+        report["cold_cache"] = evict(os.path.join(scratch, VARIANTS[0]))
+        for variant, paths in variants.items():
+            directory = os.path.join(scratch, variant)
+            assets = {}
+            for stem, path in paths.items():
+                cold = warm = None
+                for _ in range(repeat):
+                    if report["cold_cache"]:
+                        evict(directory)
+                        timings, size = load_asset(path, decode_images)
+                        cold = timings if cold is None else {k: min(cold[k], timings[k]) for k in PHASES}
+                load_asset(path, decode_images)
+                for _ in range(repeat):
+                    timings, size = load_asset(path, decode_images)
+                    warm = timings if warm is None else {k: min(warm[k], timings[k]) for k in PHASES}
+                assets[stem] = {"bytes": size, "warm": {k: _ms(v) for k, v in warm.items()}}
+                if cold is not None:
+                    assets[stem]["cold"] = {k: _ms(v) for k, v in cold.items()}
+
+            sequence = [paths[stem] for stem in stems]
+            load = {}
+            for mode in MODES:
+                load[mode] = {}
+                if report["cold_cache"]:
+                    cold_runs = []
+                    for _ in range(repeat):
+                        evict(directory)
+                        cold_runs.append(load_all(sequence, mode, jobs, decode_images))
+                    load[mode]["cold"] = _ms(min(cold_runs))
+                load_all(sequence, mode, jobs, decode_images)
+                load[mode]["warm"] = _ms(min(load_all(sequence, mode, jobs, decode_images) for _ in range(repeat)))
+            totals = {cache: {k: round(sum(a[cache][k] for a in assets.values()), 3) for k in PHASES}
+                      for cache in ("cold", "warm") if all(cache in a for a in assets.values())}
+            report["variants"][variant] = {"assets": assets, "totals": totals, "load": load,
+                                           "bytes": sum(a["bytes"] for a in assets.values())}
+    finally:
+        if work_dir is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return report
+
+
+def summary(report):
+    caches = ("cold", "warm") if report["cold_cache"] else ("warm",)
+    lines = [f"{len(report['sequence'])} assets, best of {report['repeat']}, {report['jobs']} jobs"
+             + ("" if report["images_decoded"] else ", images not decoded")
+             + ("" if report["cold_cache"] else ", no cold page cache on this platform")]
+    lines.append(f"{'variant':<9} {'cache':<5} {'bytes':>9} " + " ".join(f"{p:>8}" for p in PHASES)
+                 + " " + " ".join(f"{m:>8}" for m in MODES))
+    for variant, result in report["variants"].items():
+        for cache in caches:
+            lines.append(f"{variant:<9} {cache:<5} {result['bytes']:>9} "
+                         + " ".join(f"{result['totals'][cache][p]:>8.1f}" for p in PHASES) + " "
+                         + " ".join(f"{result['load'][m][cache]:>8.1f}" for m in MODES))
+    lines.append("(phase and load columns in ms)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the app's model load sequence per phase and variant.")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=4, help="workers for the threads / asyncio runs")
+    parser.add_argument("--no-images", action="store_true", help="skip JPEG decoding")
+    parser.add_argument("--work-dir", help="keep the generated variants here instead of a temp directory")
+    parser.add_argument("--output", default=OUTPUT, help="JSON report path")
+    args = parser.parse_args()
+    result = bench(args.models_dir, args.repeat, args.jobs, not args.no_images, args.work_dir)
+    print(summary(result))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    print(f"Wrote {args.output}")
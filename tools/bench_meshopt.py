@@ -0,0 +1,166 @@
+"""
+Benchmark EXT_meshopt_compression against the current embedded-base64 assets.
+
+Usage: python tools/bench_meshopt.py [files...] [--repeat 5]   (default: every .gltf in models_dir)
+
+For every asset it compares four encodings of the same geometry:
+
+  base64   the .gltf as shipped (JSON + base64 data URI)
+  glb      plain binary glTF
+  glb+zlib the GLB deflated as a whole (what a zlib-compressed asset would cost)
+  meshopt  GLB with EXT_meshopt_compression buffer views
+
+Sizes are reported raw and deflated (the APK stores assets deflated).
+Decode time is parse + decode of an in-memory copy, best of ``--repeat``.
+The meshopt decoder here is the pure-Python reference in meshopt_codec.py,
+so its time is an upper bound. When the optional ``meshoptimizer`` Python
+module is installed, a "native" row times the C decoder as well.
+
+Every meshopt asset is decoded back and checked against the original
+(vertex bytes exact, triangles equal up to the codec's rotation).
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+import gltf_io
+import meshopt_codec
+
+try:
+    import meshoptimizer
+except ImportError:
+    meshoptimizer = None
+
+models_dir = "app/src/main/assets/models"
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _decode_base64(data):
+    gltf = json.loads(data.decode('utf-8'))
+    return [gltf_io.decode_data_uri(b["uri"]) for b in gltf["buffers"] if b.get("uri", "").startswith("data:")]
+
+
+def _decode_meshopt(data):
+    gltf, bin_data = gltf_io.parse_glb(data)
+    buffers = [bin_data] + [None] * (len(gltf["buffers"]) - 1)
+    return meshopt_codec.decompress_gltf(gltf, buffers)
+
+
+def _decode_native(data):
+    gltf, bin_data = gltf_io.parse_glb(data)
+    out = []
+    for view in gltf["bufferViews"]:
+        ext = view.get("extensions", {}).get(meshopt_codec.EXTENSION)
+        if ext is None:
+            continue
+        src = np.frombuffer(bin_data, np.uint8, ext["byteLength"], ext.get("byteOffset", 0))
+        if ext["mode"] == "TRIANGLES":
+            out.append(meshoptimizer.decode_index_buffer(ext["count"], ext["byteStride"], src))
+        else:
+            out.append(meshoptimizer.decode_vertex_buffer(ext["count"], ext["byteStride"], src))
+    return out
+
+
+def _stored_size(path, gltf):
+    """Bytes on disk for an asset, including external .bin files it references."""
+    base_dir = os.path.dirname(path)
+    return os.path.getsize(path) + sum(
+        os.path.getsize(os.path.join(base_dir, b["uri"]))
+        for b in gltf.get("buffers", []) if not b.get("uri", "data:").startswith("data:"))
+
+
+def _canonical_triangles(indices):
+    tris = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    first = np.argmin(tris, axis=1)
+    rows = np.arange(len(tris))
+    return np.stack([tris[rows, (first + k) % 3] for k in range(3)], axis=1)
+
+
+def _check(gltf, bin_data, decoded_gltf, decoded_bin):
+    """Raise if the decoded meshopt asset does not match the plain one."""
+    index_accessors = {p["indices"] for m in gltf.get("meshes", []) for p in m["primitives"] if "indices" in p}
+    for i, (acc, dec) in enumerate(zip(gltf["accessors"], decoded_gltf["accessors"])):
+        size = meshopt_codec._element_size(acc) * acc["count"]
+        a = gltf["bufferViews"][acc["bufferView"]]
+        b = decoded_gltf["bufferViews"][dec["bufferView"]]
+        start_a = a.get("byteOffset", 0) + acc.get("byteOffset", 0)
+        start_b = b.get("byteOffset", 0) + dec.get("byteOffset", 0)
+        raw_a, raw_b = bin_data[start_a:start_a + size], decoded_bin[start_b:start_b + size]
+        if i in index_accessors:
+            dtype = '<u2' if acc["componentType"] == 5123 else '<u4'
+            same = np.array_equal(_canonical_triangles(np.frombuffer(raw_a, dtype)),
+                                  _canonical_triangles(np.frombuffer(raw_b, dtype)))
+        else:
+            same = raw_a == raw_b
+        if not same:
+            raise AssertionError(f"accessor {i} differs after meshopt round trip")
+
+
+def run(paths, repeat):
+    print(f"{'asset':<16} {'encoding':<9} {'size B':>9} {'deflated B':>11} {'decode ms':>10}")
+    totals = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            original = f.read()
+        gltf, buffers = gltf_io.load(path)
+        if meshopt_codec.EXTENSION in gltf.get("extensionsUsed", []):
+            print(f"{os.path.basename(path):<16} already meshopt-compressed, skipped")
+            continue
+        gltf, bin_data = gltf_io.merge_buffers(gltf, buffers)
+        glb = gltf_io.glb_bytes(gltf, bin_data)
+        deflated_glb = zlib.compress(glb, 9)
+        compressed_gltf, compressed_bin, _ = meshopt_codec.compress_gltf(json.loads(json.dumps(gltf)), bin_data)
+        meshopt_glb = gltf_io.glb_bytes(compressed_gltf, compressed_bin)
+
+        _check(gltf, bin_data, *_decode_meshopt(meshopt_glb))
+
+        embedded = all(b.get("uri", "").startswith("data:") for b in json.loads(original).get("buffers", []))
+        variants = [
+            ("base64" if embedded else "gltf+bin", original,
+             (lambda: _decode_base64(original)) if embedded else (lambda: gltf_io.load(path))),
+            ("glb", glb, lambda: gltf_io.parse_glb(glb)),
+            ("glb+zlib", deflated_glb, lambda: gltf_io.parse_glb(zlib.decompress(deflated_glb))),
+            ("meshopt", meshopt_glb, lambda: _decode_meshopt(meshopt_glb)),
+        ]
+        if meshoptimizer is not None:
+            variants.append(("native", meshopt_glb, lambda: _decode_native(meshopt_glb)))
+        for label, data, decode in variants:
+            seconds, _ = _best_of(decode, repeat)
+            size = len(data) if embedded or label != "gltf+bin" else _stored_size(path, json.loads(original))
+            if label == "glb+zlib":
+                packed = len(data)
+            elif label == "gltf+bin":
+                packed = len(zlib.compress(data, 9)) + len(zlib.compress(buffers[0], 9))
+            else:
+                packed = len(zlib.compress(data, 9))
+            total = totals.setdefault(label, [0, 0, 0.0])
+            total[0] += size
+            total[1] += packed
+            total[2] += seconds
+            print(f"{os.path.basename(path):<16} {label:<9} {size:>9} {packed:>11} {seconds * 1000:>10.2f}")
+
+    for label, (size, packed, seconds) in totals.items():
+        print(f"{'TOTAL':<16} {label:<9} {size:>9} {packed:>11} {seconds * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*", help="defaults to every .gltf in " + models_dir)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.files or sorted(glob.glob(os.path.join(models_dir, "*.gltf"))), args.repeat)
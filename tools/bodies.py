@@ -0,0 +1,98 @@
+"""
+Celestial body data read straight from SolarSystemRepository.kt.
+
+The app is the single source of truth for radii, orbits and spin, so the
+asset tools parse the Kotlin ``Planet(...)`` constructor calls (named or
+positional arguments) instead of keeping a second copy in Python.
+"""
+
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPOSITORY_KT = os.path.join(ROOT, "app/src/main/java/io/hellosaumil/pocketorrery/SolarSystemRepository.kt")
+
+# Parameter order of the Planet data class (Planet.kt).
+PLANET_PARAMS = ["name", "radius", "orbitDistance", "orbitSpeed", "rotationSpeed", "axialTilt", "color", "description"]
+NUMERIC = {"radius", "orbitDistance", "orbitSpeed", "rotationSpeed", "axialTilt"}
+
+
+def _split_args(text):
+    """Split a Kotlin argument list on top-level commas."""
+    args, depth, quote, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quote = not quote
+        elif not quote and ch in "([{":
+            depth += 1
+        elif not quote and ch in ")]}":
+            depth -= 1
+        elif not quote and depth == 0 and ch == ",":
+            args.append("".join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    if "".join(current).strip():
+        args.append("".join(current).strip())
+    return args
+
+
+def _constructor_calls(source):
+    """Yield the argument text of every ``Planet(...)`` call."""
+    for match in re.finditer(r'\bPlanet\s*\(', source):
+        depth, start = 1, match.end()
+        i = start
+        quote = False
+        while depth:
+            ch = source[i]
+            if ch == '"':
+                quote = not quote
+            elif not quote and ch == "(":
+                depth += 1
+            elif not quote and ch == ")":
+                depth -= 1
+            i += 1
+        yield source[start:i - 1]
+
+
+def _strip_comments(source):
+    return re.sub(r'//[^\n"]*$', '', source, flags=re.MULTILINE)
+
+
+def _value(name, text):
+    if name in NUMERIC:
+        return float(text.rstrip("fF"))
+    if text.startswith('"'):
+        return text.strip('"')
+    return text
+
+
+def load(path=REPOSITORY_KT):
+    """Return every body (Sun first, then planets in repository order) as a dict.
+
+    Each dict has the Planet fields plus ``key``, the asset stem the app uses
+    ("Earth 🌎" -> "earth").
+    """
+    with open(path, encoding='utf-8') as f:
+        source = _strip_comments(f.read())
+
+    bodies = []
+    for call in _constructor_calls(source):
+        body = {"axialTilt": 0.0}
+        for i, arg in enumerate(_split_args(call)):
+            named = re.match(r'^(\w+)\s*=\s*(.*)$', arg, flags=re.DOTALL)
+            name, text = (named.group(1), named.group(2).strip()) if named else (PLANET_PARAMS[i], arg)
+            body[name] = _value(name, text)
+        # Same mapping as SolarSystemScene: planet.name.lowercase().split(" ")[0]
+        body["key"] = body["name"].lower().split(" ")[0]
+        bodies.append(body)
+    return bodies
+
+
+def planets(path=REPOSITORY_KT):
+    """Bodies that orbit (everything except the Sun)."""
+    return [b for b in load(path) if b["orbitDistance"] > 0]
+
+
+def sun(path=REPOSITORY_KT):
+    return next(b for b in load(path) if b["orbitDistance"] == 0)
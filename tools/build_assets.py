@@ -0,0 +1,422 @@
+"""
+Incremental, content-hashed asset build.
+
+Usage: python tools/build_assets.py [--format glb] [--optimize] [--meshopt] [--jobs N] [--force] [--only planet:earth ...]
+       python tools/build_assets.py --bench [--jobs N]
+
+Every generated asset comes from one step of the asset graph:
+
+  planet:<key>  create_sphere_fixed.create_gltf (+ manage_assets.add_sun_light for the Sun)
+  ring          generate_ring.create_gltf
+  orbit_rings   generate_ring.create_merged_gltf (every orbit radius from
+                 SolarSystemRepository.kt in one mesh)
+  skybox        create_skybox.build (--cubemap: also writes the 3x2 cube image,
+                 and with --ktx2 its KTX2, from milky_way_texture.jpg)
+  texture:<stem> textures.process (--ktx2: resized KTX2 mip chain; the glTFs
+                 keep sampling the JPEG, see textures.py)
+
+A step's key is a SHA-256 over its name, its parameters, the bytes of its
+input files (textures) and the source of every script it runs, following
+local imports (the "script version"). build/asset_cache/manifest.json records
+each step's key and the hash of every output it produced; the output bytes
+are stored content-addressed in build/asset_cache/objects. On each run a step
+is
+
+  * up to date when its key matches and every output still hashes as recorded;
+  * restored when its key was built before (outputs copied from the cache);
+  * built otherwise, into a scratch directory.
+
+Restored and built outputs replace files in the models dir (.ktx2 side
+outputs: build/textures, --ktx2-dir) only when the bytes differ, so
+unchanged files keep their mtime and Gradle's asset merge stays incremental.
+
+Steps are independent, so the ones that need building run on a process pool
+(--jobs, default: CPU count). Each run reports wall-clock time against the
+summed step time; --bench times a forced full rebuild with --jobs 1 and
+--jobs N in scratch directories.
+"""
+
+import argparse
+import ast
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import bodies
+import create_skybox
+import geometry
+import gltf_io
+import manage_assets
+
+sys.path.insert(0, bodies.ROOT)
+import create_sphere_fixed
+import generate_ring
+import textures
+
+MODELS_DIR = os.path.join(bodies.ROOT, "app/src/main/assets/models")
+CACHE_DIR = os.path.join(bodies.ROOT, "build/asset_cache")
+MANIFEST_VERSION = 1
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return _sha256(f.read())
+
+
+def script_sources(path, seen=None):
+    """Set of ``path`` plus every repo-local module it imports, recursively."""
+    seen = set() if seen is None else seen
+    path = os.path.abspath(path)
+    if path in seen:
+        return seen
+    seen.add(path)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    for name in names:
+        for base in (os.path.dirname(path), os.path.join(bodies.ROOT, "tools"), bodies.ROOT):
+            candidate = os.path.join(base, name + ".py")
+            if os.path.exists(candidate):
+                script_sources(candidate, seen)
+                break
+    return seen
+
+
+# --- Steps (module-level functions so they can run in worker processes) ---
+
+def _run_planet(out_dir, key, texture, fmt, optimize, cleanup, quantize, meshopt, segments, tangents=False,
+                topology="uv", level=None):
+    path = create_sphere_fixed.create_gltf(os.path.join(out_dir, f"{key}.gltf"), texture, fmt, optimize, cleanup,
+                                           segments, segments // 2, quantize, meshopt, tangents, topology, level)
+    if key == "sun" and manage_assets.ADD_SUN_LIGHT:
+        gltf, buffers = gltf_io.load(path)
+        gltf_io.write(path, manage_assets.add_sun_light(gltf), buffers[0], fmt, indent=2)
+    return [path]
+
+
+def _run_ring(out_dir, fmt, optimize, cleanup, quantize, meshopt, segments):
+    gltf, buffer_data = generate_ring.create_gltf(optimize, cleanup, segments, quantize, meshopt)
+    return [gltf_io.write(os.path.join(out_dir, "ring.gltf"), gltf, buffer_data, fmt, indent=2)]
+
+
+def _run_orbit_rings(out_dir, fmt, optimize, cleanup, quantize, meshopt, segments):
+    gltf, buffer_data = generate_ring.create_merged_gltf(None, optimize, cleanup, segments, quantize, meshopt)
+    return [gltf_io.write(os.path.join(out_dir, "orbit_rings.gltf"), gltf, buffer_data, fmt, indent=2)]
+
+
+def _run_skybox(out_dir, fmt, optimize, cleanup, quantize, meshopt, segments, tangents=False, ktx2=False,
+                cubemap=False, source=None, zstd=None):
+    if cubemap:
+        return create_skybox.build(out_dir, fmt, cleanup, optimize, segments, segments, quantize, meshopt,
+                                   tangents=tangents, cubemap_mode=True, ktx2=ktx2, zstd_level=zstd,
+                                   source=os.path.join(bodies.ROOT, source), ktx2_dir=out_dir)
+    return create_skybox.build(out_dir, fmt, cleanup, optimize, segments, segments, quantize, meshopt,
+                               tangents=tangents)
+
+
+def _run_texture(out_dir, source, width, filter_, zstd):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    stats = textures.process(os.path.join(bodies.ROOT, source), width, filter_, zstd, out_dir)
+    print(textures.report(stem, stats))
+    return [stats["path"]]
+
+
+RUNNERS = {"planet": _run_planet, "ring": _run_ring, "orbit_rings": _run_orbit_rings, "skybox": _run_skybox,
+           "texture": _run_texture}
+SCRIPTS = {
+    "planet": [create_sphere_fixed.__file__, manage_assets.__file__],
+    "ring": [generate_ring.__file__],
+    "orbit_rings": [generate_ring.__file__],
+    "skybox": [create_skybox.__file__],
+    "texture": [textures.__file__],
+}
+
+
+def steps(fmt="gltf", optimize=False, cleanup=False, quantize=False, meshopt=False,
+          sphere_segments=64, ring_segments=64, skybox_segments=64, models_dir=MODELS_DIR, tangents=False,
+          ktx2=False, texture_filter="box", zstd=None, cubemap=False, topology="uv", topology_level=None):
+    """The asset graph as a list of step dicts (name, kind, params, inputs).
+
+    ``tangents`` only applies to the textured spheres; the ring has no UVs.
+    ``ktx2`` adds the texture steps (and the cube KTX2 with ``cubemap``).
+    With ``cubemap`` the skybox step makes its own (KTX2) texture, so there
+    is no texture step for the panorama. ``topology`` / ``topology_level``
+    pick the planet tessellation (see create_sphere_fixed.py --topology).
+    """
+    common = {"fmt": fmt, "optimize": optimize, "cleanup": cleanup, "quantize": quantize, "meshopt": meshopt}
+    textured = dict(common)
+    if tangents:
+        textured["tangents"] = True
+    planet = dict(textured)
+    if topology != "uv":
+        planet.update(topology=topology, level=topology_level)
+    result = []
+    for body in bodies.load():
+        texture = f"{body['key']}_texture.jpg"
+        result.append({"name": f"planet:{body['key']}", "kind": "planet",
+                       "params": dict(planet, key=body["key"], texture=texture, segments=sphere_segments),
+                       "inputs": [os.path.join(models_dir, texture)]})
+    result.append({"name": "ring", "kind": "ring", "params": dict(common, segments=ring_segments), "inputs": []})
+    result.append({"name": "orbit_rings", "kind": "orbit_rings", "params": dict(common, segments=ring_segments),
+                   "inputs": [bodies.REPOSITORY_KT]})
+    skybox = dict(textured, segments=skybox_segments)
+    if cubemap:
+        skybox.update(cubemap=True, source=os.path.relpath(os.path.join(models_dir, "milky_way_texture.jpg"),
+                                                            bodies.ROOT))
+        if ktx2:
+            skybox.update(ktx2=True, zstd=zstd)
+    result.append({"name": "skybox", "kind": "skybox", "params": skybox,
+                   "inputs": [os.path.join(models_dir, "milky_way_texture.jpg")]})
+    texture_steps = []
+    if ktx2:
+        # Listed first: they are the longest steps, so the pool starts them early.
+        for stem, (width, _) in textures.target_widths().items():
+            if cubemap and stem == "milky_way_texture":
+                continue
+            source = os.path.join(models_dir, f"{stem}.jpg")
+            texture_steps.append({"name": f"texture:{stem.replace('_texture', '')}", "kind": "texture",
+                           "params": {"source": os.path.relpath(source, bodies.ROOT), "width": width,
+                                      "filter_": texture_filter, "zstd": zstd},
+                           "inputs": [source]})
+    return texture_steps + result
+
+
+def step_key(step):
+    """Content hash of everything that determines a step's outputs."""
+    h = hashlib.sha256()
+    h.update(json.dumps({"name": step["name"], "params": step["params"], "version": MANIFEST_VERSION},
+                        sort_keys=True).encode('utf-8'))
+    sources = set()
+    for script in SCRIPTS[step["kind"]]:
+        script_sources(script, sources)
+    for path in sorted(sources) + list(step["inputs"]):
+        h.update(os.path.relpath(path, bodies.ROOT).encode('utf-8'))
+        h.update(_file_hash(path).encode('utf-8') if os.path.exists(path) else b"missing")
+    return h.hexdigest()
+
+
+def timed_step(step, verbose=False):
+    """run_step plus its duration; the unit of work sent to pool workers."""
+    start = time.perf_counter()
+    outputs = run_step(step, verbose)
+    return outputs, time.perf_counter() - start
+
+
+def run_step(step, verbose=False):
+    """Build one step into a scratch directory; returns {filename: bytes}."""
+    with tempfile.TemporaryDirectory() as out_dir:
+        log = io.StringIO()
+        with contextlib.redirect_stdout(sys.stdout if verbose else log):
+            paths = RUNNERS[step["kind"]](out_dir, **step["params"])
+        outputs = {}
+        for path in paths:
+            with open(path, 'rb') as f:
+                outputs[os.path.basename(path)] = f.read()
+        return outputs
+
+
+# --- Cache ---
+
+def load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        manifest = {"version": MANIFEST_VERSION, "steps": {}, "builds": {}}
+    return manifest
+
+
+def save_manifest(cache_dir, manifest):
+    os.makedirs(cache_dir, exist_ok=True)
+    gltf_io.write_if_changed(os.path.join(cache_dir, "manifest.json"),
+                             json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def _object_path(cache_dir, digest):
+    return os.path.join(cache_dir, "objects", digest[:2], digest)
+
+
+def store_outputs(cache_dir, outputs):
+    """Put output bytes into the object store; returns {filename: sha256}."""
+    hashes = {}
+    for name, data in outputs.items():
+        digest = _sha256(data)
+        path = _object_path(cache_dir, digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            gltf_io.write_if_changed(path, data)
+        hashes[name] = digest
+    return hashes
+
+
+def _cached_outputs(cache_dir, hashes):
+    """Read a previous build back from the object store, or None if any object is gone."""
+    outputs = {}
+    for name, digest in hashes.items():
+        path = _object_path(cache_dir, digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            outputs[name] = f.read()
+    return outputs
+
+
+def _output_path(models_dir, ktx2_dir, name):
+    """KTX2 side outputs go to ``ktx2_dir``; everything else ships in the models dir."""
+    return os.path.join(ktx2_dir if name.endswith(".ktx2") else models_dir, name)
+
+
+def _up_to_date(models_dir, ktx2_dir, hashes):
+    for name, digest in hashes.items():
+        path = _output_path(models_dir, ktx2_dir, name)
+        if not os.path.exists(path) or _file_hash(path) != digest:
+            return False
+    return True
+
+
+def _commit(manifest, cache_dir, models_dir, ktx2_dir, step, key, outputs):
+    """Store a step's outputs, update the models dir and manifest; returns the number of files written."""
+    hashes = store_outputs(cache_dir, outputs)
+    if any(name.endswith(".ktx2") for name in outputs):
+        os.makedirs(ktx2_dir, exist_ok=True)
+    written = sum(gltf_io.write_if_changed(_output_path(models_dir, ktx2_dir, name), data)
+                  for name, data in outputs.items())
+    manifest["builds"][key] = hashes
+    manifest["steps"][step["name"]] = {"key": key, "outputs": hashes}
+    save_manifest(cache_dir, manifest)
+    return written
+
+
+def build(step_list, models_dir=MODELS_DIR, cache_dir=CACHE_DIR, force=False, verbose=False, jobs=1,
+          ktx2_dir=textures.KTX2_DIR):
+    """Bring every step's outputs up to date.
+
+    Steps that need regenerating run on a ProcessPoolExecutor with ``jobs``
+    workers (in-process when ``jobs`` is 1); the cache and manifest are only
+    written from this process. Returns ({step name: status}, {step name: seconds}).
+    """
+    manifest = load_manifest(cache_dir)
+    statuses, timings, pending = {}, {}, []
+    for step in step_list:
+        key = step_key(step)
+        recorded = manifest["steps"].get(step["name"])
+        if not force and recorded and recorded["key"] == key and _up_to_date(models_dir, ktx2_dir, recorded["outputs"]):
+            statuses[step["name"]] = "up to date"
+            continue
+        outputs = None
+        if not force and key in manifest["builds"]:
+            outputs = _cached_outputs(cache_dir, manifest["builds"][key])
+        if outputs is None:
+            pending.append((step, key))
+            continue
+        written = _commit(manifest, cache_dir, models_dir, ktx2_dir, step, key, outputs)
+        statuses[step["name"]] = f"restored ({written} written, {len(outputs) - written} unchanged)"
+
+    def finish(step, key, result):
+        outputs, seconds = result
+        written = _commit(manifest, cache_dir, models_dir, ktx2_dir, step, key, outputs)
+        timings[step["name"]] = seconds
+        statuses[step["name"]] = f"built in {seconds:.2f} s ({written} written, {len(outputs) - written} unchanged)"
+
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+            futures = {pool.submit(timed_step, step, verbose): (step, key) for step, key in pending}
+            for future in as_completed(futures):
+                finish(*futures[future], future.result())
+    else:
+        for step, key in pending:
+            finish(step, key, timed_step(step, verbose))
+    return {s["name"]: statuses[s["name"]] for s in step_list}, timings
+
+
+def benchmark(step_list, jobs):
+    """Full forced rebuild with --jobs 1 and with ``jobs`` in scratch dirs; returns (serial s, parallel s)."""
+    results = []
+    for n in (1, jobs):
+        with tempfile.TemporaryDirectory() as scratch:
+            start = time.perf_counter()
+            build(step_list, scratch, os.path.join(scratch, "cache"), force=True, jobs=n,
+                  ktx2_dir=os.path.join(scratch, "textures"))
+            results.append(time.perf_counter() - start)
+    return tuple(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild only the assets whose inputs changed.")
+    parser.add_argument("--format", choices=gltf_io.FORMATS, default="gltf")
+    parser.add_argument("--cleanup", action="store_true")
+    parser.add_argument("--optimize", action="store_true")
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--meshopt", action="store_true")
+    parser.add_argument("--tangents", action="store_true", help="precompute TANGENT for the planets and skybox")
+    parser.add_argument("--ktx2", action="store_true",
+                        help="add the texture steps writing KTX2 side outputs (to --ktx2-dir)")
+    parser.add_argument("--texture-filter", choices=textures.FILTERS, default="box")
+    parser.add_argument("--zstd", type=int, nargs="?", const=10, metavar="LEVEL",
+                        help="zstd-supercompress the KTX2 levels (needs zstandard)")
+    parser.add_argument("--cubemap", action="store_true", help="cube map skybox (create_skybox.py --cubemap)")
+    parser.add_argument("--topology", choices=geometry.TOPOLOGIES, default="uv", help="planet sphere tessellation")
+    parser.add_argument("--topology-level", type=int, default=None,
+                        help="ico subdivisions / cube segments per face edge (default: 4 / 16)")
+    parser.add_argument("--sphere-segments", type=int, default=64)
+    parser.add_argument("--ring-segments", type=int, default=64)
+    parser.add_argument("--skybox-segments", type=int, default=64)
+    parser.add_argument("--only", nargs="+", metavar="STEP", help="run just these steps (e.g. planet:earth ring)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for steps that need rebuilding (default: CPU count)")
+    parser.add_argument("--bench", action="store_true",
+                        help="time a full rebuild with --jobs 1 and --jobs N in scratch dirs instead of building")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--ktx2-dir", default=textures.KTX2_DIR,
+                        help="where KTX2 side outputs go (default build/textures)")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and rebuild every step")
+    parser.add_argument("--verbose", action="store_true", help="show the generators' own output")
+    args = parser.parse_args()
+
+    step_list = steps(args.format, args.optimize, args.cleanup, args.quantize, args.meshopt,
+                      args.sphere_segments, args.ring_segments, args.skybox_segments, args.models_dir, args.tangents,
+                      args.ktx2, args.texture_filter, args.zstd, args.cubemap, args.topology, args.topology_level)
+    if args.only:
+        unknown = set(args.only) - {s["name"] for s in step_list}
+        if unknown:
+            parser.error(f"unknown steps: {', '.join(sorted(unknown))}")
+        step_list = [s for s in step_list if s["name"] in args.only]
+
+    if args.bench:
+        serial, parallel = benchmark(step_list, args.jobs)
+        print(f"full rebuild of {len(step_list)} steps: --jobs 1 {serial:.2f} s, --jobs {args.jobs} {parallel:.2f} s "
+              f"({serial / parallel:.2f}x speedup)")
+        raise SystemExit(0)
+
+    start = time.perf_counter()
+    statuses, timings = build(step_list, args.models_dir, args.cache_dir, args.force, args.verbose, args.jobs,
+                             args.ktx2_dir)
+    wall = time.perf_counter() - start
+    for name, status in statuses.items():
+        print(f"{name:<18} {status}")
+    if timings:
+        serial = sum(timings.values())
+        summary = f"built {len(timings)} steps in {wall:.2f} s wall with --jobs {args.jobs}; step time {serial:.2f} s"
+        if args.jobs > 1 and len(timings) > 1:
+            summary += f" (~{serial / wall:.2f}x over --jobs 1; --bench measures it)"
+        print(summary)
+    else:
+        print(f"nothing to build ({wall:.2f} s)")
@@ -0,0 +1,253 @@
+"""
+Pack the models and their textures into one page-aligned, memory-mappable bundle.
+
+Usage: python tools/bundle.py [--output build/models.bundle] [--page 4096] [--verify] [--bench] [--repeat 5]
+
+The app opens about twenty separate assets at startup (a .gltf, its
+buffer and its texture per body). This stage stores every glTF JSON chunk,
+model buffer and texture as one entry of a single uncompressed file:
+
+  header  magic "PORBNDL\\0", version, entry count, index size   (<8sIII)
+  index   per entry: offset, length, SHA-256, name length, name (<QQ32sH + UTF-8)
+  data    each entry starting on a ``--page`` boundary (4 KB), zero padded
+
+Each asset becomes ``<stem>.gltf`` (compact JSON whose buffer uris name
+their entries), ``<stem>.bin`` (``<stem>_<i>.bin`` for further buffers,
+decoded from base64 when the source embeds it) and the image files it
+references under their own names, so relative uris resolve inside the
+bundle like in the models directory. Assets come in the order the app
+loads them (bench_load.load_sequence), then the rest by name.
+
+Offsets are page-aligned relative to the bundle start: stored uncompressed
+in the APK (``androidResources { noCompress += "bundle" }``), an entry maps
+at the asset's file offset (AssetFileDescriptor.startOffset) plus its own,
+rounded down to a page. ``Bundle`` does the same in Python: one mmap
+of the whole file and a zero-copy memoryview per entry. ``--bench`` compares
+opening and reading the same data file by file against the bundle, with a
+cold (posix_fadvise eviction) and a warm page cache.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+import bench_load
+import bodies
+import gltf_io
+
+MODELS_DIR = os.path.join(bodies.ROOT, "app/src/main/assets/models")
+OUTPUT = os.path.join(bodies.ROOT, "build/models.bundle")
+MAGIC = b'PORBNDL\x00'
+VERSION = 1
+PAGE = 4096
+
+_HEADER = struct.Struct('<8sIII')
+_ENTRY = struct.Struct('<QQ32sH')
+
+
+def _align(n, page):
+    return (n + page - 1) // page * page
+
+
+def collect(models_dir=MODELS_DIR):
+    """[(entry name, bytes, source path or None)] for every asset in models_dir, in load order."""
+    stems = {}
+    for path in sorted(glob.glob(os.path.join(models_dir, "*.glb")) + glob.glob(os.path.join(models_dir, "*.gltf"))):
+        stems[os.path.splitext(os.path.basename(path))[0]] = path  # .gltf wins over a .glb of the same stem
+    order = [stem for stem in bench_load.load_sequence(models_dir) if stem in stems]
+    order += sorted(set(stems) - set(order))
+
+    entries, seen = [], set()
+    for stem in order:
+        path = stems[stem]
+        gltf, buffers = gltf_io.load(path)
+        blobs = []
+        for i, (buf, data) in enumerate(zip(gltf.get("buffers", []), buffers)):
+            if data is None:
+                continue  # meshopt fallback buffer, nothing stored
+            name = f"{stem}.bin" if i == 0 else f"{stem}_{i}.bin"
+            uri = buf.get("uri", "")
+            source = os.path.join(os.path.dirname(path), uri) if uri and not uri.startswith("data:") else None
+            buf["uri"] = name
+            blobs.append((name, data, source))
+        json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+        entries.append((f"{stem}.gltf", json_chunk, path))
+        entries += blobs
+        for image in gltf.get("images", []):
+            uri = image.get("uri", "")
+            if uri and not uri.startswith("data:") and uri not in seen:
+                seen.add(uri)
+                image_path = os.path.join(os.path.dirname(path), uri)
+                with open(image_path, 'rb') as f:
+                    entries.append((uri, f.read(), image_path))
+    return entries
+
+
+def write(entries, out_path=OUTPUT, page=PAGE):
+    """Write ``entries`` ([(name, bytes, ...)]) as a bundle; returns its size in bytes."""
+    names = [name.encode('utf-8') for name, *_ in entries]
+    index_size = sum(_ENTRY.size + len(name) for name in names)
+    offset = _align(_HEADER.size + index_size, page)
+    index = bytearray()
+    layout = []
+    for name, (_, data, *_) in zip(names, entries):
+        index += _ENTRY.pack(offset, len(data), hashlib.sha256(data).digest(), len(name)) + name
+        layout.append(offset)
+        offset = _align(offset + len(data), page)
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(entries), index_size))
+        f.write(index)
+        for start, (_, data, *_) in zip(layout, entries):
+            f.write(b'\x00' * (start - f.tell()))
+            f.write(data)
+        return f.tell()
+
+
+class Bundle:
+    """Read-only view of a bundle through one mmap.
+
+    ``bundle[name]`` is a zero-copy memoryview into the mapping; release
+    every view (or drop it) before ``close``.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, index_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} model bundle")
+        self.entries = {}
+        pos = _HEADER.size
+        for _ in range(count):
+            offset, length, digest, name_length = _ENTRY.unpack_from(self._map, pos)
+            pos += _ENTRY.size
+            name = bytes(self._map[pos:pos + name_length]).decode('utf-8')
+            pos += name_length
+            if offset + length > len(self._map):
+                raise ValueError(f"{path}: entry {name} [{offset}..{offset + length}] is past the end")
+            self.entries[name] = (offset, length, digest)
+
+    def __getitem__(self, name):
+        offset, length, _ = self.entries[name]
+        return memoryview(self._map)[offset:offset + length]
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def names(self):
+        return list(self.entries)
+
+    def verify(self):
+        """Names of the entries whose SHA-256 does not match the index."""
+        bad = []
+        for name, (_, _, digest) in self.entries.items():
+            with self[name] as view:
+                if hashlib.sha256(view).digest() != digest:
+                    bad.append(name)
+        return bad
+
+    def load_gltf(self, name):
+        """(gltf dict, [memoryview per buffer]) for a ``<stem>.gltf`` entry."""
+        with self[name] as view:
+            gltf = json.loads(bytes(view))
+        return gltf, [self[buf["uri"]] if "uri" in buf else None for buf in gltf.get("buffers", [])]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Benchmark ---
+
+def _touch(view):
+    """Fault in every page of a mapped view (one byte per page)."""
+    return int(np.frombuffer(view, np.uint8)[::PAGE].sum()) if len(view) else 0
+
+
+def _read_files(paths):
+    total = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            total += len(f.read())
+    return total
+
+
+def _map_bundle(path):
+    total = 0
+    with Bundle(path) as bundle:
+        for name in bundle.names():
+            with bundle[name] as view:
+                _touch(view)
+                total += len(view)
+    return total
+
+
+def bench(entries, bundle_path, repeat=5):
+    """{label: {"cold"/"warm": seconds}} for reading the sources one by one against mapping the bundle."""
+    sources = sorted({source for _, _, source in entries if source})
+    runs = {"files": (sources, lambda: _read_files(sources)),
+            "bundle": ([bundle_path], lambda: _map_bundle(bundle_path))}
+    results = {}
+    for label, (paths, fn) in runs.items():
+        fn()
+        results[label] = {"warm": min(_timed(fn) for _ in range(repeat))}
+        cold = []
+        for _ in range(repeat):
+            if not bench_load.evict_files(paths):
+                break
+            cold.append(_timed(fn))
+        if cold:
+            results[label]["cold"] = min(cold)
+        results[label]["opens"] = len(paths)
+    return results
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack the models and textures into one page-aligned bundle.")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--output", default=OUTPUT)
+    parser.add_argument("--page", type=int, default=PAGE, help="entry alignment in bytes")
+    parser.add_argument("--verify", action="store_true", help="re-open the bundle and check every entry's hash")
+    parser.add_argument("--bench", action="store_true", help="time file-by-file reads against the mapped bundle")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    entries = collect(args.models_dir)
+    size = write(entries, args.output, args.page)
+    payload = sum(len(data) for _, data, _ in entries)
+    print(f"Wrote {args.output}: {len(entries)} entries, {payload} B of data, {size} B with index and padding "
+          f"({100.0 * (size - payload) / max(payload, 1):.1f}% overhead)")
+    if args.verify:
+        with Bundle(args.output) as bundle:
+            bad = bundle.verify()
+        for name in bad:
+            print("ERROR: hash mismatch in", name)
+        if bad:
+            raise SystemExit(1)
+        print("All entries verified")
+    if args.bench:
+        os.sync()
+        for label, result in bench(entries, args.output, args.repeat).items():
+            times = ", ".join(f"{cache} {result[cache] * 1000:.2f} ms" for cache in ("cold", "warm") if cache in result)
+            print(f"{label:<7} {result['opens']:>3} files: {times}")
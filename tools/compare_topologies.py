@@ -0,0 +1,78 @@
+"""
+Silhouette error against triangle count for the planet sphere topologies.
+
+Usage: python tools/compare_topologies.py [--radius-px 500] [--targets 2 1 0.5]
+
+For every topology in geometry.TOPOLOGIES it builds a range of detail
+levels and measures the largest gap between the faceted mesh and the true
+sphere (lod.geometric_error, the quantity the LOD thresholds and
+triangle_budget.py work with), both relative to the radius and in pixels
+for a body ``--radius-px`` pixels in radius on screen. The UV sphere spends
+its triangles on slivers around the poles while its equator quads set the
+error; the icosphere and the (spherified) cube spread them evenly.
+
+A summary then lists, for each target error in pixels, the cheapest level
+of every topology that meets it. Vertex counts include the seam and pole
+duplicates the equirectangular UVs need.
+"""
+
+import argparse
+
+import geometry
+import lod
+
+LEVELS = {
+    "uv": (16, 24, 32, 48, 64, 96, 128, 192, 256),
+    "ico": (1, 2, 3, 4, 5, 6),
+    "cube": (4, 6, 8, 12, 16, 24, 32, 48, 64),
+    "spherified": (4, 6, 8, 12, 16, 24, 32, 48, 64),
+}
+LEVEL_NAMES = {"uv": "width segs", "ico": "subdivs", "cube": "face segs", "spherified": "face segs"}
+
+
+def measure(topology, level, radius=0.5):
+    mesh = geometry.sphere(topology, radius, level)
+    return {"topology": topology, "level": level, "vertices": mesh.vertex_count,
+            "triangles": mesh.triangle_count, "error": lod.geometric_error(mesh, radius) / radius}
+
+
+def compare(levels=LEVELS):
+    """One measure() row per topology and level, in LEVELS order."""
+    return [measure(topology, level) for topology, topology_levels in levels.items() for level in topology_levels]
+
+
+def cheapest(rows, target_px, radius_px):
+    """{topology: row} of the fewest-triangle level within ``target_px``, where one exists."""
+    best = {}
+    for row in rows:
+        if row["error"] * radius_px <= target_px:
+            current = best.get(row["topology"])
+            if current is None or row["triangles"] < current["triangles"]:
+                best[row["topology"]] = row
+    return best
+
+
+def report(rows, radius_px, targets):
+    lines = [f"{'topology':<11} {'level':>6} {'':<10} {'verts':>7} {'tris':>7} {'rel err':>10} {'err px':>8}"]
+    for row in rows:
+        lines.append(f"{row['topology']:<11} {row['level']:>6} {LEVEL_NAMES[row['topology']]:<10} "
+                     f"{row['vertices']:>7} {row['triangles']:>7} {row['error']:>10.2e} "
+                     f"{row['error'] * radius_px:>8.3f}")
+    lines.append("")
+    lines.append(f"fewest triangles within the target error (body {radius_px:g} px in radius):")
+    for target in targets:
+        best = cheapest(rows, target, radius_px)
+        parts = [f"{topology} {best[topology]['level']} -> {best[topology]['triangles']} tris"
+                 if topology in best else f"{topology}: none" for topology in LEVELS]
+        lines.append(f"  {target:g} px: " + ", ".join(parts))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sphere topologies by silhouette error per triangle.")
+    parser.add_argument("--radius-px", type=float, default=500.0,
+                        help="on-screen radius of the body used to turn the error into pixels")
+    parser.add_argument("--targets", type=float, nargs="+", default=[2.0, 1.0, 0.5], metavar="PX",
+                        help="error targets for the summary")
+    args = parser.parse_args()
+    print(report(compare(), args.radius_px, args.targets))
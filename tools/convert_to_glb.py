@@ -0,0 +1,40 @@
+"""
+Convert existing .gltf assets (embedded base64 or external .bin) to binary .glb.
+
+Usage: python tools/convert_to_glb.py [files...]   (default: every .gltf in models_dir)
+"""
+
+import argparse
+import glob
+import os
+
+import gltf_io
+
+models_dir = "app/src/main/assets/models"
+
+
+def run(paths):
+    total_before = total_after = 0
+    for src in paths:
+        gltf, _ = gltf_io.load(src)
+        # Count the .bin files the .gltf depends on, since the .glb replaces them too.
+        base_dir = os.path.dirname(src)
+        before = os.path.getsize(src) + sum(
+            os.path.getsize(os.path.join(base_dir, b["uri"]))
+            for b in gltf.get("buffers", []) if not b.get("uri", "data:").startswith("data:"))
+        dst = gltf_io.convert_to_glb(src)
+        after = os.path.getsize(dst)
+        total_before += before
+        total_after += after
+        print(f"{os.path.basename(src):<20} {before:>9} B -> {os.path.basename(dst):<18} {after:>9} B "
+              f"({100.0 * (before - after) / before:5.1f}% smaller)")
+    if total_before:
+        print(f"{'total':<20} {total_before:>9} B -> {'':<18} {total_after:>9} B "
+              f"({100.0 * (total_before - total_after) / total_before:5.1f}% smaller)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert .gltf assets to .glb.")
+    parser.add_argument("files", nargs="*", help="defaults to every .gltf in " + models_dir)
+    args = parser.parse_args()
+    run(args.files or sorted(glob.glob(os.path.join(models_dir, "*.gltf"))))
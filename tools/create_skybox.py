@@ -1,89 +1,62 @@
+import argparse
+import io
 import json
-import struct
-import math
 import os
 
+import cubemap
+import geometry
+import gltf_io
+import mesh_cleanup
+import mesh_optimize
+import mesh_quantize
+import mesh_tangents
+import meshopt_codec
+import profiling
+
+@profiling.profiled("geometry")
 def create_sphere(radius=500.0, rings=64, sectors=64):
     # Generates Sphere Geometry
-    # Returns (positions, normals, uvs, indices) as flat lists
-    positions = []
-    normals = []
-    uvs = []
-    indices = []
-
-    R = 1.0 / (rings - 1)
-    S = 1.0 / (sectors - 1)
-
-    for r in range(rings):
-        for s in range(sectors):
-            y = math.sin(-math.pi/2 + math.pi * r * R)
-            x = math.cos(2 * math.pi * s * S) * math.sin(math.pi * r * R)
-            z = math.sin(2 * math.pi * s * S) * math.sin(math.pi * r * R)
-
-            # Positions
-            positions.extend([x * radius, y * radius, z * radius])
-            # Normals (same as pos for unit sphere) - Inverted for inside view
-            normals.extend([-x, -y, -z])
-            # UVs
-            uvs.extend([1.0 - (s * S), 1.0 - (r * R)])
-            
-    for r in range(rings - 1):
-        for s in range(sectors - 1):
-            i0 = r * sectors + s
-            i1 = r * sectors + (s + 1)
-            i2 = (r + 1) * sectors + (s + 1)
-            i3 = (r + 1) * sectors + s
-            
-            # Invert winding order for inside rendering
-            # Standard: i0, i1, i2 (CCW)
-            # Inverted: i0, i2, i1 (CW viewed from outside, CCW from inside)
-            
-            indices.extend([i0, i2, i1])
-            indices.extend([i2, i0, i3]) 
-            
-    return positions, normals, uvs, indices
-
-def write_bin(filename, positions, normals, uvs, indices):
-    with open(filename, 'wb') as f:
-        # Positions (Vec3 float)
-        pos_offset = 0
-        for val in positions:
-            f.write(struct.pack('f', val))
-        pos_len = len(positions) * 4
-        
-        # Normals (Vec3 float)
-        norm_offset = f.tell()
-        for val in normals:
-            f.write(struct.pack('f', val))
-        norm_len = len(normals) * 4
-        
-        # UVs (Vec2 float)
-        uv_offset = f.tell()
-        for val in uvs:
-            f.write(struct.pack('f', val))
-        uv_len = len(uvs) * 4
-        
-        # Indices (Scalar UShort)
-        ind_offset = f.tell()
-        for val in indices:
-            f.write(struct.pack('H', val)) # unsigned short
-        ind_len = len(indices) * 2
-        
-        return {
+    # Returns (positions, normals, uvs, indices) as contiguous float32 / uint32 arrays
+    # Normals inverted and winding flipped (CCW from inside) for inside rendering
+    return geometry.skybox_sphere(radius, rings, sectors)
+
+@profiling.profiled("pack")
+def write_bin(filename, positions, normals, uvs, indices, use_mmap=False, tangents=None):
+    # filename may also be an open binary file (e.g. BytesIO for a GLB BIN chunk)
+    # One bulk, 4-byte-aligned write per attribute; position min/max come from the same pass
+    # Optional (N, 4) tangents go after the indices so the other offsets stay put
+    index_component, index_data = gltf_io.pack_indices(indices, len(positions)) # unsigned short when it fits
+    arrays = [positions, normals, uvs, index_data] + ([tangents] if tangents is not None else [])
+    size = gltf_io.BufferWriter.size_of(arrays) if use_mmap else None
+    with gltf_io.BufferWriter(filename, size) as f:
+        pos_offset, pos_len, pos_min, pos_max = f.write(positions, bounds=True) # Vec3 float
+        norm_offset, norm_len, _, _ = f.write(normals) # Vec3 float
+        uv_offset, uv_len, _, _ = f.write(uvs) # Vec2 float
+        ind_offset, ind_len, _, _ = f.write(index_data) # Scalar UShort / UInt
+        if tangents is not None:
+            tan_offset, tan_len, _, _ = f.write(tangents) # Vec4 float
+
+        offsets = {
             "pos": (pos_offset, pos_len),
             "norm": (norm_offset, norm_len),
             "uv": (uv_offset, uv_len),
             "ind": (ind_offset, ind_len),
-            "total": f.tell(),
+            "total": len(f),
             "count": len(indices),
-            "vertex_count": len(positions) // 3
+            "index_component": index_component,
+            "vertex_count": len(positions),
+            "min": pos_min,
+            "max": pos_max
         }
+        if tangents is not None:
+            offsets["tan"] = (tan_offset, tan_len)
+        return offsets
 
 def create_gltf(bin_filename, offsets, texture_filename):
-    min_pos = [-50.0, -50.0, -50.0]
-    max_pos = [50.0, 50.0, 50.0]
+    min_pos = offsets["min"]
+    max_pos = offsets["max"]
     
-    return {
+    gltf = {
         "asset": { "version": "2.0", "generator": "Python Skybox Gen" },
         "extensionsUsed": ["KHR_materials_unlit"],
         "extensionsRequired": ["KHR_materials_unlit"],
@@ -121,32 +94,155 @@ def create_gltf(bin_filename, offsets, texture_filename):
             { "bufferView": 0, "byteOffset": 0, "componentType": 5126, "count": offsets["vertex_count"], "type": "VEC3", "max": max_pos, "min": min_pos },
             { "bufferView": 1, "byteOffset": 0, "componentType": 5126, "count": offsets["vertex_count"], "type": "VEC3" },
             { "bufferView": 2, "byteOffset": 0, "componentType": 5126, "count": offsets["vertex_count"], "type": "VEC2" },
-            { "bufferView": 3, "byteOffset": 0, "componentType": 5123, "count": offsets["count"], "type": "SCALAR" }
+            { "bufferView": 3, "byteOffset": 0, "componentType": offsets["index_component"], "count": offsets["count"], "type": "SCALAR" }
         ],
         "bufferViews": [
-            { "buffer": 0, "byteOffset": 0, "byteLength": offsets["pos"][1], "target": 34962 },
-            { "buffer": 0, "byteOffset": offsets["pos"][1], "byteLength": offsets["norm"][1], "target": 34962 },
-            { "buffer": 0, "byteOffset": offsets["pos"][1] + offsets["norm"][1], "byteLength": offsets["uv"][1], "target": 34962 },
-            { "buffer": 0, "byteOffset": offsets["pos"][1] + offsets["norm"][1] + offsets["uv"][1], "byteLength": offsets["ind"][1], "target": 34963 }
+            { "buffer": 0, "byteOffset": offsets["pos"][0], "byteLength": offsets["pos"][1], "target": 34962 },
+            { "buffer": 0, "byteOffset": offsets["norm"][0], "byteLength": offsets["norm"][1], "target": 34962 },
+            { "buffer": 0, "byteOffset": offsets["uv"][0], "byteLength": offsets["uv"][1], "target": 34962 },
+            { "buffer": 0, "byteOffset": offsets["ind"][0], "byteLength": offsets["ind"][1], "target": 34963 }
         ],
         "buffers": [{ "uri": bin_filename, "byteLength": offsets["total"] }]
     }
+    if "tan" in offsets:
+        gltf["meshes"][0]["primitives"][0]["attributes"]["TANGENT"] = len(gltf["accessors"])
+        gltf["accessors"].append({ "bufferView": len(gltf["bufferViews"]), "byteOffset": 0, "componentType": 5126, "count": offsets["vertex_count"], "type": "VEC4" })
+        gltf["bufferViews"].append({ "buffer": 0, "byteOffset": offsets["tan"][0], "byteLength": offsets["tan"][1], "target": 34962 })
+    return gltf
 
-if __name__ == "__main__":
-    models_dir = "app/src/main/assets/models"
-    bin_name = "milky_way.bin"
-    gltf_name = "milky_way.gltf"
+def build(models_dir="app/src/main/assets/models", fmt="gltf", cleanup=False, optimize=False, rings=64, sectors=64,
+          quantize=False, meshopt=False, use_mmap=False, tangents=False, cubemap_mode=False, face_size=None,
+          cube_segments=1, spherify=False, ktx2=False, zstd_level=None, source=None, ktx2_dir=None):
+    """Generate and write the skybox; returns the paths written.
+
+    ``cubemap_mode`` resamples the panorama at ``source`` (default: the
+    models dir copy) into a 3x2 cube image and writes an inverted cube, or
+    a cube-sphere with ``spherify``, instead of the UV sphere (see cubemap.py).
+    ``ktx2`` / ``zstd_level`` then also write a KTX2 of it as a side output
+    to ``ktx2_dir`` (default build/textures); the glTF keeps sampling the JPEG
+    (see textures.py).
+    """
     texture_name = "milky_way_texture.jpg"
 
+    if cubemap_mode:
+        return _build_cubemap(models_dir, fmt, cleanup, optimize, rings, sectors, quantize, meshopt, use_mmap,
+                              tangents, face_size, cube_segments, spherify, ktx2, zstd_level,
+                              source or os.path.join(models_dir, texture_name), ktx2_dir)
+
     print("Generating skybox geometry...")
-    pos, norm, uv, ind = create_sphere(radius=50.0, rings=64, sectors=64) 
+    pos, norm, uv, ind = create_sphere(radius=50.0, rings=rings, sectors=sectors)
+    return _write(models_dir, fmt, cleanup, optimize, quantize, meshopt, use_mmap, tangents,
+                  pos, norm, uv, ind, texture_name)
+
+def _build_cubemap(models_dir, fmt, cleanup, optimize, rings, sectors, quantize, meshopt, use_mmap, tangents,
+                   face_size, cube_segments, spherify, ktx2, zstd_level, source, ktx2_dir):
+    print(f"Resampling {os.path.basename(source)} into cube faces...")
+    with profiling.stage("textures"):
+        texture_paths, texture_stats = cubemap.write_textures(source, models_dir, face_size, write_ktx2=ktx2,
+                                                              zstd_level=zstd_level, ktx2_dir=ktx2_dir)
+    face_size = texture_stats["face_size"]
+
+    print("Generating cube skybox geometry...")
+    with profiling.stage("geometry"):
+        mesh, cube = cubemap.mesh(50.0, cube_segments, spherify, face_size)
+    sphere = create_sphere(radius=50.0, rings=rings, sectors=sectors)
+    width, height = texture_stats["source_size"]
+    print(cubemap.report("milky_way",
+                         {"vertices": len(sphere.positions), "triangles": len(sphere.indices) // 3,
+                          "density": cubemap.equirect_density(width, height)},
+                         dict(cube, density=cubemap.cube_density(face_size))))
 
-    print("Writing binary...")
-    offsets = write_bin(os.path.join(models_dir, bin_name), pos, norm, uv, ind)
+    paths = _write(models_dir, fmt, cleanup, optimize, quantize, meshopt, use_mmap, tangents,
+                   *mesh, f"{cubemap.TEXTURE_STEM}.jpg")
+    return paths + texture_paths
+
+def _write(models_dir, fmt, cleanup, optimize, quantize, meshopt, use_mmap, tangents, pos, norm, uv, ind,
+           texture_name):
+    bin_name = "milky_way.bin"
+    gltf_name = "milky_way.gltf"
+    if cleanup:
+        mesh, stats = mesh_cleanup.cleanup(geometry.Mesh(pos, norm, uv, ind))
+        print(mesh_cleanup.report("milky_way", stats))
+        pos, norm, uv, ind = mesh
+    if optimize:
+        mesh, stats = mesh_optimize.optimize(geometry.Mesh(pos, norm, uv, ind))
+        print(mesh_optimize.report("milky_way", stats))
+        pos, norm, uv, ind = mesh
+    tan = None
+    if tangents:
+        tan, stats = mesh_tangents.generate(geometry.Mesh(pos, norm, uv, ind))
+        print(mesh_tangents.report("milky_way", stats))
 
-    print("Writing glTF...")
-    gltf = create_gltf(bin_name, offsets, texture_name)
-    with open(os.path.join(models_dir, gltf_name), 'w') as f:
-        json.dump(gltf, f, indent=4)
-        
-    print("Done! Created milky_way.gltf and milky_way.bin")
+    if quantize or meshopt:
+        print("Writing processed geometry...")
+        buf = io.BytesIO()
+        offsets = write_bin(buf, pos, norm, uv, ind, tangents=tan)
+        gltf, bin_data = create_gltf(bin_name, offsets, texture_name), buf.getvalue()
+        if quantize:
+            gltf, bin_data, errors = mesh_quantize.apply(gltf, geometry.Mesh(pos, norm, uv, ind), tan)
+            print(mesh_quantize.report("milky_way", errors))
+        if meshopt:
+            gltf, bin_data, stats = meshopt_codec.compress_gltf(gltf, bin_data)
+            print(meshopt_codec.report("milky_way", stats))
+        path = gltf_io.write(os.path.join(models_dir, gltf_name), gltf, bin_data, fmt, indent=4, bin_uri=bin_name)
+        print(f"Done! Created {os.path.basename(path)}")
+        return [path] if fmt == "glb" else [path, os.path.join(models_dir, bin_name)]
+
+    if fmt == "glb":
+        print("Writing GLB...")
+        buf = io.BytesIO()
+        offsets = write_bin(buf, pos, norm, uv, ind, tangents=tan)
+        glb_path = gltf_io.output_path(os.path.join(models_dir, gltf_name), "glb")
+        gltf_io.write_glb(glb_path, create_gltf(bin_name, offsets, texture_name), buf.getvalue())
+        print(f"Done! Created {os.path.basename(glb_path)}")
+        return [glb_path]
+    else:
+        print("Writing binary...")
+        offsets = write_bin(os.path.join(models_dir, bin_name), pos, norm, uv, ind, use_mmap, tan)
+
+        print("Writing glTF...")
+        gltf = create_gltf(bin_name, offsets, texture_name)
+        with profiling.stage("json"):
+            text = json.dumps(gltf, indent=4)
+        with profiling.stage("write"), open(os.path.join(models_dir, gltf_name), 'w') as f:
+            f.write(text)
+            
+        print("Done! Created milky_way.gltf and milky_way.bin")
+        return [os.path.join(models_dir, gltf_name), os.path.join(models_dir, bin_name)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the Milky Way skybox model.")
+    parser.add_argument("--format", choices=gltf_io.FORMATS, default="gltf",
+                        help="gltf: JSON + external milky_way.bin, glb: single binary glTF")
+    parser.add_argument("--cleanup", action="store_true",
+                        help="weld duplicate vertices and drop degenerate pole triangles (see mesh_cleanup.py)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="reorder for vertex cache / overdraw / fetch locality (see mesh_optimize.py)")
+    parser.add_argument("--quantize", action="store_true",
+                        help="write KHR_mesh_quantization attributes (see mesh_quantize.py)")
+    parser.add_argument("--meshopt", action="store_true",
+                        help="write EXT_meshopt_compression buffer views (see meshopt_codec.py)")
+    parser.add_argument("--mmap", action="store_true",
+                        help="write the .bin through a preallocated memory-mapped file (gltf format; "
+                             "usually slower than the default buffered writes)")
+    parser.add_argument("--tangents", action="store_true",
+                        help="precompute a TANGENT attribute (see mesh_tangents.py)")
+    parser.add_argument("--rings", type=int, default=64)
+    parser.add_argument("--sectors", type=int, default=64)
+    parser.add_argument("--cubemap", action="store_true",
+                        help="resample the panorama into a 3x2 cube image on an inverted cube (see cubemap.py)")
+    parser.add_argument("--face-size", type=int, default=None,
+                        help="cube face texels incl. gutter (default: power of two nearest panorama width / pi)")
+    parser.add_argument("--cube-segments", type=int, default=1, help="grid segments per cube face edge")
+    parser.add_argument("--spherify", action="store_true", help="push the cube vertices onto the sphere")
+    parser.add_argument("--ktx2", action="store_true",
+                        help="with --cubemap: also write a KTX2 cube image to build/textures (the glTF keeps the JPEG)")
+    parser.add_argument("--zstd", type=int, nargs="?", const=10, default=None, metavar="LEVEL",
+                        help="zstd-supercompress the KTX2 (level, default 10)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with profiling.session(args, "create_skybox"), profiling.asset("milky_way"):
+        build(fmt=args.format, cleanup=args.cleanup, optimize=args.optimize, rings=args.rings, sectors=args.sectors,
+              quantize=args.quantize, meshopt=args.meshopt, use_mmap=args.mmap, tangents=args.tangents,
+              cubemap_mode=args.cubemap, face_size=args.face_size, cube_segments=args.cube_segments,
+              spherify=args.spherify, ktx2=args.ktx2, zstd_level=args.zstd)
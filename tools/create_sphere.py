@@ -1,85 +1,66 @@
+import argparse
+import io
 import json
-import struct
-import math
 import os
 
-def create_sphere(radius=0.5, rings=32, sectors=32):
-    # Generates Sphere Geometry
-    # Returns (positions, normals, uvs, indices) as flat lists
-    positions = []
-    normals = []
-    uvs = []
-    indices = []
-
-    R = 1.0 / (rings - 1)
-    S = 1.0 / (sectors - 1)
+import geometry
+import gltf_io
+import mesh_cleanup
+import mesh_optimize
+import mesh_quantize
+import mesh_tangents
+import meshopt_codec
+import profiling
 
-    for r in range(rings):
-        for s in range(sectors):
-            y = math.sin(-math.pi/2 + math.pi * r * R)
-            x = math.cos(2 * math.pi * s * S) * math.sin(math.pi * r * R)
-            z = math.sin(2 * math.pi * s * S) * math.sin(math.pi * r * R)
+@profiling.profiled("geometry")
+def create_sphere(radius=0.5, rings=32, sectors=32, topology="uv", level=None):
+    # Generates Sphere Geometry
+    # Returns (positions, normals, uvs, indices) as contiguous float32 / uint32 arrays
+    # Other topologies come from geometry.sphere, whose UVs follow uv_sphere: that is this
+    # sphere turned 180 degrees about Y, so turn them back (x, z -> -x, -z) to line the texture up
+    if topology != "uv":
+        mesh = geometry.sphere(topology, radius, level)
+        flip = geometry._f32([-1.0, 1.0, -1.0])
+        return geometry.Mesh(mesh.positions * flip, mesh.normals * flip, mesh.uvs, mesh.indices)
+    return geometry.grid_sphere(radius, rings, sectors)
 
-            # Positions
-            positions.extend([x * radius, y * radius, z * radius])
-            # Normals (same as pos for unit sphere)
-            normals.extend([x, y, z])
-            # UVs
-            uvs.extend([1.0 - (s * S), 1.0 - (r * R)])
-            
-    for r in range(rings - 1):
-        for s in range(sectors - 1):
-            i0 = r * sectors + s
-            i1 = r * sectors + (s + 1)
-            i2 = (r + 1) * sectors + (s + 1)
-            i3 = (r + 1) * sectors + s
-            
-            indices.extend([i0, i1, i2])
-            indices.extend([i2, i3, i0]) # Quad -> 2 Tris
-            
-    return positions, normals, uvs, indices
+@profiling.profiled("pack")
+def write_bin(filename, positions, normals, uvs, indices, use_mmap=False, tangents=None):
+    # filename may also be an open binary file (e.g. BytesIO for a GLB BIN chunk)
+    # One bulk, 4-byte-aligned write per attribute; position min/max come from the same pass
+    # Optional (N, 4) tangents go after the indices so the other offsets stay put
+    index_component, index_data = gltf_io.pack_indices(indices, len(positions)) # unsigned short when it fits
+    arrays = [positions, normals, uvs, index_data] + ([tangents] if tangents is not None else [])
+    size = gltf_io.BufferWriter.size_of(arrays) if use_mmap else None
+    with gltf_io.BufferWriter(filename, size) as f:
+        pos_offset, pos_len, pos_min, pos_max = f.write(positions, bounds=True) # Vec3 float
+        norm_offset, norm_len, _, _ = f.write(normals) # Vec3 float
+        uv_offset, uv_len, _, _ = f.write(uvs) # Vec2 float
+        ind_offset, ind_len, _, _ = f.write(index_data) # Scalar UShort / UInt
+        if tangents is not None:
+            tan_offset, tan_len, _, _ = f.write(tangents) # Vec4 float
 
-def write_bin(filename, positions, normals, uvs, indices):
-    with open(filename, 'wb') as f:
-        # Positions (Vec3 float)
-        pos_offset = 0
-        for val in positions:
-            f.write(struct.pack('f', val))
-        pos_len = len(positions) * 4
-        
-        # Normals (Vec3 float)
-        norm_offset = f.tell()
-        for val in normals:
-            f.write(struct.pack('f', val))
-        norm_len = len(normals) * 4
-        
-        # UVs (Vec2 float)
-        uv_offset = f.tell()
-        for val in uvs:
-            f.write(struct.pack('f', val))
-        uv_len = len(uvs) * 4
-        
-        # Indices (Scalar UShort)
-        ind_offset = f.tell()
-        for val in indices:
-            f.write(struct.pack('H', val)) # unsigned short
-        ind_len = len(indices) * 2
-        
-        return {
+        offsets = {
             "pos": (pos_offset, pos_len),
             "norm": (norm_offset, norm_len),
             "uv": (uv_offset, uv_len),
             "ind": (ind_offset, ind_len),
-            "total": f.tell(),
+            "total": len(f),
             "count": len(indices),
-            "vertex_count": len(positions) // 3
+            "index_component": index_component,
+            "vertex_count": len(positions),
+            "min": pos_min,
+            "max": pos_max
         }
+        if tangents is not None:
+            offsets["tan"] = (tan_offset, tan_len)
+        return offsets
 
 def create_gltf(bin_filename, offsets):
-    min_pos = [-0.5, -0.5, -0.5]
-    max_pos = [0.5, 0.5, 0.5]
+    min_pos = offsets["min"]
+    max_pos = offsets["max"]
     
-    return {
+    gltf = {
         "asset": { "version": "2.0", "generator": "Python Sphere Gen" },
         "scene": 0,
         "scenes": [{ "nodes": [0] }],
@@ -108,7 +89,7 @@ def create_gltf(bin_filename, offsets):
             { "bufferView": 0, "byteOffset": offsets["pos"][0], "componentType": 5126, "count": offsets["vertex_count"], "type": "VEC3", "max": max_pos, "min": min_pos },
             { "bufferView": 0, "byteOffset": offsets["norm"][0], "componentType": 5126, "count": offsets["vertex_count"], "type": "VEC3" },
             { "bufferView": 0, "byteOffset": offsets["uv"][0], "componentType": 5126, "count": offsets["vertex_count"], "type": "VEC2" },
-            { "bufferView": 1, "byteOffset": 0, "componentType": 5123, "count": offsets["count"], "type": "SCALAR" }
+            { "bufferView": 1, "byteOffset": 0, "componentType": offsets["index_component"], "count": offsets["count"], "type": "SCALAR" }
         ],
         "bufferViews": [
             { "buffer": 0, "byteOffset": 0, "byteLength": offsets["ind"][0], "target": 34962 }, # Array Buffer
@@ -118,21 +99,96 @@ def create_gltf(bin_filename, offsets):
             { "uri": bin_filename, "byteLength": offsets["total"] }
         ]
     }
+    if "tan" in offsets:
+        gltf["meshes"][0]["primitives"][0]["attributes"]["TANGENT"] = len(gltf["accessors"])
+        gltf["accessors"].append({ "bufferView": len(gltf["bufferViews"]), "byteOffset": 0, "componentType": 5126, "count": offsets["vertex_count"], "type": "VEC4" })
+        gltf["bufferViews"].append({ "buffer": 0, "byteOffset": offsets["tan"][0], "byteLength": offsets["tan"][1], "target": 34962 })
+    return gltf
 
-if __name__ == "__main__":
-    models_dir = "app/src/main/assets/models"
+def build(models_dir="app/src/main/assets/models", fmt="gltf", cleanup=False, optimize=False, rings=64, sectors=64,
+          quantize=False, meshopt=False, use_mmap=False, tangents=False, topology="uv", level=None):
+    """Generate and write the reference sphere; returns the paths written."""
     bin_name = "sphere.bin"
     gltf_name = "ref_sphere.gltf"
 
     print("Generating sphere geometry...")
-    pos, norm, uv, ind = create_sphere(radius=0.5, rings=64, sectors=64) 
+    pos, norm, uv, ind = create_sphere(radius=0.5, rings=rings, sectors=sectors, topology=topology, level=level)
+    if cleanup:
+        mesh, stats = mesh_cleanup.cleanup(geometry.Mesh(pos, norm, uv, ind))
+        print(mesh_cleanup.report("ref_sphere", stats))
+        pos, norm, uv, ind = mesh
+    if optimize:
+        mesh, stats = mesh_optimize.optimize(geometry.Mesh(pos, norm, uv, ind))
+        print(mesh_optimize.report("ref_sphere", stats))
+        pos, norm, uv, ind = mesh
+    tan = None
+    if tangents:
+        tan, stats = mesh_tangents.generate(geometry.Mesh(pos, norm, uv, ind))
+        print(mesh_tangents.report("ref_sphere", stats))
+
+    if quantize or meshopt:
+        print("Writing processed geometry...")
+        buf = io.BytesIO()
+        offsets = write_bin(buf, pos, norm, uv, ind, tangents=tan)
+        gltf, bin_data = create_gltf(bin_name, offsets), buf.getvalue()
+        if quantize:
+            gltf, bin_data, errors = mesh_quantize.apply(gltf, geometry.Mesh(pos, norm, uv, ind), tan)
+            print(mesh_quantize.report("ref_sphere", errors))
+        if meshopt:
+            gltf, bin_data, stats = meshopt_codec.compress_gltf(gltf, bin_data)
+            print(meshopt_codec.report("ref_sphere", stats))
+        path = gltf_io.write(os.path.join(models_dir, gltf_name), gltf, bin_data, fmt, indent=4, bin_uri=bin_name)
+        print(f"Done! Created {os.path.basename(path)}")
+        return [path] if fmt == "glb" else [path, os.path.join(models_dir, bin_name)]
 
-    print("Writing binary...")
-    offsets = write_bin(os.path.join(models_dir, bin_name), pos, norm, uv, ind)
+    if fmt == "glb":
+        print("Writing GLB...")
+        buf = io.BytesIO()
+        offsets = write_bin(buf, pos, norm, uv, ind, tangents=tan)
+        glb_path = gltf_io.output_path(os.path.join(models_dir, gltf_name), "glb")
+        gltf_io.write_glb(glb_path, create_gltf(bin_name, offsets), buf.getvalue())
+        print(f"Done! Created {os.path.basename(glb_path)}")
+        return [glb_path]
+    else:
+        print("Writing binary...")
+        offsets = write_bin(os.path.join(models_dir, bin_name), pos, norm, uv, ind, use_mmap, tan)
 
-    print("Writing glTF...")
-    gltf = create_gltf(bin_name, offsets)
-    with open(os.path.join(models_dir, gltf_name), 'w') as f:
-        json.dump(gltf, f, indent=4)
-        
-    print("Done! Created ref_sphere.gltf and sphere.bin")
+        print("Writing glTF...")
+        gltf = create_gltf(bin_name, offsets)
+        with profiling.stage("json"):
+            text = json.dumps(gltf, indent=4)
+        with profiling.stage("write"), open(os.path.join(models_dir, gltf_name), 'w') as f:
+            f.write(text)
+            
+        print("Done! Created ref_sphere.gltf and sphere.bin")
+        return [os.path.join(models_dir, gltf_name), os.path.join(models_dir, bin_name)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the reference sphere model.")
+    parser.add_argument("--format", choices=gltf_io.FORMATS, default="gltf",
+                        help="gltf: JSON + external sphere.bin, glb: single binary glTF")
+    parser.add_argument("--cleanup", action="store_true",
+                        help="weld duplicate vertices and drop degenerate pole triangles (see mesh_cleanup.py)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="reorder for vertex cache / overdraw / fetch locality (see mesh_optimize.py)")
+    parser.add_argument("--quantize", action="store_true",
+                        help="write KHR_mesh_quantization attributes (see mesh_quantize.py)")
+    parser.add_argument("--meshopt", action="store_true",
+                        help="write EXT_meshopt_compression buffer views (see meshopt_codec.py)")
+    parser.add_argument("--mmap", action="store_true",
+                        help="write the .bin through a preallocated memory-mapped file (gltf format; "
+                             "usually slower than the default buffered writes)")
+    parser.add_argument("--tangents", action="store_true",
+                        help="precompute a TANGENT attribute (see mesh_tangents.py)")
+    parser.add_argument("--rings", type=int, default=64)
+    parser.add_argument("--sectors", type=int, default=64)
+    parser.add_argument("--topology", choices=geometry.TOPOLOGIES, default="uv",
+                        help="uv: rings x sectors sphere; ico / cube / spherified (see compare_topologies.py)")
+    parser.add_argument("--level", type=int, default=None,
+                        help="detail of --topology: ico subdivisions (default 4), cube segments per face edge (default 16)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with profiling.session(args, "create_sphere"), profiling.asset("ref_sphere"):
+        build(fmt=args.format, cleanup=args.cleanup, optimize=args.optimize, rings=args.rings, sectors=args.sectors,
+              quantize=args.quantize, meshopt=args.meshopt, use_mmap=args.mmap, tangents=args.tangents,
+              topology=args.topology, level=args.level)
@@ -0,0 +1,268 @@
+"""
+Equirectangular panorama -> cube map skybox (create_skybox.py --cubemap).
+
+The 64x64 UV sphere samples milky_way_texture.jpg with a latitude/longitude
+mapping: every texture row covers the same angle of latitude, so the rows
+near the poles spend a full image width on a sliver of sky (texels squeezed
+to ~0 width, hence the pinched galaxy there) and the sphere needs thousands
+of vertices to approximate the mapping. A cube map samples the sky through
+six gnomonic (perspective) projections instead, whose texel solid angle
+varies by at most 3^1.5 = 5.2x and whose texels are never more than
+sqrt(3):1 anisotropic.
+
+Cube map textures are not a glTF feature, so the six faces go into one 3x2
+image (see atlas.py for the tile/gutter layout) and an inverted cube, or
+a subdivided cube-sphere, samples them with plain UVs:
+
+    +X -X +Y
+    -Y +Z -Z
+
+Every face is rendered at ``face_size`` texels including a ``gutter`` on
+each side. Gutters are sampled from the panorama along directions just past
+the face edge, so they hold the real neighbouring sky: bilinear filtering at
+the cube edges is seamless and the first log2(gutter) mip levels never mix
+faces. Sampling is vectorized bilinear in linear light, wrapping across the
+longitude seam and clamping at the poles.
+
+On a flat cube the UVs are exact for a viewer at the centre (a straight
+edge on a cube face projects to a straight line in the face image). On a
+cube-sphere the vertices sit at the same directions but the triangles in
+between bulge outwards, so the interpolated UVs drift; ``mesh`` reports
+the worst drift (at triangle centroids) in texels.
+
+The cube's corners sit on the sphere of the given radius, so the skybox
+never extends further than the UV sphere it replaces.
+"""
+
+import math
+import os
+
+import numpy as np
+
+import atlas
+import geometry
+import gltf_io
+import ktx2
+import textures
+
+FACE_NAMES = ("+x", "-x", "+y", "-y", "+z", "-z")
+# (forward, up) of each face as seen from inside; right = forward x up.
+FACE_AXES = {
+    "+x": ((1, 0, 0), (0, 1, 0)),
+    "-x": ((-1, 0, 0), (0, 1, 0)),
+    "+y": ((0, 1, 0), (0, 0, 1)),
+    "-y": ((0, -1, 0), (0, 0, -1)),
+    "+z": ((0, 0, 1), (0, 1, 0)),
+    "-z": ((0, 0, -1), (0, 1, 0)),
+}
+DEFAULT_GUTTER = 8
+TEXTURE_STEM = "milky_way_cube"
+
+
+def face_basis(name):
+    """(forward, right, up) float64 unit vectors of a face."""
+    forward, up = (np.array(v, dtype=np.float64) for v in FACE_AXES[name])
+    return forward, np.cross(forward, up), up
+
+
+def layout(face_size):
+    """atlas.py-style layout dict: a 3x2 grid of face_size slots."""
+    return {"size": (3 * face_size, 2 * face_size),
+            "slots": {name: ((i % 3) * face_size, (i // 3) * face_size, face_size, face_size)
+                      for i, name in enumerate(FACE_NAMES)}}
+
+
+def default_face_size(source_width):
+    """Power of two nearest (in log terms) to source_width / pi.
+
+    That matches the panorama's texel density along the horizon at the face
+    centres; the density only goes up towards the face edges.
+    """
+    return 1 << max(round(math.log2(source_width / math.pi)), 0)
+
+
+# --- Sampling ---
+
+def direction_to_uv(d):
+    """Equirectangular UV of unit directions, matching geometry.grid_sphere's mapping."""
+    u = 1.0 - np.mod(np.arctan2(d[..., 2], d[..., 0]), 2.0 * np.pi) / (2.0 * np.pi)
+    v = 1.0 - np.arccos(np.clip(-d[..., 1], -1.0, 1.0)) / np.pi
+    return u, v
+
+
+def sample_bilinear(image, u, v):
+    """Bilinear samples of an (H, W, C) image at UV arrays; wraps in u, clamps in v."""
+    height, width = image.shape[:2]
+    x = u * width - 0.5
+    y = np.clip(v * height - 0.5, 0.0, height - 1.0)
+    x0 = np.floor(x)
+    y0 = np.floor(y)
+    fx = (x - x0).astype(np.float32)[..., None]
+    fy = (y - y0).astype(np.float32)[..., None]
+    x0 = x0.astype(np.int64) % width
+    x1 = (x0 + 1) % width
+    y0 = y0.astype(np.int64)
+    y1 = np.minimum(y0 + 1, height - 1)
+    top = image[y0, x0] * (1.0 - fx) + image[y0, x1] * fx
+    bottom = image[y1, x0] * (1.0 - fx) + image[y1, x1] * fx
+    return top * (1.0 - fy) + bottom * fy
+
+
+def _face_directions(name, face_size, gutter, rows):
+    """Unit directions through the texel centres of ``rows`` of a face slot (gutter included)."""
+    forward, right, up = face_basis(name)
+    content = face_size - 2 * gutter
+    coords = (np.arange(face_size) + 0.5 - gutter) / content * 2.0 - 1.0
+    a = coords[None, :, None]
+    b = -coords[rows][:, None, None]
+    d = forward + a * right + b * up
+    return d / np.linalg.norm(d, axis=-1, keepdims=True)
+
+
+def render(linear, face_size, gutter=DEFAULT_GUTTER, chunk_rows=256):
+    """Linear float32 3x2 cube image resampled from a linear equirectangular panorama."""
+    cube = layout(face_size)
+    width, height = cube["size"]
+    image = np.empty((height, width, linear.shape[2]), dtype=np.float32)
+    for name, (x, y, w, h) in cube["slots"].items():
+        for start in range(0, h, chunk_rows):
+            rows = np.arange(start, min(start + chunk_rows, h))
+            u, v = direction_to_uv(_face_directions(name, face_size, gutter, rows))
+            image[y + rows[0]:y + rows[-1] + 1, x:x + w] = sample_bilinear(linear, u, v)
+    return image
+
+
+def write_textures(source, out_dir, face_size=None, gutter=DEFAULT_GUTTER, quality=92, write_ktx2=False,
+                   zstd_level=None, ktx2_dir=None):
+    """Write <TEXTURE_STEM>.jpg from the panorama at ``source``; returns (paths, stats).
+
+    ``write_ktx2`` adds <TEXTURE_STEM>.ktx2 in ``ktx2_dir`` (default textures.KTX2_DIR).
+    """
+    pixels = textures.load_image(source)
+    face_size = face_size or default_face_size(pixels.shape[1])
+    image = render(textures.to_linear(pixels), face_size, gutter)
+    data = textures.encode_jpeg(textures.to_srgb(image), quality)
+    jpg_path = os.path.join(out_dir, f"{TEXTURE_STEM}.jpg")
+    gltf_io.write_if_changed(jpg_path, data)
+    paths = [jpg_path]
+    stats = {"source_size": (pixels.shape[1], pixels.shape[0]), "face_size": face_size, "gutter": gutter,
+             "jpg_bytes": len(data)}
+    if write_ktx2:
+        # 3x2 faces: not a power of two, so build the mip-safe levels directly.
+        levels = [image]
+        for _ in range(atlas.mip_safe_levels(layout(face_size), gutter) - 1):
+            levels.append(np.clip(textures.halve(levels[-1], "box"), 0.0, 1.0))
+        data = ktx2.encode([textures.to_srgb(level) for level in levels], zstd_level=zstd_level)
+        ktx2_path, _ = textures.write_ktx2(TEXTURE_STEM, data, ktx2_dir or textures.KTX2_DIR)
+        paths.append(ktx2_path)
+        stats.update(ktx2_bytes=len(data), ktx2_levels=len(levels))
+    return paths, stats
+
+
+# --- Mesh ---
+
+def mesh(radius=50.0, segments=1, spherify=False, face_size=2048, gutter=DEFAULT_GUTTER):
+    """Inward-facing cube (or cube-sphere) textured with the 3x2 cube image; returns (Mesh, stats).
+
+    Each face is a ``segments`` x ``segments`` grid with its own vertices,
+    since UVs jump between tiles at every cube edge.
+    """
+    cube = layout(face_size)
+    width, height = cube["size"]
+    n = segments + 1
+    t = np.linspace(-1.0, 1.0, n)
+    a, b = np.meshgrid(t, t)  # rows go up the face (b), columns to the right (a)
+    half = radius / math.sqrt(3.0)
+
+    positions, normals, uvs, indices = [], [], [], []
+    for i, name in enumerate(FACE_NAMES):
+        forward, right, up = face_basis(name)
+        d = forward + a[..., None] * right + b[..., None] * up
+        unit = d / np.linalg.norm(d, axis=-1, keepdims=True)
+        x, y, w, h = atlas.tiles(cube, gutter)[name]
+        uv = np.stack([(x + (a + 1.0) * 0.5 * w) / width, (y + (1.0 - b) * 0.5 * h) / height], axis=-1)
+        positions.append((unit * radius if spherify else d * half).reshape(-1, 3))
+        normals.append((-unit if spherify else np.broadcast_to(-forward, d.shape)).reshape(-1, 3))
+        uvs.append(uv.reshape(-1, 2))
+        # a right, b up as seen from inside: (i0, i1, i2), (i2, i3, i0) is CCW from inside
+        indices.append(geometry._quad_grid_indices(segments, segments, n, "abccda") + i * n * n)
+
+    result = geometry.Mesh(geometry._f32(np.concatenate(positions)), geometry._f32(np.concatenate(normals)),
+                           geometry._f32(np.concatenate(uvs)), np.concatenate(indices))
+    return result, {"vertices": len(result.positions), "triangles": len(result.indices) // 3,
+                    "uv_error_px": _uv_error_px(result, face_size, gutter)}
+
+
+def _uv_error_px(m, face_size, gutter):
+    """Largest gap, in texels, between interpolated and true UVs at the triangle centroids."""
+    cube = layout(face_size)
+    width, height = cube["size"]
+    tri = m.indices.reshape(-1, 3)
+    centroid = m.positions[tri].astype(np.float64).mean(axis=1)
+    interpolated = m.uvs[tri].astype(np.float64).mean(axis=1)
+    error = 0.0
+    for i, name in enumerate(FACE_NAMES):
+        forward, right, up = face_basis(name)
+        per_face = len(tri) // 6
+        c = centroid[i * per_face:(i + 1) * per_face]
+        g = c / (c @ forward)[:, None]  # central projection onto the face plane
+        x, y, w, h = atlas.tiles(cube, gutter)[name]
+        true_uv = np.stack([(x + (g @ right + 1.0) * 0.5 * w) / width,
+                            (y + (1.0 - g @ up) * 0.5 * h) / height], axis=-1)
+        delta = (true_uv - interpolated[i * per_face:(i + 1) * per_face]) * [width, height]
+        error = max(error, float(np.abs(delta).max()))
+    return error
+
+
+# --- Texel density ---
+
+def equirect_density(width, height):
+    """Texel density stats of a width x height latitude/longitude map."""
+    edges = np.linspace(-np.pi / 2, np.pi / 2, height + 1)
+    solid_angle = (2.0 * np.pi / width) * np.diff(np.sin(edges))  # per texel, one value per row
+    centre = 0.5 * (edges[:-1] + edges[1:])
+    aspect = (2.0 * np.pi / width) * np.cos(centre) / (np.pi / height)
+    return _density_stats(solid_angle, np.maximum(aspect, 1.0 / aspect), width * height)
+
+
+def cube_density(face_size, gutter=DEFAULT_GUTTER):
+    """Texel density stats of the 3x2 cube image (gutters count as stored texels)."""
+    content = face_size - 2 * gutter
+    edges = np.linspace(-1.0, 1.0, content + 1)
+    x0, y0 = edges[:-1][None, :], edges[:-1][:, None]
+    x1, y1 = edges[1:][None, :], edges[1:][:, None]
+
+    def corner(x, y):
+        return np.arctan2(x * y, np.sqrt(x * x + y * y + 1.0))
+
+    solid_angle = corner(x1, y1) - corner(x0, y1) - corner(x1, y0) + corner(x0, y0)
+    centre = 0.5 * (edges[:-1] + edges[1:])
+    aspect = np.sqrt(1.0 + centre[None, :] ** 2 + centre[:, None] ** 2)
+    return _density_stats(solid_angle, aspect, 6 * face_size * face_size)
+
+
+def _density_stats(solid_angle, aspect, texels):
+    density = 1.0 / solid_angle  # texels per steradian
+    return {
+        "texels": texels,
+        "min_per_deg": math.sqrt(density.min()) * math.pi / 180.0,
+        "max_per_deg": math.sqrt(density.max()) * math.pi / 180.0,
+        "density_ratio": float(density.max() / density.min()),
+        "max_anisotropy": float(aspect.max()),
+        # share of the stored texels a uniform map at the minimum density would need
+        "efficiency": 4.0 * math.pi * float(density.min()) / texels,
+    }
+
+
+def report(name, sphere, cube):
+    """Two-line comparison of the current UV-sphere skybox and the cube map."""
+    lines = []
+    for label, stats in (("sphere", sphere), ("cube", cube)):
+        d = stats["density"]
+        lines.append(f"{name} {label:<6}: {stats['vertices']:>6} verts {stats['triangles']:>6} tris, "
+                     f"{d['texels'] / 1e6:5.1f}M texels, {d['min_per_deg']:.1f}-{d['max_per_deg']:.1f} texels/deg "
+                     f"(density ratio {d['density_ratio']:.1f}x, anisotropy up to {d['max_anisotropy']:.2f}:1, "
+                     f"{d['efficiency']:.0%} efficient)")
+    if "uv_error_px" in cube:
+        lines[-1] += f", UV drift {cube['uv_error_px']:.2f} px"
+    return "\n".join(lines)
@@ -0,0 +1,171 @@
+"""
+Deduplicate identical geometry buffers across generated assets.
+
+Every planet model carries the same 64x32 sphere buffer; only the texture URI
+differs. This stage content-hashes each buffer of each asset, writes every
+buffer shared by two or more assets once as ``geometry_<hash>.bin`` and
+rewrites the assets as .gltf files referencing it. Afterwards every reference
+is re-resolved and checked against the original bytes. Once that passes, a
+.glb input replaced by its .gltf rewrite is deleted, as is every
+``geometry_*.bin`` in the output directory that no .gltf / .glb there
+references any more (left over from earlier runs over different geometry).
+
+Usage: python tools/dedup_buffers.py [files...]   (default: every .gltf in models_dir)
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+import gltf_io
+
+models_dir = "app/src/main/assets/models"
+
+
+def _stored_size(path, gltf):
+    """Bytes on disk for an asset, including external .bin files it references."""
+    base_dir = os.path.dirname(path)
+    size = os.path.getsize(path)
+    for buf in gltf.get("buffers", []):
+        uri = buf.get("uri", "")
+        if uri and not uri.startswith("data:"):
+            size += os.path.getsize(os.path.join(base_dir, uri))
+    return size
+
+
+def validate(path, expected_hashes=None):
+    """Re-load ``path`` and check that every buffer and bufferView reference resolves.
+
+    Returns a list of problems (empty when the asset is valid).
+    """
+    problems = []
+    try:
+        gltf, buffers = gltf_io.load(path)
+    except (OSError, ValueError) as e:
+        return [f"{path}: {e}"]
+
+    for i, (buf, data) in enumerate(zip(gltf.get("buffers", []), buffers)):
+        if data is None:
+            continue  # meshopt fallback, no stored bytes
+        if buf.get("byteLength") != len(data):
+            problems.append(f"{path}: buffer {i} byteLength {buf.get('byteLength')} != {len(data)}")
+        if expected_hashes and hashlib.sha256(data).hexdigest() != expected_hashes[i]:
+            problems.append(f"{path}: buffer {i} content changed")
+    for i, view in enumerate(gltf.get("bufferViews", [])):
+        b = view.get("buffer", 0)
+        end = view.get("byteOffset", 0) + view["byteLength"]
+        if b >= len(buffers) or (buffers[b] is not None and end > len(buffers[b])):
+            problems.append(f"{path}: bufferView {i} [..{end}] exceeds buffer {b}")
+    for i, image in enumerate(gltf.get("images", [])):
+        uri = image.get("uri", "")
+        if uri and not uri.startswith("data:") and not os.path.exists(os.path.join(os.path.dirname(path), uri)):
+            problems.append(f"{path}: image {i} '{uri}' not found")
+    return problems
+
+
+def _buffer_uris(path):
+    """External buffer URIs referenced by a .gltf or .glb, without loading the buffers."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    gltf = gltf_io.parse_glb(data)[0] if data[:4] == b'glTF' else json.loads(data.decode('utf-8'))
+    return {buf["uri"] for buf in gltf.get("buffers", []) if buf.get("uri") and not buf["uri"].startswith("data:")}
+
+
+def remove_orphans(out_dir):
+    """Delete ``geometry_*.bin`` files in ``out_dir`` that no asset there references; returns their names.
+
+    Nothing is deleted if any asset in ``out_dir`` cannot be read.
+    """
+    referenced = set()
+    for path in glob.glob(os.path.join(out_dir, "*.gltf")) + glob.glob(os.path.join(out_dir, "*.glb")):
+        try:
+            referenced |= {os.path.normpath(uri) for uri in _buffer_uris(path)}
+        except (OSError, ValueError):
+            return []
+    orphans = sorted(os.path.basename(p) for p in glob.glob(os.path.join(out_dir, "geometry_*.bin"))
+                     if os.path.basename(p) not in referenced)
+    for name in orphans:
+        os.remove(os.path.join(out_dir, name))
+    return orphans
+
+
+def dedup(paths, out_dir=None, min_refs=2, indent=2):
+    """Share identical buffers between ``paths``; returns (bytes_before, bytes_after, problems)."""
+    out_dir = out_dir or os.path.dirname(paths[0])
+    assets = []
+    refs = {}
+    for path in paths:
+        gltf, buffers = gltf_io.load(path)
+        hashes = [hashlib.sha256(data).hexdigest() if data is not None else None for data in buffers]
+        assets.append((path, gltf, buffers, hashes))
+        for h in set(hashes) - {None}:
+            refs[h] = refs.get(h, 0) + 1
+
+    before = sum(_stored_size(path, gltf) for path, gltf, _, _ in assets)
+
+    shared = {}
+    for path, gltf, buffers, hashes in assets:
+        for data, h in zip(buffers, hashes):
+            if h is not None and refs[h] >= min_refs and h not in shared:
+                name = f"geometry_{h[:12]}.bin"
+                with open(os.path.join(out_dir, name), 'wb') as f:
+                    f.write(data)
+                shared[h] = name
+
+    written = []
+    replaced = []
+    for path, gltf, buffers, hashes in assets:
+        if not any(h in shared for h in hashes):
+            continue
+        out_path = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".gltf")
+        for buf, data, h in zip(gltf["buffers"], buffers, hashes):
+            if data is None:
+                continue
+            buf["byteLength"] = len(data)
+            if h in shared:
+                buf["uri"] = shared[h]
+            else:
+                buf["uri"] = gltf_io.data_uri(data)
+        with open(out_path, 'w') as f:
+            json.dump(gltf, f, indent=indent)
+        written.append((out_path, hashes))
+        if os.path.abspath(path) != os.path.abspath(out_path) and \
+                os.path.dirname(os.path.abspath(path)) == os.path.abspath(out_dir):
+            replaced.append(path)
+        print(f"{os.path.basename(path)} -> {os.path.basename(out_path)} "
+              f"({', '.join(shared.get(h, 'embedded') for h in hashes if h)})")
+
+    written_paths = {p for p, _ in written}
+    after = sum(os.path.getsize(os.path.join(out_dir, name)) for name in shared.values())
+    for path, gltf, _, _ in assets:
+        out_path = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".gltf")
+        after += os.path.getsize(out_path) if out_path in written_paths else _stored_size(path, gltf)
+
+    problems = []
+    for out_path, hashes in written:
+        problems += validate(out_path, hashes)
+    if not problems:
+        for path in replaced:
+            os.remove(path)
+            print(f"Removed {os.path.basename(path)} (replaced by its .gltf)")
+        for name in remove_orphans(out_dir):
+            print(f"Removed unreferenced {name}")
+    return before, after, problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Share identical buffers between glTF assets.")
+    parser.add_argument("files", nargs="*", help="defaults to every .gltf in " + models_dir)
+    parser.add_argument("--out-dir", help="where to write shared .bin and rewritten .gltf (default: next to inputs)")
+    parser.add_argument("--min-refs", type=int, default=2, help="share a buffer once this many assets use it")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(models_dir, "*.gltf")))
+    before, after, problems = dedup(files, args.out_dir, args.min_refs)
+    print(f"Before: {before} B, after: {after} B, saved {before - after} B "
+          f"({100.0 * (before - after) / max(before, 1):.1f}%)")
+    for p in problems:
+        print("ERROR:", p)
+    raise SystemExit(1 if problems else 0)
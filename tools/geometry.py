@@ -0,0 +1,314 @@
+"""
+Vectorized mesh kernels shared by the asset generators.
+
+Every generator returns a Mesh of C-contiguous NumPy arrays:
+positions/normals are (N, 3) float32, uvs is (N, 2) float32 (or None for
+untextured meshes) and indices is a flat uint32 triangle list. The vertex
+layout and winding match the original per-vertex loops exactly, so the
+arrays can be handed straight to the glTF writers via ``tobytes()``.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Mesh(NamedTuple):
+    positions: np.ndarray
+    normals: np.ndarray
+    uvs: np.ndarray
+    indices: np.ndarray
+
+    @property
+    def vertex_count(self):
+        return len(self.positions)
+
+    @property
+    def triangle_count(self):
+        return len(self.indices) // 3
+
+
+def _f32(a):
+    return np.ascontiguousarray(a, dtype=np.float32)
+
+
+def _quad_grid_indices(rows, cols, stride, pattern):
+    """Triangulate a rows x cols grid of quads laid out with the given row stride.
+
+    ``pattern`` lists the six quad corners to emit, each one of
+    'a' (r, c), 'b' (r, c+1), 'c' (r+1, c+1), 'd' (r+1, c).
+    """
+    r = np.arange(rows, dtype=np.uint32)[:, None]
+    c = np.arange(cols, dtype=np.uint32)[None, :]
+    a = r * stride + c
+    corners = {"a": a, "b": a + 1, "c": a + stride + 1, "d": a + stride}
+    tris = np.stack([corners[k] for k in pattern], axis=-1)
+    return np.ascontiguousarray(tris.reshape(-1), dtype=np.uint32)
+
+
+def uv_sphere(radius=0.5, width_segments=64, height_segments=32):
+    """Planet sphere: poles on Y, (width+1) x (height+1) vertices, seam column duplicated."""
+    u = np.arange(width_segments + 1, dtype=np.float64) / width_segments
+    v = np.arange(height_segments + 1, dtype=np.float64) / height_segments
+    angle_u = u * 2 * np.pi
+    angle_v = v * np.pi
+
+    cos_u, sin_u = np.cos(angle_u)[None, :], np.sin(angle_u)[None, :]
+    cos_v, sin_v = np.cos(angle_v)[:, None], np.sin(angle_v)[:, None]
+
+    px = -radius * cos_u * sin_v
+    py = np.broadcast_to(radius * cos_v, px.shape)
+    pz = radius * sin_u * sin_v
+    pos64 = np.stack([px, py, pz], axis=-1).reshape(-1, 3)
+
+    uu, vv = np.meshgrid(u, v)
+    uvs = np.stack([uu, vv], axis=-1).reshape(-1, 2)
+
+    # first = (y * (w + 1)) + x ; second = first + w + 1
+    # tris: (first, second, first + 1), (second, second + 1, first + 1)
+    indices = _quad_grid_indices(height_segments, width_segments, width_segments + 1, "adbdcb")
+
+    return Mesh(_f32(pos64), _f32(pos64 / radius), _f32(uvs), indices)
+
+
+def grid_sphere(radius=0.5, rings=32, sectors=32, inverted=False):
+    """Ring/sector sphere from tools/create_sphere.py; ``inverted`` gives the inward-facing skybox."""
+    ring_step = 1.0 / (rings - 1)
+    sector_step = 1.0 / (sectors - 1)
+    r = np.arange(rings, dtype=np.float64)[:, None]
+    s = np.arange(sectors, dtype=np.float64)[None, :]
+
+    sin_polar = np.sin(np.pi * r * ring_step)
+    y = np.broadcast_to(np.sin(-np.pi / 2 + np.pi * r * ring_step), (rings, sectors))
+    x = np.cos(2 * np.pi * s * sector_step) * sin_polar
+    z = np.sin(2 * np.pi * s * sector_step) * sin_polar
+    unit = np.stack([x, y, z], axis=-1).reshape(-1, 3)
+
+    uu = np.broadcast_to(1.0 - s * sector_step, (rings, sectors))
+    vv = np.broadcast_to(1.0 - r * ring_step, (rings, sectors))
+    uvs = np.stack([uu, vv], axis=-1).reshape(-1, 2)
+
+    if inverted:
+        # CW from outside, CCW from inside: (i0, i2, i1), (i2, i0, i3)
+        indices = _quad_grid_indices(rings - 1, sectors - 1, sectors, "acbcad")
+        normals = -unit
+    else:
+        # (i0, i1, i2), (i2, i3, i0)
+        indices = _quad_grid_indices(rings - 1, sectors - 1, sectors, "abccda")
+        normals = unit
+
+    return Mesh(_f32(unit * radius), _f32(normals), _f32(uvs), indices)
+
+
+def skybox_sphere(radius=50.0, rings=64, sectors=64):
+    """Inward-facing environment sphere used for milky_way.gltf."""
+    return grid_sphere(radius, rings, sectors, inverted=True)
+
+
+# --- Alternative planet topologies (uv_sphere-compatible UVs) ---
+
+TOPOLOGIES = ("uv", "ico", "cube", "spherified")
+
+
+def _outward(unit, tris):
+    """Flip triangles so they are CCW seen from outside, like uv_sphere."""
+    p = unit[tris]
+    facing = np.einsum('ij,ij->i', np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]), p.sum(axis=1))
+    return np.where((facing < 0)[:, None], tris[:, [0, 2, 1]], tris)
+
+
+def _cut_seam(points, tris):
+    """Split the triangles that cross the u = 0/1 meridian (z = 0, x < 0) along it.
+
+    Cut points sit on the original edges (shared by both triangles of an
+    edge, so no T-junctions) and the pieces stay in their triangle's plane:
+    the surface is unchanged, only the UVs no longer have to wrap.
+    """
+    z = points[:, 2]
+    side = np.sign(np.where(np.abs(z) < 1e-12, 0.0, z))[tris]
+    a, b = tris, np.roll(tris, -1, axis=1)  # edges ab, bc, ca
+    opposite = side * np.roll(side, -1, axis=1) < 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = z[a] / (z[a] - z[b])
+    crossing = (opposite & (points[a, 0] + (points[b, 0] - points[a, 0]) * t < 0)).any(axis=1)
+    if not crossing.any():
+        return points, tris
+
+    points = list(points)
+    cuts = {}
+
+    def cut(i, j):
+        key = (min(i, j), max(i, j))
+        if key not in cuts:
+            a, b = points[i], points[j]
+            p = a + (b - a) * (a[2] / (a[2] - b[2]))
+            p[2] = 0.0
+            cuts[key] = len(points)
+            points.append(p)
+        return cuts[key]
+
+    pieces = []
+    for tri, s in zip(tris[crossing], side[crossing]):
+        # Rotate so corner 0 is the one alone on its side (or on the meridian).
+        k = int(np.flatnonzero(s == 0)[0]) if (s == 0).any() else int(np.flatnonzero(s != np.median(s))[0])
+        a, b, c = np.roll(tri, -k)
+        sa = s[k]
+        if sa == 0:
+            m = cut(b, c)
+            pieces += [(a, b, m), (a, m, c)]
+        else:
+            mb, mc = cut(a, b), cut(a, c)
+            pieces += [(a, mb, mc), (mb, b, c), (mb, c, mc)]
+    tris = np.concatenate([tris[~crossing], np.array(pieces, dtype=tris.dtype)])
+    return np.array(points), tris
+
+
+def _equirect_mesh(points, tris, radius):
+    """Mesh for a closed, outward-wound unit-sphere triangulation with uv_sphere's UV mapping.
+
+    Seam-correct with every UV in [0, 1] (so KHR_mesh_quantization still
+    applies): triangles crossing the meridian are cut along it (_cut_seam),
+    corners on the meridian take u = 1 in triangles on its u ~ 1 side, and a
+    pole vertex (where u is undefined) takes the mean u of the other two
+    corners of each triangle. Every distinct (vertex, u) pair becomes its
+    own vertex, so only the seam and the poles are duplicated.
+    """
+    points, tris = _cut_seam(points, tris)
+    unit = points / np.linalg.norm(points, axis=1, keepdims=True)
+    u = np.mod(np.arctan2(unit[:, 2], -unit[:, 0]) / (2.0 * np.pi), 1.0)
+    v = np.arccos(np.clip(unit[:, 1], -1.0, 1.0)) / np.pi
+    pole = (np.abs(unit[:, 1]) > 1.0 - 1e-12)[tris]
+    cu = u[tris]
+    span = np.where(pole, -np.inf, cu).max(axis=1) - np.where(pole, np.inf, cu).min(axis=1)
+    cu = np.where((span > 0.5)[:, None] & (cu < 0.5), cu + 1.0, cu)
+    others = np.where(pole, 0.0, cu).sum(axis=1) / np.maximum((~pole).sum(axis=1), 1)
+    cu = np.where(pole, others[:, None], cu)
+
+    keys = np.stack([tris.reshape(-1).astype(np.float64), cu.reshape(-1)], axis=-1)
+    corners, inverse = np.unique(keys, axis=0, return_inverse=True)
+    vertex = corners[:, 0].astype(np.int64)
+    uvs = np.stack([corners[:, 1], v[vertex]], axis=-1)
+    indices = np.ascontiguousarray(inverse.reshape(-1), dtype=np.uint32)
+    return Mesh(_f32(points[vertex] * radius), _f32(unit[vertex]), _f32(uvs), indices)
+
+
+def icosphere(radius=0.5, subdivisions=3):
+    """Icosahedron with a vertex on each pole, each face split in 4 ``subdivisions`` times.
+
+    20 * 4^n triangles of nearly equal size (plus a few where the UV seam cuts
+    through them); UVs as uv_sphere (see _equirect_mesh).
+    """
+    k = np.arange(5)
+    ring_y, ring_r = 1.0 / np.sqrt(5.0), 2.0 / np.sqrt(5.0)
+    upper = np.stack([ring_r * np.cos(2 * np.pi * k / 5), np.full(5, ring_y), ring_r * np.sin(2 * np.pi * k / 5)], -1)
+    lower = np.stack([ring_r * np.cos(2 * np.pi * (k + 0.5) / 5), np.full(5, -ring_y),
+                      ring_r * np.sin(2 * np.pi * (k + 0.5) / 5)], -1)
+    unit = np.concatenate([[[0.0, 1.0, 0.0]], upper, lower, [[0.0, -1.0, 0.0]]])
+    up, lo, nxt = 1 + k, 6 + k, (k + 1) % 5
+    tris = np.concatenate([
+        np.stack([np.zeros(5, int), up, 1 + nxt], -1),  # top cap
+        np.stack([up, lo, 1 + nxt], -1),  # middle band
+        np.stack([1 + nxt, lo, 6 + nxt], -1),
+        np.stack([np.full(5, 11), 6 + nxt, lo], -1),  # bottom cap
+    ])
+
+    for _ in range(subdivisions):
+        edges = np.sort(tris[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        unique, inverse = np.unique(edges, axis=0, return_inverse=True)
+        mid = unit[unique[:, 0]] + unit[unique[:, 1]]
+        mid_index = len(unit) + inverse.reshape(-1, 3)  # midpoints of edges ab, bc, ca
+        unit = np.concatenate([unit, mid / np.linalg.norm(mid, axis=1, keepdims=True)])
+        a, b, c = tris.T
+        ab, bc, ca = mid_index.T
+        tris = np.concatenate([np.stack([a, ab, ca], -1), np.stack([ab, b, bc], -1),
+                               np.stack([ca, bc, c], -1), np.stack([ab, bc, ca], -1)])
+    return _equirect_mesh(unit, _outward(unit, tris), radius)
+
+
+_CUBE_FACES = (  # (forward, right, up)
+    ((1, 0, 0), (0, 0, 1), (0, 1, 0)), ((-1, 0, 0), (0, 0, -1), (0, 1, 0)),
+    ((0, 1, 0), (1, 0, 0), (0, 0, 1)), ((0, -1, 0), (1, 0, 0), (0, 0, -1)),
+    ((0, 0, 1), (-1, 0, 0), (0, 1, 0)), ((0, 0, -1), (1, 0, 0), (0, 1, 0)),
+)
+
+
+def cube_sphere(radius=0.5, segments=16, spherify=False):
+    """Cube with ``segments`` x ``segments`` quads per face pushed onto the sphere.
+
+    ``spherify=False`` just normalizes the cube points (cells near the cube
+    corners end up ~5x smaller than at the face centres); ``spherify=True``
+    uses the x * sqrt(1 - y^2/2 - z^2/2 + y^2 z^2 / 3) mapping, which keeps
+    the cell areas within ~1.5x. ``segments`` must be even so that a vertex
+    lands on each pole. UVs as uv_sphere (see _equirect_mesh).
+    """
+    if segments % 2:
+        raise ValueError(f"cube_sphere needs an even segment count, got {segments}")
+    n = segments + 1
+    t = np.linspace(-1.0, 1.0, n)
+    a, b = np.meshgrid(t, t)
+    points, tris = [], []
+    for i, (forward, right, up) in enumerate(_CUBE_FACES):
+        points.append((np.array(forward) + a[..., None] * np.array(right) + b[..., None] * np.array(up)).reshape(-1, 3))
+        tris.append(_quad_grid_indices(segments, segments, n, "abccda").reshape(-1, 3).astype(np.int64) + i * n * n)
+    cube = np.concatenate(points)
+    # Faces share their edge vertices: weld on the (exact) cube coordinates.
+    cube, inverse = np.unique(cube, axis=0, return_inverse=True)
+    tris = inverse.reshape(-1)[np.concatenate(tris)]
+
+    if spherify:
+        sq = cube * cube
+        unit = cube * np.sqrt(1.0 - (sq[:, [1, 2, 0]] + sq[:, [2, 0, 1]]) / 2.0
+                              + sq[:, [1, 2, 0]] * sq[:, [2, 0, 1]] / 3.0)
+    else:
+        unit = cube / np.linalg.norm(cube, axis=1, keepdims=True)
+    return _equirect_mesh(unit, _outward(unit, tris), radius)
+
+
+def sphere(topology="uv", radius=0.5, level=None):
+    """Planet sphere of the given topology; ``level`` is the detail knob of each one.
+
+    uv: width segments (height = width / 2, default 64); ico: subdivisions
+    (default 4); cube / spherified: segments per face edge (default 16).
+    """
+    if topology == "uv":
+        level = level or 64
+        return uv_sphere(radius, level, max(level // 2, 2))
+    if topology == "ico":
+        return icosphere(radius, 4 if level is None else level)
+    if topology in ("cube", "spherified"):
+        return cube_sphere(radius, level or 16, spherify=topology == "spherified")
+    raise ValueError(f"unknown topology {topology!r} (expected one of {', '.join(TOPOLOGIES)})")
+
+
+def torus(major_radius=1.0, minor_radius=0.002, major_segments=64, minor_segments=6):
+    """Closed torus around Y used for orbit rings; no UVs (``uvs`` is None)."""
+    theta = 2.0 * np.pi * np.arange(major_segments, dtype=np.float64) / major_segments
+    phi = 2.0 * np.pi * np.arange(minor_segments, dtype=np.float64) / minor_segments
+    cos_t, sin_t = np.cos(theta)[:, None], np.sin(theta)[:, None]
+    cos_p, sin_p = np.cos(phi)[None, :], np.sin(phi)[None, :]
+
+    grid = (major_segments, minor_segments)
+    tube = major_radius + minor_radius * cos_p
+    pos = np.stack([
+        tube * cos_t,
+        np.broadcast_to(minor_radius * sin_p, grid),
+        tube * sin_t,
+    ], axis=-1).reshape(-1, 3)
+    nrm = np.stack([
+        cos_p * cos_t,
+        np.broadcast_to(sin_p, grid),
+        cos_p * sin_t,
+    ], axis=-1).reshape(-1, 3)
+
+    # Both directions wrap, so build indices from explicit (i, j) and (i+1, j+1) mod n.
+    i = np.arange(major_segments, dtype=np.uint32)[:, None]
+    j = np.arange(minor_segments, dtype=np.uint32)[None, :]
+    i_next = (i + 1) % major_segments
+    j_next = (j + 1) % minor_segments
+    v0 = i * minor_segments + j
+    v1 = i_next * minor_segments + j
+    v2 = i_next * minor_segments + j_next
+    v3 = i * minor_segments + j_next
+    indices = np.stack([v0, v1, v2, v0, v2, v3], axis=-1).reshape(-1)
+
+    return Mesh(_f32(pos), _f32(nrm), None, np.ascontiguousarray(indices, dtype=np.uint32))
@@ -0,0 +1,428 @@
+"""
+glTF container helpers shared by the asset generators.
+
+Handles the three ways our assets store geometry: JSON with an embedded
+base64 ``data:`` URI (the original .gltf output), JSON next to an external
+.bin, and binary glTF (.glb) with a single 4-byte-aligned BIN chunk.
+"""
+
+import base64
+import json
+import mmap
+import os
+import struct
+
+import profiling
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A  # "JSON"
+CHUNK_BIN = 0x004E4942  # "BIN\0"
+
+FORMATS = ("gltf", "glb")
+DATA_URI_PREFIX = "data:application/octet-stream;base64,"
+
+# (bytes, componentType, dtype) of the glTF index types, narrowest first
+INDEX_TYPES = ((1, 5121, '<u1'), (2, 5123, '<u2'), (4, 5125, '<u4'))
+# Filament expands UNSIGNED_BYTE indices to 16 bits on load (and Vulkan / D3D
+# have no 8-bit index buffers), so byte indices only pay off in file size.
+MIN_INDEX_BYTES = 2
+
+
+def align4(n):
+    return (n + 3) & ~3
+
+
+def as_bytes(data):
+    """Flat byte view of bytes-like ``data`` or a NumPy array, without copying contiguous arrays."""
+    if hasattr(data, "flags") and not data.flags.c_contiguous:
+        data = data.copy(order='C')
+    return memoryview(data).cast('B')
+
+
+class BufferWriter:
+    """Stream arrays into one glTF binary buffer.
+
+    Each ``write`` pads to glTF's 4-byte alignment and then copies the array's
+    memory in one bulk write, so the Python cost per view is constant however
+    large the mesh is. ``target`` is a path, an open binary file or None (kept
+    in memory, see ``getvalue``). Given ``size`` (see ``size_of``), a path
+    target is preallocated and written through mmap instead of file writes;
+    on a 2048x2048 skybox that measured slower than buffered writes.
+    Also accepts ``+=`` of raw bytes, so ``append_view``/``add_mesh`` can
+    stream into it like a bytearray.
+    """
+
+    def __init__(self, target=None, size=None):
+        self.offset = 0
+        self._memory = bytearray() if target is None else None
+        self._owned = isinstance(target, str)
+        self._file = open(target, 'w+b' if size else 'wb') if self._owned else target
+        self._map = None
+        if self._owned and size:
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+
+    @staticmethod
+    def size_of(arrays):
+        """Buffer size needed to ``write`` every array in order."""
+        total = 0
+        for array in arrays:
+            total = align4(total) + array.nbytes
+        return total
+
+    def __len__(self):
+        return self.offset
+
+    def __iadd__(self, data):
+        data = as_bytes(data)
+        if self._map is not None:
+            self._map[self.offset:self.offset + len(data)] = data
+        elif self._memory is not None:
+            self._memory += data
+        else:
+            self._file.write(data)
+        self.offset += len(data)
+        return self
+
+    def write(self, array, bounds=False):
+        """Append ``array`` as one aligned view; returns (offset, length, min, max).
+
+        min/max are per-component lists computed from the written values when
+        ``bounds`` is set (as glTF requires for POSITION), otherwise None.
+        """
+        self += b'\x00' * (align4(self.offset) - self.offset)
+        offset = self.offset
+        self += array
+        lo = hi = None
+        if bounds and len(array):
+            flat = array.reshape(len(array), -1)
+            # Per-column reductions: much faster than min(axis=0) over a narrow (N, k) array
+            lo = [flat[:, k].min().item() for k in range(flat.shape[1])]
+            hi = [flat[:, k].max().item() for k in range(flat.shape[1])]
+        return offset, self.offset - offset, lo, hi
+
+    def getvalue(self):
+        return bytes(self._memory)
+
+    def close(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            self._file.truncate(self.offset)
+        if self._owned:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def data_uri(bin_data):
+    return DATA_URI_PREFIX + base64.b64encode(bin_data).decode('utf-8')
+
+
+def decode_data_uri(uri):
+    return base64.b64decode(uri.split(",", 1)[1])
+
+
+def json_indent(text):
+    """Indent width used by a pretty-printed .gltf (None for compact JSON), so rewrites keep its style."""
+    lines = text.splitlines()
+    if len(lines) < 2:
+        return None
+    return len(lines[1]) - len(lines[1].lstrip(" ")) or None
+
+
+def index_type(vertex_count, min_bytes=MIN_INDEX_BYTES):
+    """(componentType, dtype) of the narrowest index type that addresses ``vertex_count`` vertices.
+
+    The all-ones value of each type is left unused (glTF reserves it for
+    primitive restart), so UNSIGNED_SHORT covers up to 65,535 vertices.
+    """
+    for size, component_type, dtype in INDEX_TYPES:
+        if size >= min_bytes and vertex_count < 1 << (8 * size):
+            return component_type, dtype
+    raise ValueError(f"{vertex_count} vertices do not fit 32-bit indices")
+
+
+def pack_indices(indices, vertex_count, min_bytes=MIN_INDEX_BYTES):
+    """Return (componentType, array) with ``indices`` cast to ``index_type(vertex_count)``."""
+    component_type, dtype = index_type(vertex_count, min_bytes)
+    return component_type, indices.astype(dtype)
+
+
+def output_path(path, fmt):
+    """Swap the extension of ``path`` to match the output format."""
+    return os.path.splitext(path)[0] + "." + fmt
+
+
+def glb_bytes(gltf, bin_data):
+    """Serialize ``gltf`` + ``bin_data`` as a GLB blob. buffers[0] becomes the BIN chunk."""
+    gltf = dict(gltf)
+    buffers = [dict(b) for b in gltf.get("buffers", [])]
+    if bin_data is not None:
+        if not buffers:
+            buffers.append({})
+        buffers[0].pop("uri", None)
+        buffers[0]["byteLength"] = len(bin_data)
+    gltf["buffers"] = buffers
+
+    json_data = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_data += b' ' * (align4(len(json_data)) - len(json_data))
+
+    chunks = [struct.pack('<II', len(json_data), CHUNK_JSON), json_data]
+    if bin_data is not None:
+        padded = align4(len(bin_data))
+        chunks += [struct.pack('<II', padded, CHUNK_BIN), bytes(bin_data), b'\x00' * (padded - len(bin_data))]
+
+    total = 12 + sum(len(c) for c in chunks)
+    return b''.join([struct.pack('<III', GLB_MAGIC, GLB_VERSION, total)] + chunks)
+
+
+def write_if_changed(path, data):
+    """Write ``data`` to ``path`` unless the file already holds exactly these bytes.
+
+    Returns True when the file was written. Unchanged files keep their mtime,
+    so incremental asset packaging can skip them. The write goes through a
+    temporary file and ``os.replace``.
+    """
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def write_glb(path, gltf, bin_data):
+    with profiling.stage("pack"):
+        data = glb_bytes(gltf, bin_data)
+    with profiling.stage("write"), open(path, 'wb') as f:
+        f.write(data)
+
+
+def parse_glb(data):
+    """Return (gltf, bin_data or None) from a GLB blob.
+
+    The BIN chunk is padded to 4 bytes, so it may be up to 3 bytes longer
+    than buffers[0].byteLength; ``bin_data`` is trimmed to the declared length.
+    """
+    magic, version, length = struct.unpack_from('<III', data, 0)
+    if magic != GLB_MAGIC or version != GLB_VERSION:
+        raise ValueError("not a glTF 2.0 binary")
+    offset = 12
+    gltf, bin_data = None, None
+    while offset < length:
+        chunk_len, chunk_type = struct.unpack_from('<II', data, offset)
+        body = data[offset + 8:offset + 8 + chunk_len]
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(bytes(body).decode('utf-8'))
+        elif chunk_type == CHUNK_BIN and bin_data is None:
+            bin_data = bytes(body)
+        offset += 8 + chunk_len
+    if gltf is None:
+        raise ValueError("GLB has no JSON chunk")
+    buffers = gltf.get("buffers", [])
+    if bin_data is not None and buffers and "uri" not in buffers[0]:
+        declared = buffers[0].get("byteLength", len(bin_data))
+        if 0 < len(bin_data) - declared <= 3:
+            bin_data = bin_data[:declared]
+    return gltf, bin_data
+
+
+def is_fallback(buffer):
+    """True for an EXT_meshopt_compression fallback buffer (its bytes come from decoding)."""
+    return bool(buffer.get("extensions", {}).get("EXT_meshopt_compression", {}).get("fallback"))
+
+
+@profiling.profiled("load")
+def load(path):
+    """Load a .gltf or .glb and resolve every buffer.
+
+    Returns (gltf, buffers) where buffers[i] holds the bytes of gltf["buffers"][i],
+    or None for an EXT_meshopt_compression fallback buffer stored without data.
+    """
+    base_dir = os.path.dirname(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    glb_bin = None
+    if data[:4] == b'glTF':
+        gltf, glb_bin = parse_glb(data)
+    else:
+        gltf = json.loads(data.decode('utf-8'))
+
+    buffers = []
+    for i, buf in enumerate(gltf.get("buffers", [])):
+        uri = buf.get("uri")
+        if uri is None and is_fallback(buf):
+            buffers.append(None)
+        elif uri is None:
+            if i != 0 or glb_bin is None:
+                raise ValueError(f"{path}: buffer {i} has no uri and no GLB BIN chunk")
+            buffers.append(glb_bin)
+        elif uri.startswith("data:"):
+            buffers.append(decode_data_uri(uri))
+        else:
+            with open(os.path.join(base_dir, uri), 'rb') as f:
+                buffers.append(f.read())
+    return gltf, buffers
+
+
+def write(path, gltf, bin_data, fmt="gltf", indent=2, bin_uri=None):
+    """Write an asset whose geometry lives in buffers[0] as .gltf or .glb; returns the path written.
+
+    For .gltf the buffer is embedded as a base64 data URI, or written next to
+    the JSON as ``bin_uri`` when one is given. Any further buffers (e.g.
+    uri-less meshopt fallback buffers) are kept as they are.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {FORMATS}")
+    path = output_path(path, fmt)
+    if fmt == "glb":
+        write_glb(path, gltf, bin_data)
+    else:
+        gltf = dict(gltf)
+        rest = gltf.get("buffers", [])[1:]
+        if bin_uri:
+            with profiling.stage("write"), open(os.path.join(os.path.dirname(path), bin_uri), 'wb') as f:
+                f.write(bin_data)
+            gltf["buffers"] = [{"uri": bin_uri, "byteLength": len(bin_data)}] + rest
+        else:
+            with profiling.stage("base64"):
+                gltf["buffers"] = [{"byteLength": len(bin_data), "uri": data_uri(bin_data)}] + rest
+        with profiling.stage("json"):
+            text = json.dumps(gltf, indent=indent)
+        with profiling.stage("write"), open(path, 'w') as f:
+            f.write(text)
+    return path
+
+
+def merge_buffers(gltf, buffers):
+    """Concatenate every buffer into one 4-byte-aligned blob and rebase the bufferViews.
+
+    Images stored as data URIs are moved into bufferViews so the result can go
+    into a single GLB BIN chunk. Buffers loaded as None (meshopt fallbacks) stay
+    separate, after the merged one. Returns (gltf, bin_data); ``gltf`` is a copy.
+    """
+    gltf = json.loads(json.dumps(gltf))
+    blob = bytearray()
+    bases = []
+    kept = []
+    for buf, data in zip(gltf.get("buffers", []), buffers):
+        if data is None:
+            kept.append(buf)
+            bases.append(-len(kept))
+            continue
+        blob += b'\x00' * (align4(len(blob)) - len(blob))
+        bases.append(len(blob))
+        blob += data
+
+    def rebase(ref):
+        base = bases[ref["buffer"]]
+        if base < 0:
+            ref["buffer"] = -base
+        else:
+            ref["byteOffset"] = ref.get("byteOffset", 0) + base
+            ref["buffer"] = 0
+
+    for view in gltf.get("bufferViews", []):
+        rebase(view)
+        if "EXT_meshopt_compression" in view.get("extensions", {}):
+            rebase(view["extensions"]["EXT_meshopt_compression"])
+
+    for image in gltf.get("images", []):
+        uri = image.get("uri", "")
+        if uri.startswith("data:"):
+            header = uri.split(",", 1)[0]
+            blob += b'\x00' * (align4(len(blob)) - len(blob))
+            payload = base64.b64decode(uri.split(",", 1)[1])
+            gltf.setdefault("bufferViews", []).append(
+                {"buffer": 0, "byteOffset": len(blob), "byteLength": len(payload)})
+            blob += payload
+            del image["uri"]
+            image["bufferView"] = len(gltf["bufferViews"]) - 1
+            image["mimeType"] = header[5:].split(";")[0] or "application/octet-stream"
+
+    gltf["buffers"] = ([{"byteLength": len(blob)}] if blob or kept else []) + kept
+    return gltf, bytes(blob)
+
+
+def convert_to_glb(src, dst=None):
+    """Convert any .gltf (embedded or external .bin) into a .glb; returns the output path."""
+    dst = dst or output_path(src, "glb")
+    gltf, buffers = load(src)
+    gltf, bin_data = merge_buffers(gltf, buffers)
+    write_glb(dst, gltf, bin_data if bin_data else None)
+    return dst
+
+
+def with_image(gltf, uri):
+    """Shallow copy of a single-texture asset with its image pointing at ``uri``."""
+    return dict(gltf, images=[{"uri": uri}])
+
+
+def append_view(gltf, blob, data, target=None):
+    """Append ``data`` to ``blob`` (a bytearray or BufferWriter) 4-byte aligned and add a bufferView; returns its index."""
+    data = as_bytes(data)
+    blob += b'\x00' * (align4(len(blob)) - len(blob))
+    view = {"buffer": 0, "byteOffset": len(blob), "byteLength": len(data)}
+    if target is not None:
+        view["target"] = target
+    blob += data
+    gltf.setdefault("bufferViews", []).append(view)
+    return len(gltf["bufferViews"]) - 1
+
+
+def append_accessor(gltf, view, component_type, count, type_, **extra):
+    accessor = {"bufferView": view, "byteOffset": 0, "componentType": component_type, "count": count, "type": type_}
+    accessor.update(extra)
+    gltf.setdefault("accessors", []).append(accessor)
+    return len(gltf["accessors"]) - 1
+
+
+@profiling.profiled("pack")
+def add_mesh(gltf, blob, mesh, material=None, name=None, tangents=None):
+    """Append a geometry.Mesh as a new glTF mesh with one primitive; returns the mesh index.
+
+    Attributes are written as separate float32 bufferViews, indices as the
+    narrowest type that fits the vertex count (see ``index_type``).
+    ``tangents`` is an optional (N, 4) TANGENT array (see mesh_tangents.py).
+    """
+    count = len(mesh.positions)
+    attributes = {
+        "POSITION": append_accessor(
+            gltf, append_view(gltf, blob, mesh.positions, 34962), 5126, count, "VEC3",
+            max=mesh.positions.max(axis=0).tolist(), min=mesh.positions.min(axis=0).tolist()),
+    }
+    if mesh.normals is not None:
+        attributes["NORMAL"] = append_accessor(
+            gltf, append_view(gltf, blob, mesh.normals, 34962), 5126, count, "VEC3")
+    if mesh.uvs is not None:
+        attributes["TEXCOORD_0"] = append_accessor(
+            gltf, append_view(gltf, blob, mesh.uvs, 34962), 5126, count, "VEC2")
+    if tangents is not None:
+        attributes["TANGENT"] = append_accessor(
+            gltf, append_view(gltf, blob, tangents, 34962), 5126, count, "VEC4")
+    index_component, index_data = pack_indices(mesh.indices, count)
+    indices = append_accessor(
+        gltf, append_view(gltf, blob, index_data, 34963), index_component, len(mesh.indices), "SCALAR")
+
+    primitive = {"attributes": attributes, "indices": indices}
+    if material is not None:
+        primitive["material"] = material
+    entry = {"primitives": [primitive]}
+    if name:
+        entry["name"] = name
+    gltf.setdefault("meshes", []).append(entry)
+    return len(gltf["meshes"]) - 1
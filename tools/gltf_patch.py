@@ -0,0 +1,206 @@
+"""
+Streaming, in-place patches for .gltf files with embedded data: URIs.
+
+A planet .gltf is almost entirely one base64 string. ``GltfPatch`` scans
+the file in fixed-size chunks and parses only the JSON around it: every
+``"uri": "data:..."`` value is replaced by a short placeholder that keeps
+the media type header (so ``uri.startswith("data:")`` and mime checks still
+work) and remembers where the payload sits in the file. Patches edit the
+small ``gltf`` dict; ``write`` serializes it and streams each payload into
+place in fixed-size chunks:
+
+  - untouched data URIs are copied byte for byte from the source file
+  - ``embed`` points a buffer at a binary file, base64-encoded while it is
+    copied (byteLength comes from the file size, no encode/decode round trip)
+  - ``extract`` decodes a data URI straight into a file (externalized images)
+
+No full-size string or bytes object is ever built, so peak memory and time
+stay flat in the payload size. The output keeps the source's indentation
+unless ``indent`` or ``compact`` says otherwise, and goes to a temporary
+file that only replaces the target when its bytes differ.
+"""
+
+import base64
+import filecmp
+import itertools
+import json
+import os
+import re
+import tempfile
+
+import gltf_io
+
+CHUNK = 3 * 4 * 16384  # a multiple of both base64 group sizes (3 bytes <-> 4 chars)
+_DATA = b'"data:'
+_URI_KEY = re.compile(rb'"uri"\s*:\s*$')
+_counter = itertools.count()
+
+
+class _Base64Range:
+    """A base64 payload stored in ``path`` at [offset, offset + length)."""
+
+    def __init__(self, path, offset, length):
+        self.path, self.offset, self.length = path, offset, length
+
+    def byte_length(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset + self.length - 2)
+            padding = f.read(2).count(b'=')
+        return self.length // 4 * 3 - padding
+
+    def chunks(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            remaining = self.length
+            while remaining:
+                data = f.read(min(CHUNK, remaining))
+                if not data:
+                    raise ValueError(f"{self.path}: data URI truncated")
+                remaining -= len(data)
+                yield data
+
+    def decode_to(self, out):
+        for chunk in self.chunks():
+            out.write(base64.b64decode(chunk))
+
+
+class _RawFile:
+    """Binary file embedded as base64."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def byte_length(self):
+        return os.path.getsize(self.path)
+
+    def chunks(self):
+        with open(self.path, 'rb') as f:
+            while True:
+                data = f.read(CHUNK // 4 * 3)
+                if not data:
+                    return
+                yield base64.b64encode(data)
+
+    def decode_to(self, out):
+        with open(self.path, 'rb') as f:
+            while True:
+                data = f.read(CHUNK)
+                if not data:
+                    return
+                out.write(data)
+
+
+class GltfPatch:
+    """A .gltf whose JSON structure is edited in memory while its data: URIs stay in files."""
+
+    def __init__(self, path):
+        self.path = path
+        self._tag = f"gltf-patch-{os.getpid()}-{next(_counter)}"
+        self._sources = {}
+        skeleton = bytearray()
+        with open(path, 'rb') as f:
+            if f.read(4) == b'glTF':
+                raise ValueError(f"{path}: binary glTF, patch the .gltf or use gltf_io.load")
+            f.seek(0)
+            buf, offset, uri = b'', 0, None  # offset: file position of buf[0]; uri: (header, payload start)
+            while True:
+                chunk = f.read(CHUNK)
+                buf += chunk
+                while True:
+                    if uri is not None:
+                        end = buf.find(b'"')
+                        if end < 0:
+                            offset, buf = offset + len(buf), b''  # payload: skipped, read again on write
+                            break
+                        source = _Base64Range(path, uri[1], offset + end - uri[1])
+                        skeleton += json.dumps(self._register(uri[0], source)).encode('utf-8')
+                        offset, buf, uri = offset + end + 1, buf[end + 1:], None
+                        continue
+                    start = buf.find(_DATA)
+                    comma = buf.find(b',', start) if start >= 0 else -1
+                    if start < 0 or (comma < 0 and chunk):
+                        keep = start if start >= 0 else len(buf) - (len(_DATA) - 1 if chunk else 0)
+                        skeleton += buf[:max(keep, 0)]
+                        offset, buf = offset + max(keep, 0), buf[max(keep, 0):]
+                        break
+                    quote = buf.find(b'"', start + 1)
+                    skeleton += buf[:start]
+                    if comma < 0 or 0 <= quote < comma or not _URI_KEY.search(bytes(skeleton[-32:])):
+                        skeleton += buf[start:start + 1]  # not a "uri": "data:...," value, keep it as text
+                        offset, buf = offset + start + 1, buf[start + 1:]
+                        continue
+                    uri = (buf[start + 1:comma].decode('ascii'), offset + comma + 1)
+                    offset, buf = offset + comma + 1, buf[comma + 1:]
+                if not chunk:
+                    if uri is not None:
+                        raise ValueError(f"{path}: data URI not terminated")
+                    break
+        text = skeleton.decode('utf-8')
+        self.indent = gltf_io.json_indent(text)
+        self.gltf = json.loads(text)
+
+    def _register(self, header, source):
+        marker = f"{self._tag}:{len(self._sources)}"
+        self._sources[marker] = source
+        return f"{header},{marker}"
+
+    def _source(self, uri):
+        source = self._sources.get(uri.split(",", 1)[-1]) if uri.startswith("data:") else None
+        if source is None:
+            raise ValueError(f"not an embedded data URI of {self.path}")
+        return source
+
+    def data_length(self, uri):
+        """Decoded byte length of an embedded data URI, without decoding it."""
+        return self._source(uri).byte_length()
+
+    def embed(self, item, bin_path, mime_type="application/octet-stream"):
+        """Point ``item`` (a buffer or image dict) at ``bin_path`` as a data URI; returns its byte length.
+
+        A buffer's byteLength is set from the file size.
+        """
+        source = _RawFile(bin_path)
+        item["uri"] = self._register(f"data:{mime_type};base64", source)
+        if "byteLength" in item:
+            item["byteLength"] = source.byte_length()
+        return source.byte_length()
+
+    def extract(self, item, out_path, uri=None):
+        """Decode ``item``'s data URI into ``out_path`` and reference the file instead."""
+        source = self._source(item.get("uri", ""))
+        with open(out_path, 'wb') as f:
+            source.decode_to(f)
+        item["uri"] = uri or os.path.basename(out_path)
+
+    def write(self, path=None, indent=None, compact=False):
+        """Serialize to ``path`` (default: in place); returns False when the file was already identical.
+
+        ``indent`` defaults to the source's indentation; ``compact`` writes
+        minimal separators and no indentation. The payloads are still read
+        from the source, so open a new GltfPatch after writing in place.
+        """
+        path = path or self.path
+        if compact:
+            text = json.dumps(self.gltf, separators=(',', ':'))
+        else:
+            text = json.dumps(self.gltf, indent=self.indent if indent is None else indent)
+        pieces = re.split('(' + re.escape(self._tag) + r':\d+)', text)
+        fd, tmp = tempfile.mkstemp(prefix=".patch_", dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for i, piece in enumerate(pieces):
+                    if i % 2 == 0:
+                        out.write(piece.encode('utf-8'))
+                        continue
+                    for chunk in self._sources[piece].chunks():
+                        out.write(chunk)
+            if os.path.exists(path) and filecmp.cmp(tmp, path, shallow=False):
+                os.remove(tmp)
+                return False
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+            return True
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
@@ -0,0 +1,147 @@
+"""
+Minimal KTX2 container writer/reader for uncompressed 8-bit textures.
+
+Only what the texture stage needs: one 2D image (no array layers, no cube
+faces) with a full or partial mip chain of R8G8B8A8_SRGB (or _UNORM)
+texels, optionally zstd-supercompressed per level (supercompressionScheme
+2). RGB input gets an opaque alpha channel: most mobile GPUs cannot sample
+the 24-bit formats, which decode() still reads. zstd needs the optional
+``zstandard`` module.
+
+Layout follows the KTX 2.0 spec: header, level index (largest level first),
+a basic data format descriptor, key/value data, then the level images
+stored smallest first, each aligned to lcm(texel size, 4) bytes when not
+supercompressed.
+"""
+
+import struct
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+IDENTIFIER = b'\xabKTX 20\xbb\r\n\x1a\n'
+MIME_TYPE = "image/ktx2"
+
+# (channels, srgb) -> VkFormat
+VK_FORMATS = {(3, False): 23, (3, True): 29, (4, False): 37, (4, True): 43}
+SUPERCOMPRESSION_NONE = 0
+SUPERCOMPRESSION_ZSTD = 2
+
+_HEADER = struct.Struct('<12s9I')
+_INDEX = struct.Struct('<4I2Q')
+_LEVEL = struct.Struct('<3Q')
+
+# Data format descriptor constants (KHR_DF_*)
+_MODEL_RGBSDA = 1
+_PRIMARIES_BT709 = 1
+_TRANSFER_LINEAR = 1
+_TRANSFER_SRGB = 2
+_CHANNEL_IDS = [0, 1, 2, 15]  # R, G, B, A
+_QUALIFIER_LINEAR = 0x80
+
+
+def _pad(n, alignment):
+    return (alignment - n % alignment) % alignment
+
+
+def _dfd(channels, srgb, supercompressed):
+    samples = []
+    for i in range(channels):
+        channel = _CHANNEL_IDS[i]
+        if channel == 15 and srgb:
+            channel |= _QUALIFIER_LINEAR  # alpha is never sRGB-encoded
+        samples.append(struct.pack('<HBB4BII', i * 8, 7, channel, 0, 0, 0, 0, 0, 255))
+    block_size = 24 + 16 * len(samples)
+    block = struct.pack('<IHH4B4B8B', 0, 2, block_size,
+                        _MODEL_RGBSDA, _PRIMARIES_BT709, _TRANSFER_SRGB if srgb else _TRANSFER_LINEAR, 0,
+                        0, 0, 0, 0,
+                        0 if supercompressed else channels, 0, 0, 0, 0, 0, 0, 0) + b''.join(samples)
+    return struct.pack('<I', 4 + len(block)) + block
+
+
+def _kvd(pairs):
+    out = bytearray()
+    for key in sorted(pairs):
+        entry = key.encode('utf-8') + b'\x00' + pairs[key].encode('utf-8') + b'\x00'
+        out += struct.pack('<I', len(entry)) + entry
+        out += b'\x00' * _pad(len(out), 4)
+    return bytes(out)
+
+
+def encode(levels, srgb=True, zstd_level=None, writer="PocketOrrery texture stage"):
+    """Return R8G8B8A8 KTX2 bytes for a mip chain of (H, W, 3 or 4) uint8 arrays, largest first.
+
+    ``zstd_level`` (e.g. 10) supercompresses every level with zstd.
+    """
+    if zstd_level is not None and zstandard is None:
+        raise RuntimeError("zstd supercompression needs the zstandard module (pip install zstandard)")
+    height, width, channels = levels[0].shape
+    if channels not in (3, 4):
+        raise ValueError(f"unsupported channel count {channels}")
+    if channels == 3:
+        levels = [np.concatenate([level, np.full(level.shape[:2] + (1,), 255, np.uint8)], axis=2)
+                  for level in levels]
+        channels = 4
+    supercompressed = zstd_level is not None
+    compressor = zstandard.ZstdCompressor(level=zstd_level) if supercompressed else None
+
+    dfd = _dfd(channels, srgb, supercompressed)
+    kvd = _kvd({"KTXorientation": "rd", "KTXwriter": writer})
+    level_index_size = _LEVEL.size * len(levels)
+    dfd_offset = _HEADER.size + _INDEX.size + level_index_size
+    kvd_offset = dfd_offset + len(dfd)
+    data_start = kvd_offset + len(kvd)
+
+    alignment = 1 if supercompressed else np.lcm(channels, 4)
+    body = bytearray()
+    entries = [None] * len(levels)
+    for i in reversed(range(len(levels))):
+        raw = np.ascontiguousarray(levels[i], dtype=np.uint8).tobytes()
+        data = compressor.compress(raw) if supercompressed else raw
+        body += b'\x00' * _pad(data_start + len(body), alignment)
+        entries[i] = (data_start + len(body), len(data), len(raw))
+        body += data
+
+    header = _HEADER.pack(IDENTIFIER, VK_FORMATS[channels, srgb], 1, width, height, 0, 0, 1, len(levels),
+                          SUPERCOMPRESSION_ZSTD if supercompressed else SUPERCOMPRESSION_NONE)
+    index = _INDEX.pack(dfd_offset, len(dfd), kvd_offset, len(kvd), 0, 0)
+    return header + index + b''.join(_LEVEL.pack(*e) for e in entries) + dfd + kvd + bytes(body)
+
+
+def header(data):
+    """Info dict of a KTX2 file written by ``encode``, read from its header without decoding any level."""
+    identifier, vk_format, _, width, height, _, _, _, level_count, scheme = _HEADER.unpack_from(data, 0)
+    if identifier != IDENTIFIER:
+        raise ValueError("not a KTX2 file")
+    formats = {v: k for k, v in VK_FORMATS.items()}
+    if vk_format not in formats:
+        raise ValueError(f"unsupported vkFormat {vk_format}")
+    channels, srgb = formats[vk_format]
+    return {"width": width, "height": height, "channels": channels, "srgb": srgb,
+            "levels": max(level_count, 1), "zstd": scheme == SUPERCOMPRESSION_ZSTD, "scheme": scheme}
+
+
+def decode(data):
+    """Parse KTX2 bytes written by ``encode``; returns (info dict, list of (H, W, C) uint8 levels)."""
+    info = header(data)
+    scheme = info.pop("scheme")
+    if scheme == SUPERCOMPRESSION_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("reading zstd-supercompressed KTX2 needs the zstandard module")
+        decompressor = zstandard.ZstdDecompressor()
+    elif scheme != SUPERCOMPRESSION_NONE:
+        raise ValueError(f"unsupported supercompression scheme {scheme}")
+
+    levels = []
+    for i in range(info["levels"]):
+        offset, length, raw_length = _LEVEL.unpack_from(data, _HEADER.size + _INDEX.size + i * _LEVEL.size)
+        raw = bytes(data[offset:offset + length])
+        if scheme == SUPERCOMPRESSION_ZSTD:
+            raw = decompressor.decompress(raw, max_output_size=raw_length)
+        h, w = max(info["height"] >> i, 1), max(info["width"] >> i, 1)
+        levels.append(np.frombuffer(raw, np.uint8).reshape(h, w, info["channels"]))
+    return info, levels
@@ -0,0 +1,170 @@
+"""
+LOD chains for the celestial body spheres.
+
+Each level is a UV sphere with ``segments`` x ``segments // 2`` quads. Its
+geometric error is the largest gap between a triangle and the true sphere
+(radius minus the triangle plane's distance from the centre, an upper bound
+on the deviation anywhere inside the triangle).
+
+From the errors we derive MSFT_screencoverage thresholds: level i+1 takes
+over once level i+1's error projects to less than ``tolerance_px`` pixels,
+i.e. when the body covers less than 2 * r * tolerance / (error * screen_px)
+of the screen height.
+
+Chains are packaged either as one asset using MSFT_lod (the node holding the
+extension is the finest level, its ``ids`` list the coarser ones) or as
+sibling files plus a ``<name>_lod.json`` manifest.
+"""
+
+import json
+import os
+
+import numpy as np
+
+import geometry
+import gltf_io
+import meshopt_codec
+import mesh_tangents
+
+DEFAULT_LEVELS = (8, 16, 32, 64, 128)
+PACKAGING = ("msft", "files")
+DEFAULT_TOLERANCE_PX = 1.0
+DEFAULT_SCREEN_PX = 1920
+
+
+def geometric_error(mesh, radius):
+    """Max distance between the faceted mesh and a true sphere of ``radius``."""
+    p = mesh.positions.astype(np.float64)
+    tris = mesh.indices.reshape(-1, 3)
+    a, b, c = p[tris[:, 0]], p[tris[:, 1]], p[tris[:, 2]]
+    n = np.cross(b - a, c - a)
+    length = np.linalg.norm(n, axis=1)
+    valid = length > 0
+    plane_distance = np.abs(np.einsum('ij,ij->i', n[valid], a[valid])) / length[valid]
+    return float(radius - plane_distance.min()) if len(plane_distance) else 0.0
+
+
+def build_chain(levels=DEFAULT_LEVELS, radius=0.5, process=None):
+    """Generate one sphere per segment count, finest first.
+
+    ``process(mesh, label)`` may post-process each level (cleanup/optimize) and
+    must return a Mesh. Returns a list of dicts with segments, mesh and error.
+    """
+    chain = []
+    for segments in sorted(levels, reverse=True):
+        mesh = geometry.uv_sphere(radius, segments, max(segments // 2, 2))
+        if process:
+            mesh = process(mesh, f"{segments}x{max(segments // 2, 2)}")
+        chain.append({"segments": segments, "mesh": mesh, "error": geometric_error(mesh, radius)})
+    return chain
+
+
+def screen_coverages(chain, radius=0.5, tolerance_px=DEFAULT_TOLERANCE_PX, screen_px=DEFAULT_SCREEN_PX):
+    """MSFT_screencoverage per level: minimum screen-height fraction at which the level is used."""
+    coverages = []
+    for i in range(len(chain)):
+        if i + 1 < len(chain):
+            coverages.append(min(1.0, 2.0 * radius * tolerance_px / (chain[i + 1]["error"] * screen_px)))
+        else:
+            coverages.append(0.0)  # coarsest level is never culled
+    return coverages
+
+
+def msft_lod_gltf(chain, coverages, material, texture_name, generator, node_name="Sphere"):
+    """Single asset with every level; returns (gltf, bin_data). Levels may carry "tangents"."""
+    gltf = {
+        "asset": {"version": "2.0", "generator": generator},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [],
+        "materials": [material],
+        "textures": [{"source": 0}],
+        "images": [{"uri": texture_name}],
+    }
+    blob = bytearray()
+    for level in chain:
+        mesh = gltf_io.add_mesh(gltf, blob, level["mesh"], material=0, name=f"{node_name}_{level['segments']}",
+                                tangents=level.get("tangents"))
+        gltf["nodes"].append({"mesh": mesh, "name": f"{node_name}_LOD{len(gltf['nodes'])}",
+                              "extras": {"geometricError": level["error"]}})
+    base = gltf["nodes"][0]
+    base["name"] = node_name
+    if len(chain) > 1:
+        base["extensions"] = {"MSFT_lod": {"ids": list(range(1, len(chain)))}}
+        gltf["extensionsUsed"] = ["MSFT_lod"]
+    base["extras"]["MSFT_screencoverage"] = coverages
+    gltf["buffers"] = [{"byteLength": len(blob)}]
+    return gltf, bytes(blob)
+
+
+def build_assets(chain, material, texture_name, generator, packaging="msft",
+                 tolerance_px=DEFAULT_TOLERANCE_PX, screen_px=DEFAULT_SCREEN_PX, radius=0.5,
+                 meshopt=False, tangents=False):
+    """Build the chain's assets without writing them; returns (assets, manifest).
+
+    ``assets`` lists (suffix, gltf, bin_data): one entry with suffix "" for
+    msft packaging, one "_lod<i>" entry per level for files packaging. The
+    files manifest lacks the per-level "file" names, which write_assets fills in.
+    """
+    coverages = screen_coverages(chain, radius, tolerance_px, screen_px)
+    if tangents:
+        for level in chain:
+            level["tangents"], _ = mesh_tangents.generate(level["mesh"])
+    if packaging == "msft":
+        gltf, blob = msft_lod_gltf(chain, coverages, material, texture_name, generator)
+        if meshopt:
+            gltf, blob, _ = meshopt_codec.compress_gltf(gltf, blob)
+        return [("", gltf, blob)], None
+
+    assets, levels = [], []
+    for i, (level, coverage) in enumerate(zip(chain, coverages)):
+        gltf, blob = msft_lod_gltf([level], [coverage], material, texture_name, generator)
+        if meshopt:
+            gltf, blob, _ = meshopt_codec.compress_gltf(gltf, blob)
+        assets.append((f"_lod{i}", gltf, blob))
+        levels.append({
+            "segments": level["segments"],
+            "vertices": level["mesh"].vertex_count,
+            "triangles": level["mesh"].triangle_count,
+            "geometricError": level["error"],
+            "screenCoverage": coverage,
+        })
+    return assets, {"tolerancePx": tolerance_px, "screenPx": screen_px, "levels": levels}
+
+
+def write_assets(output_file, assets, manifest, fmt="gltf", texture_name=None):
+    """Write build_assets() output for one body; returns the list of paths written.
+
+    ``texture_name`` retargets the image, so one built chain can serve every body.
+    """
+    stem = os.path.splitext(output_file)[0]
+    written = []
+    for suffix, gltf, blob in assets:
+        if texture_name is not None:
+            gltf = gltf_io.with_image(gltf, texture_name)
+        written.append(gltf_io.write(f"{stem}{suffix}.{fmt}" if suffix else output_file, gltf, blob, fmt))
+    if manifest is None:
+        return written
+    manifest_path = f"{stem}_lod.json"
+    levels = [{"file": os.path.basename(path), **level} for path, level in zip(written, manifest["levels"])]
+    with open(manifest_path, 'w') as f:
+        json.dump(dict(manifest, levels=levels), f, indent=2)
+    return written + [manifest_path]
+
+
+def write_chain(output_file, chain, material, texture_name, generator, fmt="gltf",
+                packaging="msft", tolerance_px=DEFAULT_TOLERANCE_PX, screen_px=DEFAULT_SCREEN_PX, radius=0.5,
+                meshopt=False, tangents=False):
+    """Write the chain for one body; returns the list of paths written."""
+    assets, manifest = build_assets(chain, material, texture_name, generator, packaging, tolerance_px, screen_px,
+                                    radius, meshopt, tangents)
+    return write_assets(output_file, assets, manifest, fmt)
+
+
+def report(name, chain, coverages):
+    lines = [f"{name} LOD chain:"]
+    for i, (level, coverage) in enumerate(zip(chain, coverages)):
+        lines.append(f"  LOD{i}: {level['segments']:>4} segs, {level['mesh'].vertex_count:>6} verts, "
+                     f"{level['mesh'].triangle_count:>6} tris, error {level['error']:.5f}, "
+                     f"used above {coverage:.3f} screen height")
+    return "\n".join(lines)
@@ -1,6 +1,10 @@
-import json
+import argparse
 import os
-import base64
+
+import gltf_io
+import gltf_patch
+import meshopt_codec
+import profiling
 
 models_dir = "app/src/main/assets/models"
 planets = ["mercury", "venus", "earth", "mars", "jupiter", "saturn", "uranus", "neptune", "sun"]
@@ -10,92 +14,135 @@ EMBED_GEOMETRY = True  # Embed .bin data into .gltf
 EXTERNAL_TEXTURES = True # Keep .jpg files external
 ADD_SUN_LIGHT = True   # Add KHR_lights_punctual to Sun
 
-def run():
+def add_sun_light(gltf):
+    # Point light on node 0 via KHR_lights_punctual (idempotent)
+    # Add Extension Decl
+    if "extensionsUsed" not in gltf: gltf["extensionsUsed"] = []
+    if "KHR_lights_punctual" not in gltf["extensionsUsed"]:
+        gltf["extensionsUsed"].append("KHR_lights_punctual")
+    
+    # Light Def
+    light_def = {
+        "type": "point",
+        "color": [1.0, 1.0, 1.0],
+        "intensity": 2000.0, 
+        "range": 100.0 
+    }
+    
+    if "extensions" not in gltf: gltf["extensions"] = {}
+    gltf["extensions"]["KHR_lights_punctual"] = { "lights": [light_def] }
+    
+    # Attach to Node 0
+    node = gltf["nodes"][0]
+    if "extensions" not in node: node["extensions"] = {}
+    node["extensions"]["KHR_lights_punctual"] = { "light": 0 }
+    return gltf
+
+def run(fmt="gltf", meshopt=False, indent=None, compact=False):
+    # fmt="gltf" rewrites each {planet}.gltf in place (base64 geometry when EMBED_GEOMETRY).
+    # fmt="glb" writes {planet}.glb next to it instead: raw BIN chunk, no base64 at all.
+    # meshopt=True stores the geometry as EXT_meshopt_compression streams (see meshopt_codec.py).
+    # The .gltf is patched in place keeping its indentation, or with indent=N / compact=True (no whitespace).
     # 1. Load Geometry (if needed for embedding)
     # If the user deleted the glTFs but kept sphere.bin, we can reload.
     # Ideally we expect sphere.bin OR ref_sphere.gltf to exist if we are starting fresh.
     # But if we are maintaining, we assume the glTF exists.
     
     bin_path = os.path.join(models_dir, "sphere.bin")
-    bin_data_uri = None
-    if os.path.exists(bin_path):
+    bin_data = None
+    if os.path.exists(bin_path) and (fmt == "glb" or meshopt):
         with open(bin_path, 'rb') as f:
             bin_data = f.read()
-        b64_data = base64.b64encode(bin_data).decode('utf-8')
-        bin_data_uri = f"data:application/octet-stream;base64,{b64_data}"
-    
+
     for p in planets:
         gltf_path = os.path.join(models_dir, f"{p}.gltf")
         if not os.path.exists(gltf_path):
             print(f"Skipping {p}, not found")
             continue
 
-        with open(gltf_path, 'r') as f:
-            gltf = json.load(f)
+        with profiling.asset(p):
+            patch = None
+            if fmt == "glb" or meshopt:
+                gltf, buffers = gltf_io.load(gltf_path)
+                if meshopt_codec.EXTENSION in gltf.get("extensionsUsed", []):
+                    # Already compressed: patch the decoded geometry and re-encode it below
+                    gltf, decoded = meshopt_codec.decompress_gltf(gltf, buffers)
+                    buffers = [decoded]
+                if bin_data is not None:
+                    buffers[0] = bin_data
+                    gltf["buffers"][0]["byteLength"] = len(bin_data)
+            else:
+                # Streams the data URIs between files and only parses the JSON around them (gltf_patch.py)
+                with profiling.stage("scan"):
+                    patch = gltf_patch.GltfPatch(gltf_path)
+                gltf = patch.gltf
+
+            # A. Embed Geometry
+            if EMBED_GEOMETRY and patch is not None:
+                uri = gltf["buffers"][0].get("uri", "")
+                if os.path.exists(bin_path): # Always update if we have new bin data
+                    with profiling.stage("embed"):
+                        patch.embed(gltf["buffers"][0], bin_path)
+                    print(f"Embedded geometry in {p}.gltf")
+                elif not uri.startswith("data:"):
+                    print(f"Warning: Could not embed geometry in {p}, sphere.bin missing")
+
+            # B. Externalize Textures
+            if EXTERNAL_TEXTURES:
+                if "images" in gltf:
+                    for img in gltf["images"]:
+                        uri = img.get("uri", "")
+                        if uri.startswith("data:"):
+                            try:
+                                header = uri.split(",", 1)[0]
+                                ext = "png" if "png" in header else "jpg"
+                                tex_filename = f"{p}_texture.{ext}"
+                                tex_path = os.path.join(models_dir, tex_filename)
 
-        # A. Embed Geometry
-        if EMBED_GEOMETRY:
-            # Check if buffer is already embedded
-            uri = gltf["buffers"][0].get("uri", "")
-            if bin_data_uri: # Always update if we have new bin data
-                # Replace with embedded data
-                gltf["buffers"][0]["uri"] = bin_data_uri
-                gltf["buffers"][0]["byteLength"] = len(base64.b64decode(bin_data_uri.split(",")[1]))
-                print(f"Embedded geometry in {p}.gltf")
-            elif not uri.startswith("data:") and not bin_data_uri:
-                print(f"Warning: Could not embed geometry in {p}, sphere.bin missing")
+                                with profiling.stage("extract"):
+                                    if patch is not None:
+                                        patch.extract(img, tex_path)
+                                    else:
+                                        with open(tex_path, 'wb') as tf:
+                                            tf.write(gltf_io.decode_data_uri(uri))
 
-        # B. Externalize Textures
-        if EXTERNAL_TEXTURES:
-            if "images" in gltf:
-                for img in gltf["images"]:
-                    uri = img.get("uri", "")
-                    if uri.startswith("data:"):
-                        # Extract Base64
-                        try:
-                            header, encoded = uri.split(",", 1)
-                            data = base64.b64decode(encoded)
-                            
-                            ext = "png" if "png" in header else "jpg"
-                            tex_filename = f"{p}_texture.{ext}"
-                            tex_path = os.path.join(models_dir, tex_filename)
-                            
-                            with open(tex_path, 'wb') as tf:
-                                tf.write(data)
-                            
-                            img["uri"] = tex_filename
-                            if "mimeType" in img: del img["mimeType"]
-                            if "bufferView" in img: del img["bufferView"]
-                            print(f"Externalized texture to {tex_filename}")
-                        except Exception as e:
-                            print(f"Failed to extract texture for {p}: {e}")
+                                img["uri"] = tex_filename
+                                if "mimeType" in img: del img["mimeType"]
+                                if "bufferView" in img: del img["bufferView"]
+                                print(f"Externalized texture to {tex_filename}")
+                            except Exception as e:
+                                print(f"Failed to extract texture for {p}: {e}")
 
-        # C. Add Sun Light
-        if p == "sun" and ADD_SUN_LIGHT:
-            # Add Extension Decl
-            if "extensionsUsed" not in gltf: gltf["extensionsUsed"] = []
-            if "KHR_lights_punctual" not in gltf["extensionsUsed"]:
-                gltf["extensionsUsed"].append("KHR_lights_punctual")
-            
-            # Light Def
-            light_def = {
-                "type": "point",
-                "color": [1.0, 1.0, 1.0],
-                "intensity": 2000.0, 
-                "range": 100.0 
-            }
-            
-            if "extensions" not in gltf: gltf["extensions"] = {}
-            gltf["extensions"]["KHR_lights_punctual"] = { "lights": [light_def] }
-            
-            # Attach to Node 0
-            node = gltf["nodes"][0]
-            if "extensions" not in node: node["extensions"] = {}
-            node["extensions"]["KHR_lights_punctual"] = { "light": 0 }
-            print("Ensured Light on Sun")
+            # C. Add Sun Light
+            if p == "sun" and ADD_SUN_LIGHT:
+                add_sun_light(gltf)
+                print("Ensured Light on Sun")
 
-        with open(gltf_path, 'w') as f:
-            json.dump(gltf, f, indent=4)
+            if meshopt:
+                gltf, merged = gltf_io.merge_buffers(gltf, buffers)
+                gltf, merged, stats = meshopt_codec.compress_gltf(gltf, merged)
+                print(meshopt_codec.report(p, stats))
+                path = gltf_io.write(gltf_path, gltf, merged, fmt, indent=None if compact else (indent or 4))
+                print(f"Wrote {os.path.basename(path)}")
+            elif fmt == "glb":
+                gltf, merged = gltf_io.merge_buffers(gltf, buffers)
+                glb_path = gltf_io.output_path(gltf_path, "glb")
+                gltf_io.write_glb(glb_path, gltf, merged)
+                print(f"Wrote {os.path.basename(glb_path)}")
+            else:
+                with profiling.stage("write"):
+                    written = patch.write(indent=indent, compact=compact)
+                print(f"Wrote {p}.gltf" if written else f"{p}.gltf unchanged")
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Patch the planet glTF assets.")
+    parser.add_argument("--format", choices=gltf_io.FORMATS, default="gltf",
+                        help="gltf: rewrite .gltf in place, glb: write binary .glb alongside")
+    parser.add_argument("--meshopt", action="store_true",
+                        help="store geometry as EXT_meshopt_compression streams (see meshopt_codec.py)")
+    parser.add_argument("--indent", type=int, help="JSON indentation of the rewritten .gltf (default: keep the file's)")
+    parser.add_argument("--compact", action="store_true", help="write the .gltf as compact JSON")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with profiling.session(args, "manage_assets"):
+        run(args.format, args.meshopt, args.indent, args.compact)
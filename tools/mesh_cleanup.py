@@ -0,0 +1,98 @@
+"""
+Weld duplicate vertices and drop degenerate triangles.
+
+The UV spheres emit a full row of vertices at each pole, so half of the pole
+triangles have two corners at the same point and zero area; they still cost
+vertex shading and triangle setup every frame. ``cleanup``:
+
+1. welds vertices whose position, normal and UV all agree (within
+   ``epsilon`` relative to the mesh size), so the UV seam stays split
+   wherever the UVs actually differ,
+2. drops triangles that reference the same vertex twice or whose area is
+   (numerically) zero,
+3. removes vertices no triangle uses any more, preserving vertex order.
+"""
+
+import numpy as np
+
+import profiling
+from geometry import Mesh
+
+
+def _bbox_diagonal(positions):
+    if not len(positions):
+        return 1.0
+    extent = positions.max(axis=0).astype(np.float64) - positions.min(axis=0)
+    return float(np.linalg.norm(extent)) or 1.0
+
+
+def _compact(mesh, keep, indices):
+    """Keep vertices where ``keep`` is True (in order) and remap ``indices``."""
+    old_to_new = np.cumsum(keep) - 1
+
+    def pick(a):
+        return None if a is None else np.ascontiguousarray(a[keep])
+
+    return Mesh(pick(mesh.positions), pick(mesh.normals), pick(mesh.uvs),
+                np.ascontiguousarray(old_to_new[indices], dtype=mesh.indices.dtype))
+
+
+def weld(mesh, epsilon=1e-6):
+    """Merge vertices with matching position/normal/UV; returns (mesh, welded_count)."""
+    scale = _bbox_diagonal(mesh.positions)
+    columns = [np.round(mesh.positions / (scale * epsilon))]
+    if mesh.normals is not None:
+        columns.append(np.round(mesh.normals / epsilon))
+    if mesh.uvs is not None:
+        columns.append(np.round(mesh.uvs / epsilon))
+    keys = np.concatenate(columns, axis=1).astype(np.int64)
+
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    # Point every vertex at the first vertex with its key, then drop the rest.
+    representative = first[inverse.reshape(-1)]
+    indices = representative[mesh.indices]
+    keep = np.zeros(mesh.vertex_count, dtype=bool)
+    keep[first] = True
+    return _compact(mesh, keep, indices), mesh.vertex_count - len(first)
+
+
+def remove_degenerate(mesh, area_epsilon=1e-12):
+    """Drop repeated-index and zero-area triangles; returns (mesh, removed_count)."""
+    tris = np.asarray(mesh.indices).reshape(-1, 3)
+    repeated = (tris[:, 0] == tris[:, 1]) | (tris[:, 1] == tris[:, 2]) | (tris[:, 0] == tris[:, 2])
+
+    p = mesh.positions.astype(np.float64)
+    a, b, c = p[tris[:, 0]], p[tris[:, 1]], p[tris[:, 2]]
+    double_area = np.linalg.norm(np.cross(b - a, c - a), axis=1)
+    flat = double_area <= area_epsilon * _bbox_diagonal(mesh.positions) ** 2
+
+    good = ~(repeated | flat)
+    indices = np.ascontiguousarray(tris[good].reshape(-1), dtype=mesh.indices.dtype)
+    return mesh._replace(indices=indices), int((~good).sum())
+
+
+def remove_unused(mesh):
+    """Drop vertices no triangle references; returns (mesh, removed_count)."""
+    keep = np.zeros(mesh.vertex_count, dtype=bool)
+    keep[mesh.indices] = True
+    return _compact(mesh, keep, mesh.indices), int((~keep).sum())
+
+
+@profiling.profiled("cleanup")
+def cleanup(mesh, epsilon=1e-6, area_epsilon=1e-12):
+    """Weld, drop degenerate triangles and unused vertices; returns (mesh, stats dict)."""
+    mesh = Mesh(*mesh)
+    stats = {"vertices_before": mesh.vertex_count, "triangles_before": mesh.triangle_count}
+    mesh, stats["welded"] = weld(mesh, epsilon)
+    mesh, stats["degenerate"] = remove_degenerate(mesh, area_epsilon)
+    mesh, stats["unused"] = remove_unused(mesh)
+    stats["vertices_after"] = mesh.vertex_count
+    stats["triangles_after"] = mesh.triangle_count
+    return mesh, stats
+
+
+def report(name, stats):
+    return (f"{name}: vertices {stats['vertices_before']} -> {stats['vertices_after']} "
+            f"(-{stats['vertices_before'] - stats['vertices_after']}: {stats['welded']} welded, "
+            f"{stats['unused']} unused), triangles {stats['triangles_before']} -> {stats['triangles_after']} "
+            f"(-{stats['degenerate']} degenerate)")
@@ -0,0 +1,179 @@
+"""
+Post-transform vertex cache, overdraw and vertex fetch optimization.
+
+The generators emit triangles in row-major grid order. ``optimize`` reorders
+a Mesh for the GPU in three steps:
+
+1. Tipsify (Sander, Nehab & Barczak 2007) triangle reorder for a FIFO
+   post-transform cache of ``cache_size`` entries. Every time the fan has to
+   restart from the dead-end stack or a fresh vertex, a new cluster starts.
+2. Overdraw-aware cluster sort: clusters facing away from the mesh centroid
+   go first so they occlude the rest (the view-independent sort from the
+   same paper).
+3. Vertex fetch reorder: vertices are renumbered in first-use order and the
+   attribute arrays are permuted to match.
+
+ACMR is cache misses per triangle, ATVR cache misses per vertex (1.0 is
+optimal), both measured with a FIFO cache simulation.
+"""
+
+import numpy as np
+
+import profiling
+from geometry import Mesh
+
+DEFAULT_CACHE_SIZE = 16
+
+
+def cache_stats(indices, vertex_count, cache_size=DEFAULT_CACHE_SIZE):
+    """Simulate a FIFO post-transform cache; returns (acmr, atvr)."""
+    indices = np.asarray(indices).tolist()
+    stamps = [-cache_size - 1] * vertex_count
+    clock = 0
+    for v in indices:
+        if clock - stamps[v] > cache_size:
+            stamps[v] = clock
+            clock += 1
+    misses = clock
+    triangles = max(len(indices) // 3, 1)
+    used = max(len(set(indices)), 1)
+    return misses / triangles, misses / used
+
+
+def _adjacency(tris, vertex_count):
+    """CSR vertex -> triangle adjacency."""
+    flat = tris.reshape(-1)
+    order = np.argsort(flat, kind='stable')
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=vertex_count), out=offsets[1:])
+    return offsets.tolist(), (order // 3).tolist()
+
+
+def tipsify(indices, vertex_count, cache_size=DEFAULT_CACHE_SIZE):
+    """Tipsify triangle order; returns (triangle_order, cluster_starts)."""
+    tris = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    tri_count = len(tris)
+    offsets, adj = _adjacency(tris, vertex_count)
+    tri_list = tris.tolist()
+
+    live = np.diff(offsets).tolist()
+    stamps = [0] * vertex_count
+    emitted = [False] * tri_count
+    dead_end = []
+    order = []
+    clusters = [0]
+
+    clock = cache_size + 1
+    cursor = 0
+    fan = 0 if vertex_count else -1
+    while fan >= 0:
+        candidates = []
+        for t in adj[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            order.append(t)
+            emitted[t] = True
+            for v in tri_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if clock - stamps[v] > cache_size:
+                    stamps[v] = clock
+                    clock += 1
+
+        # Pick the candidate that stays in cache longest while it is fanned out.
+        fan, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if clock - stamps[v] + 2 * live[v] <= cache_size:
+                    priority = clock - stamps[v]
+                if priority > best:
+                    best, fan = priority, v
+
+        if fan < 0:
+            while dead_end:
+                d = dead_end.pop()
+                if live[d] > 0:
+                    fan = d
+                    break
+            while fan < 0 and cursor < vertex_count:
+                if live[cursor] > 0:
+                    fan = cursor
+                cursor += 1
+            if fan >= 0 and len(order) != clusters[-1]:
+                clusters.append(len(order))
+
+    return np.asarray(order, dtype=np.int64), clusters
+
+
+def sort_clusters_for_overdraw(positions, tris, order, clusters):
+    """Reorder Tipsify clusters so outward-facing, outlying clusters draw first."""
+    p = positions.astype(np.float64)
+    a, b, c = p[tris[:, 0]], p[tris[:, 1]], p[tris[:, 2]]
+    area_normals = np.cross(b - a, c - a)
+    centroids = (a + b + c) / 3.0
+    mesh_center = centroids.mean(axis=0) if len(centroids) else np.zeros(3)
+
+    bounds = clusters + [len(order)]
+    keys = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        ts = order[start:end]
+        n = area_normals[ts].sum(axis=0)
+        length = np.linalg.norm(n)
+        n = n / length if length > 0 else n
+        keys.append(float(np.dot(centroids[ts].mean(axis=0) - mesh_center, n)))
+
+    ranked = sorted(range(len(keys)), key=lambda i: -keys[i])
+    return np.concatenate([order[bounds[i]:bounds[i + 1]] for i in ranked]) if ranked else order
+
+
+def reorder_vertices(mesh):
+    """Renumber vertices in first-use order and permute every attribute to match."""
+    indices = np.asarray(mesh.indices)
+    n = mesh.vertex_count
+    first_use = np.full(n, len(indices), dtype=np.int64)
+    np.minimum.at(first_use, indices, np.arange(len(indices)))
+    new_to_old = np.argsort(first_use, kind='stable')
+    old_to_new = np.empty(n, dtype=np.int64)
+    old_to_new[new_to_old] = np.arange(n)
+
+    def permute(a):
+        return None if a is None else np.ascontiguousarray(a[new_to_old])
+
+    remapped = np.ascontiguousarray(old_to_new[indices], dtype=indices.dtype)
+    return mesh._replace(positions=permute(mesh.positions), normals=permute(mesh.normals),
+                         uvs=permute(mesh.uvs), indices=remapped)
+
+
+@profiling.profiled("optimize")
+def optimize(mesh, cache_size=DEFAULT_CACHE_SIZE, overdraw=True):
+    """Run the cache, overdraw and fetch passes; returns (mesh, stats dict)."""
+    mesh = Mesh(*mesh)
+    before = cache_stats(mesh.indices, mesh.vertex_count, cache_size)
+
+    tris = np.asarray(mesh.indices, dtype=np.int64).reshape(-1, 3)
+    order, clusters = tipsify(mesh.indices, mesh.vertex_count, cache_size)
+    if overdraw:
+        order = sort_clusters_for_overdraw(mesh.positions, tris, order, clusters)
+    indices = np.ascontiguousarray(tris[order].reshape(-1), dtype=mesh.indices.dtype)
+
+    # Thin meshes like the orbit torus are already near-optimal in grid order;
+    # never hand back a worse triangle order than we were given.
+    if cache_stats(indices, mesh.vertex_count, cache_size)[0] > before[0]:
+        indices, clusters = mesh.indices, []
+    mesh = reorder_vertices(mesh._replace(indices=indices))
+
+    after = cache_stats(mesh.indices, mesh.vertex_count, cache_size)
+    return mesh, {
+        "cache_size": cache_size,
+        "clusters": len(clusters),
+        "acmr_before": before[0], "atvr_before": before[1],
+        "acmr_after": after[0], "atvr_after": after[1],
+    }
+
+
+def report(name, stats):
+    return (f"{name}: ACMR {stats['acmr_before']:.3f} -> {stats['acmr_after']:.3f}, "
+            f"ATVR {stats['atvr_before']:.3f} -> {stats['atvr_after']:.3f} "
+            f"({stats['clusters'] or 'original order kept, no'} clusters, {stats['cache_size']}-entry FIFO)")
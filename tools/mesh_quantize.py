@@ -0,0 +1,149 @@
+"""
+KHR_mesh_quantization writer stage.
+
+``apply`` takes the float glTF a generator built plus its Mesh and rewrites
+the geometry with compact attributes (16 bytes per vertex instead of 32):
+
+* POSITION  SHORT x4 (w unused for alignment), integer values; the mesh node
+  gets a uniform scale + translation that dequantizes them. The scale is
+  uniform on purpose so normals are not skewed by the node transform.
+* NORMAL    normalized BYTE x4 (w unused for alignment)
+* TEXCOORD_0 normalized UNSIGNED_SHORT x2 (UVs must lie in [0, 1])
+* TANGENT   normalized BYTE x4, when the generator wrote tangents
+
+It also measures the quantized mesh against the float reference: position
+error relative to the mesh extent, normal angle error and UV error.
+"""
+
+import numpy as np
+
+import gltf_io
+import profiling
+
+EXTENSION = "KHR_mesh_quantization"
+POSITION_MAX = 32767
+
+
+def quantize_positions(positions):
+    """Return (int16 (N, 4) array, uniform scale, translation, dequantized float positions)."""
+    p = positions.astype(np.float64)
+    lo, hi = p.min(axis=0), p.max(axis=0)
+    center = (lo + hi) / 2.0
+    half = float((hi - lo).max()) / 2.0 or 1.0
+    scale = half / POSITION_MAX
+    q = np.clip(np.round((p - center) / scale), -POSITION_MAX, POSITION_MAX).astype(np.int16)
+    packed = np.zeros((len(q), 4), dtype=np.int16)
+    packed[:, :3] = q
+    return packed, scale, center, q * scale + center
+
+
+def quantize_normals(normals):
+    """Return (int8 (N, 4) array, dequantized float normals)."""
+    q = np.clip(np.round(normals.astype(np.float64) * 127.0), -127, 127).astype(np.int8)
+    packed = np.zeros((len(q), 4), dtype=np.int8)
+    packed[:, :3] = q
+    return packed, np.maximum(q / 127.0, -1.0)
+
+
+def quantize_tangents(tangents):
+    """Return (int8 (N, 4) array, dequantized float tangents); w stays exactly +/-1."""
+    q = np.clip(np.round(tangents.astype(np.float64) * 127.0), -127, 127).astype(np.int8)
+    return q, np.maximum(q / 127.0, -1.0)
+
+
+def quantize_uvs(uvs):
+    """Return (uint16 (N, 2) array, dequantized float UVs)."""
+    if uvs.min() < 0.0 or uvs.max() > 1.0:
+        raise ValueError("normalized UV quantization needs UVs in [0, 1]")
+    q = np.round(uvs.astype(np.float64) * 65535.0).astype(np.uint16)
+    return q, q / 65535.0
+
+
+def _angle_deg(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return np.degrees(np.arccos(np.clip(np.einsum('ij,ij->i', a, b), -1.0, 1.0)))
+
+
+@profiling.profiled("quantize")
+def apply(gltf, mesh, tangents=None):
+    """Replace the geometry of single-mesh ``gltf`` with quantized ``mesh`` data (+ optional TANGENT).
+
+    Returns (gltf, bin_data, errors); ``gltf`` is modified in place.
+    """
+    blob = bytearray()
+    gltf["bufferViews"] = []
+    gltf["accessors"] = []
+    count = mesh.vertex_count
+    errors = {"vertices": count, "bytes_per_vertex_before": 0, "bytes_per_vertex_after": 0}
+
+    positions, scale, center, deq_pos = quantize_positions(mesh.positions)
+    view = gltf_io.append_view(gltf, blob, positions, 34962)
+    gltf["bufferViews"][view]["byteStride"] = 8
+    attributes = {"POSITION": gltf_io.append_accessor(
+        gltf, view, 5122, count, "VEC3",
+        max=positions[:, :3].max(axis=0).tolist(), min=positions[:, :3].min(axis=0).tolist())}
+    extent = float(np.linalg.norm(mesh.positions.max(axis=0) - mesh.positions.min(axis=0))) or 1.0
+    errors["position_max"] = float(np.abs(deq_pos - mesh.positions).max())
+    errors["position_max_relative"] = errors["position_max"] / extent
+    errors["bytes_per_vertex_before"] += 12
+    errors["bytes_per_vertex_after"] += 8
+
+    if mesh.normals is not None:
+        normals, deq_n = quantize_normals(mesh.normals)
+        view = gltf_io.append_view(gltf, blob, normals, 34962)
+        gltf["bufferViews"][view]["byteStride"] = 4
+        attributes["NORMAL"] = gltf_io.append_accessor(gltf, view, 5120, count, "VEC3", normalized=True)
+        errors["normal_max_deg"] = float(_angle_deg(mesh.normals.astype(np.float64), deq_n).max())
+        errors["bytes_per_vertex_before"] += 12
+        errors["bytes_per_vertex_after"] += 4
+
+    if mesh.uvs is not None:
+        uvs, deq_uv = quantize_uvs(mesh.uvs)
+        view = gltf_io.append_view(gltf, blob, uvs, 34962)
+        attributes["TEXCOORD_0"] = gltf_io.append_accessor(gltf, view, 5123, count, "VEC2", normalized=True)
+        errors["uv_max"] = float(np.abs(deq_uv - mesh.uvs).max())
+        errors["bytes_per_vertex_before"] += 8
+        errors["bytes_per_vertex_after"] += 4
+
+    if tangents is not None:
+        packed, deq_t = quantize_tangents(tangents)
+        view = gltf_io.append_view(gltf, blob, packed, 34962)
+        gltf["bufferViews"][view]["byteStride"] = 4
+        attributes["TANGENT"] = gltf_io.append_accessor(gltf, view, 5120, count, "VEC4", normalized=True)
+        errors["tangent_max_deg"] = float(_angle_deg(tangents[:, :3].astype(np.float64), deq_t[:, :3]).max())
+        errors["bytes_per_vertex_before"] += 16
+        errors["bytes_per_vertex_after"] += 4
+
+    index_component, index_data = gltf_io.pack_indices(mesh.indices, count)
+    indices = gltf_io.append_accessor(
+        gltf, gltf_io.append_view(gltf, blob, index_data, 34963), index_component, len(mesh.indices), "SCALAR")
+
+    primitive = gltf["meshes"][0]["primitives"][0]
+    primitive["attributes"] = attributes
+    primitive["indices"] = indices
+
+    for node in gltf["nodes"]:
+        if node.get("mesh") == 0:
+            if "matrix" in node or "scale" in node or "translation" in node:
+                raise ValueError("mesh node already has a transform")
+            node["translation"] = center.tolist()
+            node["scale"] = [scale, scale, scale]
+
+    for key in ("extensionsUsed", "extensionsRequired"):
+        if EXTENSION not in gltf.setdefault(key, []):
+            gltf[key].append(EXTENSION)
+    gltf["buffers"] = [{"byteLength": len(blob)}]
+    return gltf, bytes(blob), errors
+
+
+def report(name, errors):
+    parts = [f"{name}: {errors['bytes_per_vertex_before']} -> {errors['bytes_per_vertex_after']} B/vertex",
+             f"position err {errors['position_max']:.2e} ({100 * errors['position_max_relative']:.4f}% of extent)"]
+    if "normal_max_deg" in errors:
+        parts.append(f"normal err {errors['normal_max_deg']:.3f} deg")
+    if "uv_max" in errors:
+        parts.append(f"uv err {errors['uv_max']:.2e}")
+    if "tangent_max_deg" in errors:
+        parts.append(f"tangent err {errors['tangent_max_deg']:.3f} deg")
+    return ", ".join(parts)
@@ -0,0 +1,545 @@
+"""
+Pure Python/NumPy encoder (and reference decoder) for EXT_meshopt_compression.
+
+Implements the two bitstreams the extension defines:
+
+* ATTRIBUTES (vertex codec, header 0xa0): vertices are split into blocks
+  of up to 256; every byte column of a block is delta-encoded against the
+  previous vertex, zigzagged and packed in groups of 16 bytes using 0, 2, 4
+  or 8 bits per byte (values that do not fit are stored after the group).
+  The first vertex is appended as a tail padded to 32 bytes.
+* TRIANGLES (index codec, header 0xe1): triangles are coded against a
+  16-entry edge FIFO and 16-entry vertex FIFO; misses fall back to
+  zigzag-varint deltas. A 16-entry code-aux table ends the stream.
+
+``compress_gltf`` applies both to a single-buffer glTF: the compressed
+streams go into buffer 0, and the original layout is kept as a uri-less
+fallback buffer (buffer 1) that the extension's bufferViews point at.
+The extension is marked required, since the fallback carries no data.
+"""
+
+import json
+
+import numpy as np
+
+import gltf_io
+import profiling
+
+EXTENSION = "EXT_meshopt_compression"
+
+VERTEX_HEADER = 0xa0
+INDEX_HEADER = 0xe1
+BYTE_GROUP_SIZE = 16
+VERTEX_BLOCK_SIZE_BYTES = 8192
+VERTEX_BLOCK_MAX_SIZE = 256
+TAIL_MAX_SIZE = 32
+FIFO_EMPTY = 0xFFFFFFFF
+MASK32 = 0xFFFFFFFF
+
+# feb/fec pairs coded in the 4 low bits of a 0xf? triangle code; no entry may use 15.
+CODE_AUX_TABLE = bytes([0x00, 0x76, 0x87, 0x56, 0x67, 0x78, 0xa9, 0x86,
+                        0x65, 0x89, 0x68, 0x98, 0x01, 0x69, 0x00, 0x00])
+TRIANGLE_INDEX_ORDER = ((0, 1, 2), (1, 2, 0), (2, 0, 1))
+
+
+# --- Vertex codec ---
+
+def _vertex_block_size(vertex_size):
+    size = (VERTEX_BLOCK_SIZE_BYTES // vertex_size) & ~(BYTE_GROUP_SIZE - 1)
+    return min(size, VERTEX_BLOCK_MAX_SIZE)
+
+
+def _encode_byte_groups(values, out):
+    """Append one byte column (length multiple of 16, already zigzagged) to ``out``."""
+    groups = values.reshape(-1, BYTE_GROUP_SIZE)
+    zero = ~groups.any(axis=1)
+    size2 = 4 + (groups >= 3).sum(axis=1)
+    size4 = 8 + (groups >= 15).sum(axis=1)
+    sizes = np.stack([np.where(zero, 0, 1 << 30), size2, size4, np.full(len(groups), 16)], axis=1).tolist()
+    # Pick the smallest encoded size. A tie with the raw 16-byte form keeps the
+    # group raw; a tie between the 2- and 4-bit widths goes to the previous
+    # group's width, else to the narrower one. Any choice decodes the same.
+    bits = []
+    last = 3
+    for g in sizes:
+        best = 3
+        for code in (0, 1, 2):
+            if g[code] < g[best] or (g[code] == g[best] and code == last and best != 3):
+                best = code
+        bits.append(best)
+        last = best
+
+    header = bytearray((len(groups) + 3) // 4)
+    for g, b in enumerate(bits):
+        header[g // 4] |= b << ((g % 4) * 2)
+    out += header
+
+    packed2 = np.minimum(groups, 3).reshape(-1, 4, 4)
+    packed2 = (packed2[:, :, 0] << 6) | (packed2[:, :, 1] << 4) | (packed2[:, :, 2] << 2) | packed2[:, :, 3]
+    packed4 = np.minimum(groups, 15).reshape(-1, 8, 2)
+    packed4 = (packed4[:, :, 0] << 4) | packed4[:, :, 1]
+    for g, b in enumerate(bits):
+        if b == 1:
+            out += packed2[g].astype(np.uint8).tobytes()
+            out += groups[g][groups[g] >= 3].tobytes()
+        elif b == 2:
+            out += packed4[g].astype(np.uint8).tobytes()
+            out += groups[g][groups[g] >= 15].tobytes()
+        elif b == 3:
+            out += groups[g].tobytes()
+
+
+def encode_vertex_buffer(data, count, vertex_size):
+    """Encode ``count`` vertices of ``vertex_size`` bytes (multiple of 4, <= 256)."""
+    if vertex_size % 4 or not 0 < vertex_size <= 256:
+        raise ValueError("vertex size must be a multiple of 4 up to 256 bytes")
+    vertices = np.frombuffer(bytes(data), dtype=np.uint8, count=count * vertex_size).reshape(count, vertex_size)
+    out = bytearray([VERTEX_HEADER])
+    last = vertices[0].copy() if count else np.zeros(vertex_size, dtype=np.uint8)
+    first = last.copy()
+    block = _vertex_block_size(vertex_size)
+
+    for start in range(0, count, block):
+        rows = vertices[start:start + block]
+        aligned = (len(rows) + BYTE_GROUP_SIZE - 1) & ~(BYTE_GROUP_SIZE - 1)
+        prev = np.vstack([last[None, :], rows[:-1]])
+        delta = (rows - prev).astype(np.uint8)  # wraps mod 256
+        zigzag = ((delta.view(np.int8) >> 7).view(np.uint8) ^ (delta << 1)).astype(np.uint8)
+        for k in range(vertex_size):
+            column = np.zeros(aligned, dtype=np.uint8)
+            column[:len(rows)] = zigzag[:, k]
+            _encode_byte_groups(column, out)
+        last = rows[-1].copy()
+
+    tail = max(TAIL_MAX_SIZE, vertex_size)
+    out += bytes(tail - vertex_size)
+    out += first.tobytes()
+    return bytes(out)
+
+
+_UNPACK2 = [tuple((b >> s) & 3 for s in (6, 4, 2, 0)) for b in range(256)]
+_UNPACK4 = [(b >> 4, b & 15) for b in range(256)]
+
+
+def _decode_byte_groups(data, pos, size):
+    """Decode ``size`` bytes (multiple of 16) starting at ``pos``; returns (values, new pos)."""
+    group_count = size // BYTE_GROUP_SIZE
+    header = data[pos:pos + (group_count + 3) // 4]
+    pos += len(header)
+    out = bytearray()
+    for g in range(group_count):
+        bits = (header[g // 4] >> ((g % 4) * 2)) & 3
+        if bits == 0:
+            out += bytes(BYTE_GROUP_SIZE)
+            continue
+        if bits == 3:
+            out += data[pos:pos + BYTE_GROUP_SIZE]
+            pos += BYTE_GROUP_SIZE
+            continue
+        if bits == 1:
+            raw = [v for b in data[pos:pos + 4] for v in _UNPACK2[b]]
+            pos, sentinel = pos + 4, 3
+        else:
+            raw = [v for b in data[pos:pos + 8] for v in _UNPACK4[b]]
+            pos, sentinel = pos + 8, 15
+        for v in raw:
+            if v == sentinel:
+                out.append(data[pos])
+                pos += 1
+            else:
+                out.append(v)
+    return out, pos
+
+
+def decode_vertex_buffer(data, count, vertex_size):
+    """Reference decoder for ``encode_vertex_buffer``; returns the raw vertex bytes."""
+    data = bytes(data)
+    if data[0] & 0xf0 != VERTEX_HEADER or data[0] & 0x0f > 0:
+        raise ValueError("unsupported vertex codec header")
+    last = np.frombuffer(data[-vertex_size:], dtype=np.uint8).copy()
+    out = np.empty((count, vertex_size), dtype=np.uint8)
+    block = _vertex_block_size(vertex_size)
+    pos = 1
+    for start in range(0, count, block):
+        n = min(block, count - start)
+        aligned = (n + BYTE_GROUP_SIZE - 1) & ~(BYTE_GROUP_SIZE - 1)
+        for k in range(vertex_size):
+            raw, pos = _decode_byte_groups(data, pos, aligned)
+            z = np.frombuffer(bytes(raw[:n]), dtype=np.uint8)
+            delta = ((z >> 1) ^ (0 - (z & 1)).astype(np.uint8)).astype(np.uint8)
+            delta[0] = (int(delta[0]) + int(last[k])) & 0xff
+            out[start:start + n, k] = np.cumsum(delta, dtype=np.uint8)
+        last = out[start + n - 1].copy()
+    if len(data) - pos != max(TAIL_MAX_SIZE, vertex_size):
+        raise ValueError("vertex stream has trailing or missing data")
+    return out.tobytes()
+
+
+# --- Index codec ---
+
+def _varint(out, v):
+    while True:
+        out.append((v & 127) | (128 if v > 127 else 0))
+        v >>= 7
+        if not v:
+            break
+
+
+def _encode_index(out, index, last):
+    d = (index - last) & MASK32
+    _varint(out, ((d << 1) ^ (MASK32 if d & 0x80000000 else 0)) & MASK32)
+
+
+def encode_index_buffer(indices):
+    """Encode a triangle list (uint16/uint32 values) with the version 1 index codec."""
+    indices = [int(i) for i in np.asarray(indices).reshape(-1)]
+    if len(indices) % 3:
+        raise ValueError("index count must be a multiple of 3")
+    edges = [[FIFO_EMPTY, FIFO_EMPTY] for _ in range(16)]
+    verts = [FIFO_EMPTY] * 16
+    edge_off = vert_off = 0
+    nxt = last = 0
+    codes = bytearray()
+    extra = bytearray()
+
+    def vertex_fifo(v):
+        for i in range(16):
+            if verts[(vert_off - 1 - i) & 15] == v:
+                return i
+        return -1
+
+    for t in range(0, len(indices), 3):
+        tri = indices[t:t + 3]
+        a, b, c = tri
+        fer = -1
+        for i in range(16):
+            e0, e1 = edges[(edge_off - 1 - i) & 15]
+            if e0 == a and e1 == b:
+                fer = i << 2
+            elif e0 == b and e1 == c:
+                fer = (i << 2) | 1
+            elif e0 == c and e1 == a:
+                fer = (i << 2) | 2
+            else:
+                continue
+            break
+
+        if fer >= 0 and (fer >> 2) < 15:
+            a, b, c = (tri[k] for k in TRIANGLE_INDEX_ORDER[fer & 3])
+            fe = fer >> 2
+            fc = vertex_fifo(c)
+            if 1 <= fc < 13:
+                fec = fc
+            elif c == nxt:
+                fec, nxt = 0, nxt + 1
+            else:
+                fec = 15
+            if fec == 15:
+                # last-1 / last+1 are common in strip-like sequences
+                if (c + 1) & MASK32 == last:
+                    fec, last = 13, c
+                if c == (last + 1) & MASK32:
+                    fec, last = 14, c
+            codes.append((fe << 4) | fec)
+            if fec == 15:
+                _encode_index(extra, c, last)
+                last = c
+            if fec == 0 or fec >= 13:
+                verts[vert_off] = c
+                vert_off = (vert_off + 1) & 15
+            edges[edge_off] = [c, b]
+            edge_off = (edge_off + 1) & 15
+            edges[edge_off] = [a, c]
+            edge_off = (edge_off + 1) & 15
+            continue
+
+        rotation = 1 if b == nxt else 2 if c == nxt else 0
+        a, b, c = (tri[k] for k in TRIANGLE_INDEX_ORDER[rotation])
+        fb, fc = vertex_fifo(b), vertex_fifo(c)
+        if a == nxt:
+            fea, nxt = 0, nxt + 1
+        else:
+            fea = 15
+        if 0 <= fb < 14:
+            feb = fb + 1
+        elif b == nxt:
+            feb, nxt = 0, nxt + 1
+        else:
+            feb = 15
+        if 0 <= fc < 14:
+            fec = fc + 1
+        elif c == nxt:
+            fec, nxt = 0, nxt + 1
+        else:
+            fec = 15
+
+        codeaux = (feb << 4) | fec
+        tc = CODE_AUX_TABLE.find(bytes([codeaux]))
+        if fea == 0 and 0 <= tc < 14:
+            codes.append(0xf0 | tc)
+        else:
+            codes.append(0xf0 | 14 | fea)
+            extra.append(codeaux)
+        for v, f in ((a, fea), (b, feb), (c, fec)):
+            if f == 15:
+                _encode_index(extra, v, last)
+                last = v
+        for v, push in ((a, True), (b, feb in (0, 15)), (c, fec in (0, 15))):
+            verts[vert_off] = v
+            if push:
+                vert_off = (vert_off + 1) & 15
+        for e in ((b, a), (c, b), (a, c)):
+            edges[edge_off] = list(e)
+            edge_off = (edge_off + 1) & 15
+
+    return bytes([INDEX_HEADER]) + bytes(codes) + bytes(extra) + CODE_AUX_TABLE
+
+
+def _decode_index(data, pos, last):
+    v, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        v |= (byte & 127) << shift
+        shift += 7
+        if byte < 128:
+            break
+    d = (v >> 1) ^ (MASK32 if v & 1 else 0)
+    return (last + d) & MASK32, pos
+
+
+def decode_index_buffer(data, count):
+    """Reference decoder for ``encode_index_buffer``; returns a list of indices."""
+    data = bytes(data)
+    if data[0] & 0xf0 != 0xe0 or data[0] & 0x0f > 1:
+        raise ValueError("unsupported index codec header")
+    edges = [[FIFO_EMPTY, FIFO_EMPTY] for _ in range(16)]
+    verts = [FIFO_EMPTY] * 16
+    edge_off = vert_off = 0
+    nxt = last = 0
+    code = 1
+    pos = 1 + count // 3
+    table = data[-16:]
+    out = []
+
+    def push_vertex(v, cond=True):
+        nonlocal vert_off
+        verts[vert_off] = v
+        if cond:
+            vert_off = (vert_off + 1) & 15
+
+    def push_edge(a, b):
+        nonlocal edge_off
+        edges[edge_off] = [a, b]
+        edge_off = (edge_off + 1) & 15
+
+    for _ in range(count // 3):
+        codetri = data[code]
+        code += 1
+        if codetri < 0xf0:
+            a, b = edges[(edge_off - 1 - (codetri >> 4)) & 15]
+            fec = codetri & 15
+            if fec < 13:
+                c = nxt if fec == 0 else verts[(vert_off - 1 - fec) & 15]
+                nxt += fec == 0
+                push_vertex(c, fec == 0)
+            else:
+                if fec == 15:
+                    c, pos = _decode_index(data, pos, last)
+                else:
+                    c = (last + (fec - (fec ^ 3))) & MASK32
+                last = c
+                push_vertex(c)
+            out += (a, b, c)
+            push_edge(c, b)
+            push_edge(a, c)
+            continue
+
+        if codetri < 0xfe:
+            codeaux = table[codetri & 15]
+            fea = 0
+        else:
+            codeaux = data[pos]
+            pos += 1
+            fea = 0 if codetri == 0xfe else 15
+            if codeaux == 0:
+                nxt = 0
+        feb, fec = codeaux >> 4, codeaux & 15
+        if fea == 0:
+            a = nxt
+            nxt += 1
+        else:
+            a = 0
+        if feb == 0:
+            b = nxt
+            nxt += 1
+        else:
+            b = verts[(vert_off - feb) & 15]
+        if fec == 0:
+            c = nxt
+            nxt += 1
+        else:
+            c = verts[(vert_off - fec) & 15]
+        if fea == 15:
+            a, pos = _decode_index(data, pos, last)
+            last = a
+        if feb == 15:
+            b, pos = _decode_index(data, pos, last)
+            last = b
+        if fec == 15:
+            c, pos = _decode_index(data, pos, last)
+            last = c
+        out += (a, b, c)
+        push_vertex(a)
+        push_vertex(b, feb in (0, 15))
+        push_vertex(c, fec in (0, 15))
+        push_edge(b, a)
+        push_edge(c, b)
+        push_edge(a, c)
+
+    if pos != len(data) - 16:
+        raise ValueError("index stream has trailing or missing data")
+    return out
+
+
+# --- glTF integration ---
+
+COMPONENT_SIZE = {5120: 1, 5121: 1, 5122: 2, 5123: 2, 5125: 4, 5126: 4}
+TYPE_COUNT = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+
+def _element_size(accessor):
+    return COMPONENT_SIZE[accessor["componentType"]] * TYPE_COUNT[accessor["type"]]
+
+
+def split_views(gltf):
+    """Give every accessor in a tightly packed shared bufferView its own view (in place)."""
+    by_view = {}
+    for i, acc in enumerate(gltf.get("accessors", [])):
+        if "bufferView" in acc:
+            by_view.setdefault(acc["bufferView"], []).append(i)
+    for view_index, accessor_ids in by_view.items():
+        view = gltf["bufferViews"][view_index]
+        if len(accessor_ids) < 2 or "byteStride" in view:
+            continue
+        for n, i in enumerate(sorted(accessor_ids, key=lambda i: gltf["accessors"][i].get("byteOffset", 0))):
+            acc = gltf["accessors"][i]
+            new_view = dict(view)
+            new_view["byteOffset"] = view.get("byteOffset", 0) + acc.get("byteOffset", 0)
+            new_view["byteLength"] = acc["count"] * _element_size(acc)
+            acc["byteOffset"] = 0
+            if n == 0:
+                gltf["bufferViews"][view_index] = new_view
+            else:
+                gltf["bufferViews"].append(new_view)
+                acc["bufferView"] = len(gltf["bufferViews"]) - 1
+    return gltf
+
+
+@profiling.profiled("meshopt")
+def compress_gltf(gltf, bin_data):
+    """Compress every vertex/index bufferView of a single-buffer glTF.
+
+    Returns (gltf, compressed_bin, stats); ``gltf`` is modified in place.
+    """
+    if EXTENSION in gltf.get("extensionsUsed", []):
+        raise ValueError("asset is already meshopt-compressed")
+    split_views(gltf)
+    index_views = set()
+    strides = {}
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh["primitives"]:
+            if "indices" in prim and prim.get("mode", 4) == 4:
+                index_views.add(gltf["accessors"][prim["indices"]]["bufferView"])
+    for acc in gltf.get("accessors", []):
+        view = gltf["bufferViews"][acc["bufferView"]]
+        strides.setdefault(acc["bufferView"], view.get("byteStride", _element_size(acc)))
+
+    blob = bytearray()
+    stats = {"raw": len(bin_data), "compressed": 0, "views": 0}
+    for v, view in enumerate(gltf.get("bufferViews", [])):
+        start = view.get("byteOffset", 0)
+        raw = bin_data[start:start + view["byteLength"]]
+        stride = strides.get(v)
+        ext = None
+        if v in index_views and stride in (2, 4):
+            count = len(raw) // stride
+            if count % 3 == 0:
+                indices = np.frombuffer(raw, dtype='<u2' if stride == 2 else '<u4')
+                ext = {"byteStride": stride, "count": count, "mode": "TRIANGLES",
+                       "data": encode_index_buffer(indices)}
+        elif stride and stride % 4 == 0 and stride <= 256 and len(raw) % stride == 0:
+            count = len(raw) // stride
+            ext = {"byteStride": stride, "count": count, "mode": "ATTRIBUTES",
+                   "data": encode_vertex_buffer(raw, count, stride)}
+
+        blob += b'\x00' * (-len(blob) % 4)
+        if ext is None:
+            view["buffer"] = 0
+            view["byteOffset"] = len(blob)
+            blob += raw
+            continue
+        data = ext.pop("data")
+        view["buffer"] = 1
+        view["extensions"] = {EXTENSION: dict(buffer=0, byteOffset=len(blob), byteLength=len(data), **ext)}
+        blob += data
+        stats["views"] += 1
+
+    gltf["buffers"] = [
+        {"byteLength": len(blob)},
+        {"byteLength": len(bin_data), "extensions": {EXTENSION: {"fallback": True}}},
+    ]
+    for key in ("extensionsUsed", "extensionsRequired"):
+        if EXTENSION not in gltf.setdefault(key, []):
+            gltf[key].append(EXTENSION)
+    stats["compressed"] = len(blob)
+    return gltf, bytes(blob), stats
+
+
+@profiling.profiled("meshopt_decode")
+def decompress_gltf(gltf, buffers):
+    """Inverse of ``compress_gltf`` for verification and benchmarks.
+
+    ``buffers`` are the loaded buffer bytes (fallback buffers may be None).
+    Returns (gltf, bin_data) with a plain single-buffer layout.
+    """
+    gltf = json.loads(json.dumps(gltf))
+    fallback = next(i for i, b in enumerate(gltf["buffers"]) if gltf_io.is_fallback(b))
+    out = bytearray(gltf["buffers"][fallback]["byteLength"])
+    raw_views = []
+    for view in gltf["bufferViews"]:
+        ext = view.get("extensions", {}).pop(EXTENSION, None)
+        if ext is None:
+            raw_views.append(view)
+            continue
+        src = buffers[ext["buffer"]][ext.get("byteOffset", 0):ext.get("byteOffset", 0) + ext["byteLength"]]
+        if ext["mode"] == "TRIANGLES":
+            dtype = '<u2' if ext["byteStride"] == 2 else '<u4'
+            data = np.asarray(decode_index_buffer(src, ext["count"]), dtype=dtype).tobytes()
+        else:
+            data = decode_vertex_buffer(src, ext["count"], ext["byteStride"])
+        start = view.get("byteOffset", 0)
+        out[start:start + len(data)] = data
+        view["buffer"] = 0
+        if not view.get("extensions"):
+            view.pop("extensions", None)
+
+    for view in raw_views:
+        data = buffers[view["buffer"]][view.get("byteOffset", 0):view.get("byteOffset", 0) + view["byteLength"]]
+        out += b'\x00' * (-len(out) % 4)
+        view["buffer"] = 0
+        view["byteOffset"] = len(out)
+        out += data
+
+    gltf["buffers"] = [{"byteLength": len(out)}]
+    for key in ("extensionsUsed", "extensionsRequired"):
+        if EXTENSION in gltf.get(key, []):
+            gltf[key].remove(EXTENSION)
+            if not gltf[key]:
+                del gltf[key]
+    return gltf, bytes(out)
+
+
+def report(name, stats):
+    return (f"{name}: meshopt {stats['raw']} -> {stats['compressed']} B "
+            f"({100.0 * stats['compressed'] / max(stats['raw'], 1):.1f}%, {stats['views']} views)")
@@ -0,0 +1,188 @@
+"""
+Opt-in profiling and tracing shared by the asset scripts.
+
+Scripts wrap each asset in ``profiling.asset(name)`` and their work in
+``profiling.stage(name)`` blocks (or ``@profiling.profiled(name)`` on a
+function); gltf_io marks packing, base64, JSON dumping and file writes the
+same way. Nothing is recorded unless the script runs under ``session`` with
+``--profile``, so the hooks cost one function call otherwise.
+
+With ``--profile [TRACE]`` every stage records wall time, CPU time
+(process_time) and the tracemalloc peak above the memory in use when it
+started. A Chrome trace (chrome://tracing or https://ui.perfetto.dev) is
+written to TRACE (default build/profile/<tool>.trace.json) and a summary
+table per asset and stage is printed. Nested stages are included in their
+parents' times. ``--cprofile DIR`` also writes one cProfile dump per asset
+and stage (``<asset>.<stage>.prof``, exclusive of nested stages) for
+``python -m pstats`` or snakeviz.
+
+tracemalloc makes allocation-heavy stages several times slower, so compare
+profiled runs with each other rather than with unprofiled ones.
+"""
+
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+import bodies
+
+PROFILE_DIR = os.path.join(bodies.ROOT, "build/profile")
+NO_ASSET = "-"
+
+_recorder = None
+_NULL = contextlib.nullcontext()
+
+
+class _Recorder:
+    def __init__(self, cprofile_dir=None):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.totals = {}  # (asset, stage) -> [calls, wall, cpu, peak]
+        self.cprofile_dir = cprofile_dir
+        self.profilers = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def frames(self):
+        if not hasattr(self.local, "frames"):
+            self.local.frames = []
+            self.local.assets = []
+        return self.local.frames
+
+    @contextlib.contextmanager
+    def stage(self, name, asset=None):
+        frames = self.frames()
+        if asset is not None:
+            self.local.assets.append(asset)
+        label = self.local.assets[-1] if self.local.assets else NO_ASSET
+        parent = frames[-1] if frames else None
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent["peak"] = max(parent["peak"], peak)
+            if parent["profiler"] is not None:
+                parent["profiler"].disable()
+        tracemalloc.reset_peak()
+        frame = {"peak": current, "profiler": None}
+        if self.cprofile_dir:
+            with self.lock:
+                frame["profiler"] = self.profilers.setdefault((label, name), cProfile.Profile())
+        frames.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        if frame["profiler"] is not None:
+            frame["profiler"].enable()
+        try:
+            yield
+        finally:
+            if frame["profiler"] is not None:
+                frame["profiler"].disable()
+            wall_end, cpu_end = time.perf_counter(), time.process_time()
+            frames.pop()
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1]) - current
+            if parent is not None:
+                parent["peak"] = max(parent["peak"], current + peak)
+                if parent["profiler"] is not None:
+                    parent["profiler"].enable()
+            if asset is not None:
+                self.local.assets.pop()
+            self.record(name, label, wall, wall_end - wall, cpu_end - cpu, peak)
+
+    def record(self, name, asset, start, wall, cpu, peak):
+        with self.lock:
+            self.events.append({
+                "name": name, "cat": asset, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                "ts": round((start - self.origin) * 1e6, 1), "dur": round(wall * 1e6, 1),
+                "args": {"asset": asset, "cpu_ms": round(cpu * 1e3, 3), "peak_kb": round(peak / 1024, 1)}})
+            total = self.totals.setdefault((asset, name), [0, 0.0, 0.0, 0])
+            total[0] += 1
+            total[1] += wall
+            total[2] += cpu
+            total[3] = max(total[3], peak)
+
+    def write_trace(self, path, tool):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        events = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": tool}}] + self.events
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def dump_profiles(self):
+        os.makedirs(self.cprofile_dir, exist_ok=True)
+        written = []
+        for (asset, name), profiler in self.profilers.items():
+            stem = re.sub(r'[^\w.-]+', '_', f"{asset}.{name}")
+            path = os.path.join(self.cprofile_dir, stem + ".prof")
+            profiler.dump_stats(path)
+            written.append(path)
+        return written
+
+    def summary(self):
+        lines = [f"{'asset':<14} {'stage':<16} {'calls':>5} {'wall ms':>9} {'cpu ms':>9} {'peak KB':>9}"]
+        for (asset, name), (calls, wall, cpu, peak) in self.totals.items():
+            lines.append(f"{asset:<14} {name:<16} {calls:>5} {wall * 1e3:>9.2f} {cpu * 1e3:>9.2f} "
+                         f"{peak / 1024:>9.1f}")
+        return "\n".join(lines)
+
+
+def enabled():
+    return _recorder is not None
+
+
+def stage(name):
+    """Context manager timing ``name`` within the current asset (a no-op unless profiling)."""
+    return _recorder.stage(name) if _recorder is not None else _NULL
+
+
+def asset(name):
+    """Context manager grouping the stages inside it under asset ``name``."""
+    return _recorder.stage("total", asset=name) if _recorder is not None else _NULL
+
+
+def profiled(name):
+    """Decorator running the function as stage ``name``."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return fn(*args, **kwargs)
+            with _recorder.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_arguments(parser):
+    parser.add_argument("--profile", nargs="?", const="", metavar="TRACE",
+                        help="record wall / CPU time and tracemalloc peak per asset and stage, write a Chrome "
+                             "trace (default build/profile/<tool>.trace.json) and print a summary")
+    parser.add_argument("--cprofile", metavar="DIR", help="with --profile, also dump cProfile stats per stage")
+
+
+@contextlib.contextmanager
+def session(args, tool):
+    """Profile the body of the ``with`` block when ``args.profile`` is set (see add_arguments)."""
+    global _recorder
+    if getattr(args, "profile", None) is None:
+        yield
+        return
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    _recorder = recorder = _Recorder(args.cprofile)
+    try:
+        with recorder.stage("total", asset=tool):
+            yield
+    finally:
+        _recorder = None
+        if started:
+            tracemalloc.stop()
+        trace = args.profile or os.path.join(PROFILE_DIR, f"{tool}.trace.json")
+        recorder.write_trace(trace, tool)
+        print(recorder.summary())
+        print(f"Wrote {trace}")
+        if args.cprofile:
+            print(f"Wrote {len(recorder.dump_profiles())} cProfile dumps to {args.cprofile}")
@@ -0,0 +1,253 @@
+"""
+Texture stage: per-body power-of-two sizing, gamma-correct mip chains, KTX2.
+
+Usage: python tools/textures.py [--scale 5] [--filter kaiser] [--zstd [LEVEL]] [--out-dir DIR] [--dry-run]
+
+For every body texture (and the Milky Way skybox) it
+
+  1. picks a target size from how large the body can get on screen, using
+     the same scene model as triangle_budget.py: an equirectangular map
+     needs about 2 * pi texels per projected radius pixel around the
+     equator, rounded up to a power of two and clamped to
+     [--min-size, --max-size] and to the source size;
+  2. decodes the JPEG to linear light (sRGB transfer function), reduces it
+     to the target size and builds the full mip chain down to 1x1 with a
+     2x2 box or a separable Kaiser-windowed sinc filter (wrapping across the
+     longitude seam, clamped at the poles), re-encoding every level to sRGB;
+  3. writes <stem>.ktx2 (R8G8B8A8_SRGB, optionally zstd-supercompressed, see
+     ktx2.py) to build/textures.
+
+The .ktx2 files are a side output: the glTFs keep sampling the JPEGs. glTF
+can only reference KTX2 through KHR_texture_basisu, which requires Basis
+Universal (ETC1S / UASTC) payloads rather than the uncompressed levels
+written here, so they stay out of the app assets (nothing there would load
+them) until a Basis encoder produces something the glTFs can use.
+
+Decoding images needs Pillow (pip install pillow); zstd needs zstandard.
+"""
+
+import argparse
+import io
+import math
+import os
+import time
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+import bodies
+import gltf_io
+import ktx2
+import triangle_budget
+
+MODELS_DIR = os.path.join(bodies.ROOT, "app/src/main/assets/models")
+KTX2_DIR = os.path.join(bodies.ROOT, "build/textures")
+FILTERS = ("box", "kaiser")
+DEFAULT_SCALE = 5.0  # top of the System Scale slider, so textures never go soft when zoomed in
+MIN_SIZE = 256
+MAX_SIZE = 4096
+KAISER_ALPHA = 4.0
+KAISER_RADIUS = 3  # taps on each side of the output texel, in output texels
+
+
+# --- Colour space ---
+
+_SRGB_TO_LINEAR = np.where(np.arange(256) / 255.0 <= 0.04045, np.arange(256) / 255.0 / 12.92,
+                           ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4).astype(np.float32)
+
+
+def to_linear(pixels):
+    """uint8 sRGB -> float32 linear light."""
+    return _SRGB_TO_LINEAR[pixels]
+
+
+def to_srgb(linear):
+    """float linear light -> uint8 sRGB."""
+    c = np.clip(linear, 0.0, 1.0)
+    encoded = np.where(c <= 0.0031308, c * 12.92, 1.055 * np.power(c, 1.0 / 2.4, dtype=np.float32) - 0.055)
+    return np.round(encoded * 255.0).astype(np.uint8)
+
+
+# --- Filters ---
+
+def _kaiser_taps():
+    """Weights for 2x decimation at offsets +-0.5, +-1.5, ... source texels from the output centre."""
+    x = np.arange(-2 * KAISER_RADIUS, 2 * KAISER_RADIUS) + 0.5
+    window = np.i0(KAISER_ALPHA * np.sqrt(np.clip(1.0 - (x / (2 * KAISER_RADIUS)) ** 2, 0.0, 1.0))) / np.i0(KAISER_ALPHA)
+    w = np.sinc(x / 2.0) * window
+    return (x - 0.5).astype(np.int64), (w / w.sum()).astype(np.float32)
+
+
+def _halve_axis(a, axis, filter_, wrap):
+    n = a.shape[axis]
+    if n == 1:
+        return a
+    if filter_ == "box":
+        shape = a.shape[:axis] + (n // 2, 2) + a.shape[axis + 1:]
+        return a.reshape(shape).mean(axis=axis + 1, dtype=np.float32)
+    offsets, weights = _kaiser_taps()
+    centres = np.arange(n // 2) * 2
+    out = None
+    for offset, weight in zip(offsets, weights):
+        idx = centres + offset
+        idx = idx % n if wrap else np.clip(idx, 0, n - 1)
+        term = np.take(a, idx, axis=axis) * weight
+        out = term if out is None else out + term
+    return out
+
+
+def halve(linear, filter_="box"):
+    """One mip step: halve both axes (or the one that is still > 1)."""
+    # Columns wrap at the longitude seam; rows clamp at the poles.
+    return _halve_axis(_halve_axis(linear, 1, filter_, wrap=True), 0, filter_, wrap=False)
+
+
+def mip_chain(linear, filter_="box"):
+    """Full chain of linear float32 levels from ``linear`` down to 1x1, largest first."""
+    levels = [linear]
+    while levels[-1].shape[0] > 1 or levels[-1].shape[1] > 1:
+        levels.append(np.clip(halve(levels[-1], filter_), 0.0, 1.0))
+    return levels
+
+
+# --- Sizing ---
+
+def _is_pow2(n):
+    return n > 0 and n & (n - 1) == 0
+
+
+def _pow2_floor(n):
+    return 1 << (int(n).bit_length() - 1)
+
+
+def target_widths(scale=DEFAULT_SCALE, fov_deg=90.0, screen_px=1920, detail=1.0,
+                  min_size=MIN_SIZE, max_size=MAX_SIZE):
+    """{texture stem: (power-of-two width, projected radius px)} for every body plus the skybox."""
+    focal_px = screen_px / (2.0 * math.tan(math.radians(fov_deg) / 2.0))
+    widths = {}
+    for item in triangle_budget.scene_items(scale):
+        if item["kind"] == "ring":
+            continue
+        # Projected radius of the nearest instance; the viewer sits inside the skybox, so that is the focal length.
+        radius_px = max(focal_px * min(radius / distance, 1.0) for radius, distance in item["instances"])
+        needed = 2.0 * math.pi * radius_px * detail
+        width = 1 << max(math.ceil(math.log2(max(needed, 1.0))), 0)
+        widths[f"{item['name']}_texture"] = (min(max(width, min_size), max_size), radius_px)
+    return widths
+
+
+# --- Pipeline ---
+
+def load_image(path):
+    """Decode ``path`` to an (H, W, 3) uint8 array."""
+    if Image is None:
+        raise RuntimeError("the texture stage needs Pillow to decode images (pip install pillow)")
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def encode_jpeg(pixels, quality=92):
+    """JPEG bytes for an (H, W, 3) uint8 array."""
+    if Image is None:
+        raise RuntimeError("the texture stage needs Pillow to encode images (pip install pillow)")
+    out = io.BytesIO()
+    Image.fromarray(pixels, "RGB").save(out, "JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def resize_linear(linear, width, height):
+    """Lanczos resize of a linear float32 image (per channel, so no gamma is involved)."""
+    return np.clip(np.stack([np.asarray(Image.fromarray(np.ascontiguousarray(linear[..., c]), "F")
+                                        .resize((width, height), Image.LANCZOS))
+                             for c in range(linear.shape[2])], axis=-1), 0.0, 1.0)
+
+
+def resample(pixels, width, filter_="box"):
+    """Linear-light float32 image, halved until it is at most ``width`` wide (never upscaled)."""
+    height, source_width = pixels.shape[:2]
+    linear = to_linear(pixels)
+    if not (_is_pow2(source_width) and _is_pow2(height)):
+        # Odd source size: one resample to the enclosing power of two first.
+        linear = resize_linear(linear, _pow2_floor(source_width), _pow2_floor(height))
+    while linear.shape[1] > width:
+        linear = np.clip(halve(linear, filter_), 0.0, 1.0)
+    return linear
+
+
+def write_ktx2(stem, data, out_dir=KTX2_DIR):
+    """Write ``<stem>.ktx2`` into ``out_dir``; returns (path, written)."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{stem}.ktx2")
+    return path, gltf_io.write_if_changed(path, data)
+
+
+def process(path, width, filter_="box", zstd_level=None, out_dir=KTX2_DIR):
+    """Write the KTX2 for one texture into ``out_dir``; returns a stats dict."""
+    start = time.perf_counter()
+    pixels = load_image(path)
+    levels = mip_chain(resample(pixels, width, filter_), filter_)
+    data = ktx2.encode([to_srgb(level) for level in levels], srgb=True, zstd_level=zstd_level)
+    out_path, written = write_ktx2(os.path.splitext(os.path.basename(path))[0], data, out_dir)
+    return {
+        "path": out_path,
+        "source": f"{pixels.shape[1]}x{pixels.shape[0]}",
+        "size": f"{levels[0].shape[1]}x{levels[0].shape[0]}",
+        "levels": len(levels),
+        "source_bytes": os.path.getsize(path),
+        "bytes": len(data),
+        "gpu_bytes": sum(level.shape[0] * level.shape[1] * 4 for level in levels),
+        "seconds": time.perf_counter() - start,
+        "written": written,
+    }
+
+
+def report(name, stats):
+    return (f"{name:<20} {stats['source']:>9} -> {stats['size']:<9} {stats['levels']:>2} levels  "
+            f"{stats['source_bytes']:>9} B jpg -> {stats['bytes']:>9} B ktx2, "
+            f"{stats['gpu_bytes'] / 2 ** 20:6.1f} MiB GPU, {stats['seconds']:.2f} s"
+            + ("" if stats["written"] else " (unchanged)"))
+
+
+def run(models_dir=MODELS_DIR, scale=DEFAULT_SCALE, fov_deg=90.0, screen_px=1920, detail=1.0,
+        min_size=MIN_SIZE, max_size=MAX_SIZE, filter_="box", zstd_level=None, only=None, dry_run=False,
+        out_dir=KTX2_DIR):
+    """Process every body texture present in ``models_dir`` into ``out_dir``; returns {stem: stats}."""
+    results = {}
+    for stem, (width, radius_px) in target_widths(scale, fov_deg, screen_px, detail, min_size, max_size).items():
+        if only and stem.replace("_texture", "") not in only:
+            continue
+        source = os.path.join(models_dir, f"{stem}.jpg")
+        if not os.path.exists(source):
+            print(f"{stem:<20} skipped, {os.path.basename(source)} not found")
+            continue
+        if dry_run:
+            print(f"{stem:<20} up to {radius_px:7.1f} px radius on screen -> {width}x{width // 2}")
+            continue
+        stats = process(source, width, filter_, zstd_level, out_dir)
+        print(report(stem, stats))
+        results[stem] = stats
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resize body textures, build mip chains and write KTX2.")
+    parser.add_argument("--scale", type=float, default=DEFAULT_SCALE, help="scene scale slider value to plan for")
+    parser.add_argument("--fov", type=float, default=90.0, help="vertical field of view in degrees")
+    parser.add_argument("--screen-px", type=int, default=1920, help="eye buffer height in pixels")
+    parser.add_argument("--detail", type=float, default=1.0, help="texel density multiplier (1 = one texel per pixel)")
+    parser.add_argument("--min-size", type=int, default=MIN_SIZE)
+    parser.add_argument("--max-size", type=int, default=MAX_SIZE)
+    parser.add_argument("--filter", choices=FILTERS, default="box", help="mip downsampling filter (linear light)")
+    parser.add_argument("--zstd", type=int, nargs="?", const=10, metavar="LEVEL",
+                        help="zstd-supercompress the levels (default level 10; needs zstandard)")
+    parser.add_argument("--only", nargs="+", metavar="BODY", help="e.g. earth milky_way")
+    parser.add_argument("--dry-run", action="store_true", help="only print the planned sizes")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--out-dir", default=KTX2_DIR, help="where the .ktx2 files go (default build/textures)")
+    args = parser.parse_args()
+    run(args.models_dir, args.scale, args.fov, args.screen_px, args.detail, args.min_size, args.max_size,
+        args.filter, args.zstd, args.only, args.dry_run, args.out_dir)
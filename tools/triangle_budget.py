@@ -0,0 +1,197 @@
+"""
+Scene-wide triangle budget planner.
+
+Reads body radii and orbit distances from SolarSystemRepository.kt, works out
+how large each body, the orbit rings and the skybox appear at the
+default scene scale, and splits one triangle budget between them so the
+worst screen-space error (in pixels) is as small and as even as possible.
+
+Usage: python tools/triangle_budget.py --budget 60000 [--write] [--report plan.json]
+
+Scene layout mirrored from SolarSystemScene.kt (scale slider at 1.0):
+  * the Sun entity sits SUN_DISTANCE m in front of the viewer, scaled by SUN_SCALE;
+  * planets are children scaled by (0.02 + radius * 0.15) / 0.2 and orbit at
+    orbitDistance * 0.1 / 0.2 in Sun-local units;
+  * orbit_rings.gltf holds every orbit in one mesh (generate_ring.py
+    --merged), all rings sharing one segment count, so that count must
+    satisfy the largest orbit and its triangles count once per planet;
+  * the skybox is a radius-50 sphere around the viewer.
+Each model is a radius-0.5 unit sphere, so world radius = 0.5 * world scale.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+
+import bodies
+import create_skybox
+import gltf_io
+
+sys.path.insert(0, bodies.ROOT)
+import create_sphere_fixed
+import generate_ring
+
+SUN_SCALE = 0.2
+SUN_DISTANCE = 0.5
+SKYBOX_RADIUS = 50.0
+RING_MINOR_SEGMENTS = 6
+MODEL_RADIUS = 0.5
+
+# Current hardcoded tessellation, for comparison.
+CURRENT = {"sphere": 64, "ring": 64, "skybox": 64}
+LIMITS = {"sphere": (8, 512), "ring": (16, 2048), "skybox": (8, 1024)}
+
+
+def _sphere_error(n):
+    """Relative facet error of a UV sphere with n x n/2 segments (quad centre sag)."""
+    return 1.0 - math.cos(math.pi / n) ** 2
+
+
+def _skybox_error(n):
+    """Relative facet error of the rings x sectors skybox sphere with n rings and sectors."""
+    return 1.0 - math.cos(math.pi / (n - 1)) * math.cos(math.pi / (2 * (n - 1)))
+
+
+KINDS = {
+    # kind: (relative error(n), triangles(n))
+    "sphere": (_sphere_error, lambda n: n * n),
+    "ring": (lambda n: 1.0 - math.cos(math.pi / n), lambda n: 2 * n * RING_MINOR_SEGMENTS),
+    "skybox": (_skybox_error, lambda n: 2 * (n - 1) ** 2),
+}
+
+
+def scene_items(scale=1.0):
+    """One entry per generated asset with the (radius, view distance) of every on-screen instance."""
+    sun_scale = SUN_SCALE * scale
+    items = []
+    for body in bodies.load():
+        if body["orbitDistance"] == 0:
+            radius = MODEL_RADIUS * sun_scale
+            distance = SUN_DISTANCE
+        else:
+            radius = MODEL_RADIUS * sun_scale * (0.02 + body["radius"] * 0.15) / 0.2
+            orbit = sun_scale * body["orbitDistance"] * 0.1 / 0.2
+            # RMS distance to the viewer over one orbit around the Sun.
+            distance = math.sqrt(SUN_DISTANCE ** 2 + orbit ** 2)
+        items.append({"name": body["key"], "kind": "sphere", "count": 1,
+                      "instances": [(radius, distance)]})
+
+    orbits = []
+    for body in bodies.planets():
+        orbit = sun_scale * body["orbitDistance"] * 0.1 / 0.2
+        orbits.append((orbit, math.sqrt(SUN_DISTANCE ** 2 + orbit ** 2)))
+    items.append({"name": "orbit_rings", "kind": "ring", "count": len(orbits), "instances": orbits})
+    # Viewer at the centre: distance == radius, so the error is purely angular.
+    items.append({"name": "milky_way", "kind": "skybox", "count": 1,
+                  "instances": [(SKYBOX_RADIUS, SKYBOX_RADIUS)]})
+    return items
+
+
+def error_px(item, n, focal_px):
+    rel_error, _ = KINDS[item["kind"]]
+    return max(rel_error(n) * radius / distance * focal_px for radius, distance in item["instances"])
+
+
+def triangles(item, n):
+    return KINDS[item["kind"]][1](n) * item["count"]
+
+
+def segments_for(item, target_px, focal_px):
+    """Smallest even segment count whose error is within ``target_px`` (clamped to LIMITS)."""
+    lo, hi = LIMITS[item["kind"]]
+    lo, hi = lo // 2, hi // 2
+    if error_px(item, hi * 2, focal_px) > target_px:
+        return hi * 2
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if error_px(item, mid * 2, focal_px) <= target_px:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo * 2
+
+
+def plan(budget, scale=1.0, fov_deg=90.0, screen_px=1920):
+    """Return (items with chosen segments, achieved max error in px)."""
+    focal_px = screen_px / (2.0 * math.tan(math.radians(fov_deg) / 2.0))
+    items = scene_items(scale)
+
+    def total(target):
+        return sum(triangles(it, segments_for(it, target, focal_px)) for it in items)
+
+    lo, hi = 1e-4, 1e4
+    if total(lo) <= budget:
+        hi = lo
+    for _ in range(100):
+        if hi / lo < 1.0001:
+            break
+        mid = math.sqrt(lo * hi)
+        if total(mid) <= budget:
+            hi = mid
+        else:
+            lo = mid
+
+    for it in items:
+        it["segments"] = segments_for(it, hi, focal_px)
+        it["triangles"] = triangles(it, it["segments"])
+        it["error_px"] = error_px(it, it["segments"], focal_px)
+        it["current_segments"] = CURRENT[it["kind"]]
+        it["current_triangles"] = triangles(it, CURRENT[it["kind"]])
+        it["current_error_px"] = error_px(it, CURRENT[it["kind"]], focal_px)
+    return items, max(it["error_px"] for it in items)
+
+
+def report(items, budget):
+    lines = [f"{'asset':<11} {'kind':<7} {'segs':>5} {'tris':>8} {'err px':>8}   {'now segs':>8} {'now tris':>8} {'now err':>8}"]
+    for it in items:
+        lines.append(f"{it['name']:<11} {it['kind']:<7} {it['segments']:>5} {it['triangles']:>8} {it['error_px']:>8.3f}   "
+                     f"{it['current_segments']:>8} {it['current_triangles']:>8} {it['current_error_px']:>8.3f}")
+    total = sum(it["triangles"] for it in items)
+    current = sum(it["current_triangles"] for it in items)
+    lines.append(f"total: {total} / {budget} triangles (currently {current}), "
+                 f"max error {max(it['error_px'] for it in items):.3f} px "
+                 f"(currently {max(it['current_error_px'] for it in items):.3f} px)")
+    if total > budget:
+        lines.append("warning: budget is below the minimum tessellation of every asset")
+    return "\n".join(lines)
+
+
+def write_assets(items, models_dir, fmt="gltf", cleanup=False, optimize=False):
+    """Regenerate every asset at its planned tessellation."""
+    textures = {b["key"]: f"{b['key']}_texture.jpg" for b in bodies.load()}
+    for it in items:
+        n = it["segments"]
+        if it["kind"] == "sphere":
+            create_sphere_fixed.create_gltf(os.path.join(models_dir, f"{it['name']}.gltf"), textures[it["name"]],
+                                            fmt, optimize, cleanup, width_segments=n, height_segments=n // 2)
+        elif it["kind"] == "ring":
+            gltf, buffer_data = generate_ring.create_merged_gltf(None, optimize, cleanup, major_segments=n)
+            print(f"Created {gltf_io.write(os.path.join(models_dir, 'orbit_rings.gltf'), gltf, buffer_data, fmt)}")
+        else:
+            create_skybox.build(models_dir, fmt, cleanup, optimize, rings=n, sectors=n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a scene-wide triangle budget across all generated assets.")
+    parser.add_argument("--budget", type=int, required=True, help="total triangles for the whole scene")
+    parser.add_argument("--scale", type=float, default=1.0, help="scene scale slider value to plan for")
+    parser.add_argument("--fov", type=float, default=90.0, help="vertical field of view in degrees")
+    parser.add_argument("--screen-px", type=int, default=1920, help="eye buffer height in pixels")
+    parser.add_argument("--report", help="also write the plan as JSON to this path")
+    parser.add_argument("--write", action="store_true", help="regenerate the assets with the planned segment counts")
+    parser.add_argument("--models-dir", default="app/src/main/assets/models")
+    parser.add_argument("--format", choices=gltf_io.FORMATS, default="gltf")
+    parser.add_argument("--cleanup", action="store_true")
+    parser.add_argument("--optimize", action="store_true")
+    args = parser.parse_args()
+
+    items, worst = plan(args.budget, args.scale, args.fov, args.screen_px)
+    print(report(items, args.budget))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({"budget": args.budget, "scale": args.scale, "fov": args.fov, "screenPx": args.screen_px,
+                       "maxErrorPx": worst, "assets": items}, f, indent=2)
+    if args.write:
+        write_assets(items, args.models_dir, args.format, args.cleanup, args.optimize)